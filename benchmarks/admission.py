@@ -0,0 +1,175 @@
+"""
+Benchmarks responsiveness of the service under synthetic overload without and with
+admission control: closed-loop clients flood online scoring of random users
+while probes measure latency of the health check and of a cached recommendation
+
+Run from the directory with the artefacts (or set ARTEFACTS_DIR)
+Usage: python -m benchmarks.admission [--model user_knn_tf_idf] [--clients 64] [--seconds 20]
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from src.config import settings
+
+ADMISSION_ENV = {
+    "ADMISSION_MAX_CONCURRENCY": "4",
+    "ADMISSION_MAX_QUEUE_DEPTH": "4",
+    "ADMISSION_CLIENT_RATE_PER_SECOND": "2000",
+    "ADMISSION_CLIENT_BURST": "200",
+}
+
+
+def wait_ready(port: int) -> None:
+    """
+    Waits for the service to be ready
+    """
+    deadline = time.monotonic() + 600
+    while time.monotonic() < deadline:
+        try:
+            if get(http.client.HTTPConnection("127.0.0.1", port, timeout=5), "/ready")[0] == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError("Service is not ready")
+
+
+def get(
+    connection: http.client.HTTPConnection, path: str, client_id: str = "probe"
+) -> tuple[int, float]:
+    """
+    Sends authorized GET request of the client and returns its status and latency in seconds
+    """
+    start_time = time.perf_counter()
+    headers = {"Authorization": f"Bearer {settings.token}", "X-Client-Id": client_id}
+    connection.request("GET", path, headers=headers)
+    response = connection.getresponse()
+    response.read()
+    return response.status, time.perf_counter() - start_time
+
+
+def run_client(
+    port: int, path: str, stop: threading.Event, results: list, pause: float, client_id: str
+) -> None:
+    """
+    Sends requests of the client to the path until stopped and collects their statuses
+    and latencies, '{user_id}' in the path is replaced with a random user
+    """
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    while not stop.is_set():
+        try:
+            results.append(
+                get(connection, path.format(user_id=random.randrange(10**6)), client_id)
+            )
+        except (OSError, http.client.HTTPException):
+            results.append((0, 0.0))
+            connection.close()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        if pause:
+            time.sleep(pause)
+    connection.close()
+
+
+def measure(env: dict[str, str], args: argparse.Namespace) -> dict:
+    """
+    Starts the service, floods it and returns statistics of the flood and the probes
+    """
+    command = [sys.executable, "-m", "uvicorn", "src.app:app", "--port", str(args.port)]
+    with subprocess.Popen(
+        command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    ) as process:
+        try:
+            wait_ready(args.port)
+            probe_path = f"/reco/{args.model}/{args.cached_user_id}"
+            connection = http.client.HTTPConnection("127.0.0.1", args.port, timeout=30)
+            for _ in range(2):
+                get(connection, probe_path)
+            connection.close()
+            stop = threading.Event()
+            paths = {
+                "flood": (f"/reco/{args.model}/{{user_id}}", 0.0, args.clients),
+                "health": ("/health", 0.01, 1),
+                "cached": (probe_path, 0.01, 1),
+            }
+            results: dict[str, list] = {name: [] for name in paths}
+            threads = [
+                threading.Thread(
+                    target=run_client, args=(args.port, path, stop, results[name], pause, name)
+                )
+                for name, (path, pause, n_threads) in paths.items()
+                for _ in range(n_threads)
+            ]
+            for thread in threads:
+                thread.start()
+            time.sleep(args.seconds)
+            stop.set()
+            for thread in threads:
+                thread.join()
+        finally:
+            process.terminate()
+            process.wait(60)
+    statuses = Counter(status for status, _ in results["flood"])
+    return {
+        "rps": len(results["flood"]) / args.seconds,
+        "statuses": dict(sorted(statuses.items())),
+        "shed_p99_ms": get_percentile(results["flood"], 99, (429, 503)),
+        **{
+            f"{name}_p99_ms": get_percentile(results[name], 99)
+            for name in ("flood", "health", "cached")
+        },
+    }
+
+
+def get_percentile(
+    results: list[tuple[int, float]], percentile: float, statuses: tuple[int, ...] = (200,)
+) -> float:
+    """
+    Returns percentile of latencies of the requests with the statuses in milliseconds
+    """
+    latencies = [latency for status, latency in results if status in statuses]
+    return float(np.percentile(latencies, percentile)) * 1000 if latencies else float("nan")
+
+
+def main() -> None:
+    """
+    Runs the benchmark
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="user_knn_tf_idf", help="model scored by the flood")
+    parser.add_argument("--clients", type=int, default=64, help="number of flooding clients")
+    parser.add_argument("--seconds", type=float, default=20.0, help="duration of the flood")
+    parser.add_argument("--cached-user-id", type=int, default=1, help="user of the cached probe")
+    parser.add_argument("--port", type=int, default=5056, help="port of the service")
+    args = parser.parse_args()
+
+    env = {
+        **os.environ,
+        "WARMUP_MODELS": json.dumps([args.model]),
+        "PYTHONPATH": os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")])),
+    }
+    print(f"{args.clients} clients flooding {args.model} for {args.seconds:.0f} s")
+    print(
+        f"{'scenario':<18} {'rps':>7} {'flood p99 ms':>13} {'shed p99 ms':>12} "
+        f"{'health p99 ms':>14} {'cached p99 ms':>14}  statuses"
+    )
+    for scenario, scenario_env in (("no admission", {}), ("admission control", ADMISSION_ENV)):
+        result = measure({**env, **scenario_env}, args)
+        print(
+            f"{scenario:<18} {result['rps']:>7.0f} {result['flood_p99_ms']:>13.1f} "
+            f"{result['shed_p99_ms']:>12.1f} {result['health_p99_ms']:>14.1f} "
+            f"{result['cached_p99_ms']:>14.1f}  {result['statuses']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
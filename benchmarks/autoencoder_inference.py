@@ -0,0 +1,107 @@
+"""
+Benchmarks inference variants of AutoEncoder against the dense float model:
+latency of single-user and batch scoring and drift of top-k recommendations
+(share of the dense model top-k kept by the variant)
+
+Usage: python -m benchmarks.autoencoder_inference [--users 1000] [--batch-size 64] [--threads 1]
+"""
+import argparse
+import time
+from typing import Callable
+
+import numpy as np
+import torch
+
+from src.config import AutoEncoderInferenceEnum, settings
+from src.recommenders.artefact_store import get_artefact_store
+from src.recommenders.autoencoder_inference import AutoEncoderInference, set_inference_threads
+from src.recommenders.autoencoder_recommender import (
+    MODEL_FILE,
+    MODEL_ITEM_INV_MAPPING_FILE,
+    MODEL_USER_ITEM_MATRIX_FILE,
+    Model,
+)
+from src.recommenders.base_recommender import select_top_k
+from src.recommenders.mappings import load_item_inv_mapping
+
+
+def measure_latencies(get_scores: Callable, batches: list[np.ndarray]) -> np.ndarray:
+    """
+    Returns latencies in milliseconds of scoring each batch
+    """
+    latencies = []
+    for batch in batches:
+        start_time = time.perf_counter()
+        get_scores(batch)
+        latencies.append((time.perf_counter() - start_time) * 1000)
+    return np.array(latencies)
+
+
+def get_top_k_overlap(scores: np.ndarray, reference_scores: np.ndarray, k: int) -> float:
+    """
+    Returns mean share of the reference top-k items contained in top-k items of the scores
+    """
+    top_k = select_top_k(scores, k)
+    reference_top_k = select_top_k(reference_scores, k)
+    return float(
+        np.mean(
+            [
+                len(np.intersect1d(row, reference_row)) / k
+                for row, reference_row in zip(top_k, reference_top_k)
+            ]
+        )
+    )
+
+
+def main() -> None:  # pylint: disable=too-many-locals
+    """
+    Runs the benchmark
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000, help="number of sampled users")
+    parser.add_argument("--batch-size", type=int, default=64, help="users per batch")
+    parser.add_argument("--threads", type=int, default=1, help="torch intra-op threads")
+    args = parser.parse_args()
+    set_inference_threads(args.threads)
+
+    store = get_artefact_store()
+    user_item_matrix = store.load_csr_matrix(MODEL_USER_ITEM_MATRIX_FILE)
+    model = Model(len(load_item_inv_mapping(store.get_path(MODEL_ITEM_INV_MAPPING_FILE))))
+    model.load_state_dict(torch.load(store.get_path(MODEL_FILE)))
+    model.eval()
+
+    user_ids = np.random.default_rng(42).choice(
+        user_item_matrix.shape[0], min(args.users, user_item_matrix.shape[0]), replace=False
+    )
+    single_batches = [user_ids[i : i + 1] for i in range(len(user_ids))]
+    batches = [user_ids[i : i + args.batch_size] for i in range(0, len(user_ids), args.batch_size)]
+
+    def get_dense_scores(batch: np.ndarray) -> np.ndarray:
+        with torch.no_grad():
+            return model(torch.Tensor(user_item_matrix[batch].toarray())).numpy()
+
+    reference_scores = get_dense_scores(user_ids)
+    variants = {"dense (current)": get_dense_scores}
+    for variant in AutoEncoderInferenceEnum:
+        inference = AutoEncoderInference(model.sequential[0], model.sequential[2], variant)
+        variants[
+            f"sparse {variant.value}"
+        ] = lambda batch, inference=inference: inference.get_scores(user_item_matrix[batch])
+
+    print(f"{len(user_ids)} users, batch size {args.batch_size}, {torch.get_num_threads()} threads")
+    print(f"{'variant':<20} {'p50 ms':>8} {'p99 ms':>8} {'batch ms':>9} {'overlap@k':>10}")
+    for name, get_scores in variants.items():
+        get_scores(user_ids[:1])
+        latencies = measure_latencies(get_scores, single_batches)
+        batch_latencies = measure_latencies(get_scores, batches)
+        overlap = get_top_k_overlap(
+            get_scores(user_ids), reference_scores, settings.n_returned_items
+        )
+        print(
+            f"{name:<20} {np.percentile(latencies, 50):>8.3f} {np.percentile(latencies, 99):>8.3f} "
+            f"{np.mean(batch_latencies):>9.3f} {overlap:>10.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
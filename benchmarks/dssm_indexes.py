@@ -0,0 +1,116 @@
+"""
+Benchmarks faiss index families on DSSM embeddings against the exact Flat search:
+recall@k (share of the exact top-k found by the index), latency of single-user search,
+build time and memory of the serialized index
+
+Configurations are given as faiss factory string with optional search parameters
+after a semicolon, e.g. "IVF1024,Flat;nprobe=16" or "HNSW32;efSearch=64"
+
+Usage: python -m benchmarks.dssm_indexes [--users 1000] [--k 10] [--configs "SQ8" "HNSW32"]
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from src.config import settings
+from src.recommenders.artefact_store import get_artefact_store
+from src.recommenders.dssm_recommender import (
+    ITEM_EMBEDDING_FILE,
+    USER_EMBEDDING_FILE,
+    build_index,
+    set_search_parameters,
+)
+
+
+def get_default_configs(n_items: int) -> list[str]:
+    """
+    Returns configurations of every supported index family for the catalog size
+    """
+    n_lists = max(1, int(4 * np.sqrt(n_items)))
+    return [
+        "Flat",
+        f"IVF{n_lists},Flat;nprobe=1",
+        f"IVF{n_lists},Flat;nprobe=8",
+        f"IVF{n_lists},Flat;nprobe=32",
+        f"IVF{n_lists},PQ32;nprobe=8",
+        f"IVF{n_lists},PQ32;nprobe=32",
+        "HNSW32;efSearch=16",
+        "HNSW32;efSearch=64",
+        "HNSW32;efSearch=256",
+        "SQ8",
+    ]
+
+
+def get_recall(items: np.ndarray, exact_items: np.ndarray) -> float:
+    """
+    Returns mean share of the exact top-k items found in the approximate top-k
+    """
+    k = exact_items.shape[1]
+    return float(
+        np.mean(
+            [
+                len(np.intersect1d(row[row >= 0], exact_row)) / k
+                for row, exact_row in zip(items, exact_items)
+            ]
+        )
+    )
+
+
+def get_index_size(index: faiss.Index) -> int:
+    """
+    Returns number of bytes of the serialized index
+    """
+    return faiss.serialize_index(index).nbytes
+
+
+def main() -> None:  # pylint: disable=too-many-locals
+    """
+    Runs the benchmark
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000, help="number of sampled users")
+    parser.add_argument("--k", type=int, default=settings.n_returned_items, help="top-k size")
+    parser.add_argument("--configs", nargs="+", help="factory strings with search parameters")
+    args = parser.parse_args()
+
+    store = get_artefact_store()
+    item_embeddings = np.ascontiguousarray(store.load_array(ITEM_EMBEDDING_FILE), np.float32)
+    user_embeddings = store.load_array(USER_EMBEDDING_FILE)
+    user_ids = np.random.default_rng(42).choice(
+        len(user_embeddings), min(args.users, len(user_embeddings)), replace=False
+    )
+    queries = np.ascontiguousarray(user_embeddings[np.sort(user_ids)], np.float32)
+    _, exact_items = build_index(item_embeddings, "Flat").search(queries, args.k)
+
+    print(f"{len(item_embeddings)} items, {len(queries)} users, k={args.k}")
+    print(
+        f"{'index':<28} {'recall@k':>9} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8} {'size MB':>8}"
+    )
+    for config in args.configs or get_default_configs(len(item_embeddings)):
+        index_factory, _, search_parameters = config.partition(";")
+        start_time = time.perf_counter()
+        try:
+            index = build_index(item_embeddings, index_factory)
+        except RuntimeError as exc:
+            print(f"{config:<28} not built: {str(exc).rsplit('Error: ', 1)[-1]}")
+            continue
+        build_time = time.perf_counter() - start_time
+        set_search_parameters(index, search_parameters)
+
+        latencies = []
+        for query in queries:
+            start_time = time.perf_counter()
+            index.search(query.reshape(1, -1), args.k)
+            latencies.append((time.perf_counter() - start_time) * 1000)
+        _, items = index.search(queries, args.k)
+        print(
+            f"{config:<28} {get_recall(items, exact_items):>9.4f} "
+            f"{np.percentile(latencies, 50):>8.3f} {np.percentile(latencies, 99):>8.3f} "
+            f"{build_time:>8.2f} {get_index_size(index) / 1024**2:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmarks startup of a worker: time and peak memory of importing the application
+in a fresh interpreter with the lazy register, with every model imported eagerly
+as the register did before, and with a single model imported on its first request
+
+Usage: python -m benchmarks.import_time [--runs 5]
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+import numpy as np
+
+from src.recommenders.recommender_register import RECOMMENDERS
+
+CHILD_CODE = """
+import json, resource, sys, time
+start_time = time.perf_counter()
+import src.app
+from src.recommenders.recommender_register import RecommenderRegister
+for model_name in sys.argv[1:]:
+    RecommenderRegister.get_recommender_class(model_name)
+print(json.dumps({
+    "seconds": time.perf_counter() - start_time,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy_modules": sorted({"torch", "faiss", "implicit"} & set(sys.modules)),
+}))
+"""
+
+
+def measure(model_names: list[str], n_runs: int) -> dict:
+    """
+    Returns median import time, median peak memory and imported heavy modules
+    of fresh interpreters importing the application and the models
+    """
+    runs = [
+        json.loads(
+            subprocess.run(
+                [sys.executable, "-c", CHILD_CODE, *model_names],
+                capture_output=True,
+                check=True,
+            ).stdout
+        )
+        for _ in range(n_runs)
+    ]
+    return {
+        "seconds": float(np.median([run["seconds"] for run in runs])),
+        "max_rss_mb": float(np.median([run["max_rss_mb"] for run in runs])),
+        "heavy_modules": runs[0]["heavy_modules"],
+    }
+
+
+def main() -> None:
+    """
+    Runs the benchmark
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5, help="interpreters per scenario")
+    args = parser.parse_args()
+
+    scenarios = {"lazy register": [], "eager (all models)": list(RECOMMENDERS)}
+    scenarios.update({f"+ {model_name}": [model_name] for model_name in RECOMMENDERS})
+    print(f"{'scenario':<24} {'import s':>9} {'max RSS MB':>11}  heavy modules")
+    for scenario, model_names in scenarios.items():
+        result = measure(model_names, args.runs)
+        print(
+            f"{scenario:<24} {result['seconds']:>9.3f} {result['max_rss_mb']:>11.1f}  "
+            f"{', '.join(result['heavy_modules']) or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
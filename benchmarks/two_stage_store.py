@@ -0,0 +1,117 @@
+"""
+Benchmarks offline recommendations of the two-stage model on synthetic data:
+startup time, peak memory and lookup latency of the json dict the recommender used to load
+and of the memory-mapped compact arrays, and peak memory of the streaming converter
+
+Usage: python -m benchmarks.two_stage_store [--users 1000000] [--items 10]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from src.recommenders.two_stage_recommender import OFFLINE_RECS_FILE, TOP_ITEMS_FILE
+
+CHILD_CODE = """
+import json, os, resource, sys, time
+import numpy as np
+scenario, dir_path = sys.argv[1:]
+os.environ["ARTEFACTS_DIR"] = dir_path
+from src.recommenders.two_stage_recommender import (
+    OFFLINE_RECS_FILE, TwoStageRecommender, read_offline_recs, save_offline_recs
+)
+from src.recommenders.artefact_store import ArtefactStore
+baseline_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+start_time = time.perf_counter()
+if scenario == "json dict":
+    with open(os.path.join(dir_path, OFFLINE_RECS_FILE), "r", encoding="utf-8") as f:
+        predicts = json.load(f)
+    predict = lambda user_id: predicts[str(user_id)]
+    user_ids = np.array([int(user_id) for user_id in predicts])
+elif scenario == "converter":
+    store = ArtefactStore(dir_path)
+    save_offline_recs(store, read_offline_recs(store.get_path(OFFLINE_RECS_FILE)))
+    predict, user_ids = None, None
+else:
+    recommender = TwoStageRecommender()
+    predict, user_ids = recommender.predict, recommender.get_user_ids()
+seconds = time.perf_counter() - start_time
+latencies = []
+if predict is not None:
+    for user_id in np.random.default_rng(0).choice(user_ids, 10000).tolist():
+        lookup_start = time.perf_counter()
+        predict(user_id)
+        latencies.append(time.perf_counter() - lookup_start)
+print(json.dumps({
+    "seconds": seconds,
+    "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 - baseline_mb,
+    "lookup_us": float(np.median(latencies)) * 1e6 if latencies else None,
+}))
+"""
+
+
+def make_offline_recs(dir_path: str, n_users: int, n_items: int) -> None:
+    """
+    Writes synthetic offline recommendations and popular items into the directory
+    """
+    rng = np.random.default_rng(0)
+    user_ids = rng.choice(10 * n_users, n_users, replace=False)
+    with open(os.path.join(dir_path, OFFLINE_RECS_FILE), "w", encoding="utf-8") as f:
+        f.write("{")
+        for chunk_start in range(0, n_users, 100000):
+            chunk_user_ids = user_ids[chunk_start : chunk_start + 100000]
+            items = rng.integers(0, 10**6, (len(chunk_user_ids), n_items)).tolist()
+            f.write(
+                ", " * (chunk_start > 0)
+                + ", ".join(
+                    f'"{user_id}": {json.dumps(user_items)}'
+                    for user_id, user_items in zip(chunk_user_ids.tolist(), items)
+                )
+            )
+        f.write("}")
+    with open(os.path.join(dir_path, TOP_ITEMS_FILE), "w", encoding="utf-8") as f:
+        json.dump({"items": list(range(100))}, f)
+
+
+def measure(scenario: str, dir_path: str) -> dict:
+    """
+    Returns load time, peak memory and median lookup latency of the scenario
+    measured in a fresh interpreter
+    """
+    return json.loads(
+        subprocess.run(
+            [sys.executable, "-c", CHILD_CODE, scenario, dir_path],
+            capture_output=True,
+            check=True,
+        ).stdout
+    )
+
+
+def main() -> None:
+    """
+    Runs the benchmark
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000000, help="number of users")
+    parser.add_argument("--items", type=int, default=10, help="recommendations per user")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dir_path:
+        make_offline_recs(dir_path, args.users, args.items)
+        json_mb = os.path.getsize(os.path.join(dir_path, OFFLINE_RECS_FILE)) / 1024**2
+        print(f"{args.users} users, {args.items} items each, json {json_mb:.1f} MB")
+        print(f"{'scenario':<16} {'load s':>8} {'peak MB':>9} {'lookup us':>10}")
+        for scenario in ("json dict", "converter", "compact arrays"):
+            result = measure(scenario, dir_path)
+            lookup = f"{result['lookup_us']:>10.2f}" if result["lookup_us"] is not None else "-"
+            print(
+                f"{scenario:<16} {result['seconds']:>8.2f} {result['peak_mb']:>9.1f} {lookup:>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmarks strategies of excluding viewed items from ANN search results by buckets
+of user history length: over-fetching n_returned_items + history neighbours against
+faiss ID selectors (bitmap of allowed items, hash set of viewed items) inside the search
+Reports latency of single-user prediction and share of recommendations equal to over-fetching
+
+Usage: python -m benchmarks.viewed_filter [--models hnsw_lightfm dssm] [--users 200]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.config import ViewedFilterEnum, settings
+from src.recommenders.recommender_register import RecommenderRegister
+
+HISTORY_BUCKETS = [(0, 10), (10, 50), (50, 200), (200, 1000), (1000, None)]
+
+
+def get_bucket_users(recommender, n_users: int) -> dict[str, list[int]]:
+    """
+    Returns sampled external IDs of the users by buckets of history length
+    """
+    user_ids = recommender.get_user_ids()
+    history_lengths = np.diff(recommender.user_item_matrix.indptr)
+    history_lengths = history_lengths[recommender.user_mappings.map(user_ids.tolist())]
+    rng = np.random.default_rng(42)
+    buckets = {}
+    for start, end in HISTORY_BUCKETS:
+        is_in_bucket = history_lengths >= start
+        if end is not None:
+            is_in_bucket &= history_lengths < end
+        bucket_users = user_ids[is_in_bucket]
+        if len(bucket_users) > 0:
+            sampled = rng.choice(bucket_users, min(n_users, len(bucket_users)), replace=False)
+            buckets[f"{start}-{end or ''}"] = sampled.tolist()
+    return buckets
+
+
+def measure(recommender, user_ids: list[int]) -> tuple[np.ndarray, list[list[int]]]:
+    """
+    Returns latencies in milliseconds and recommendations of single-user predictions
+    """
+    latencies, recommendations = [], []
+    for user_id in user_ids:
+        start_time = time.perf_counter()
+        recommendations.append(recommender.predict(user_id))
+        latencies.append((time.perf_counter() - start_time) * 1000)
+    return np.array(latencies), recommendations
+
+
+def main() -> None:
+    """
+    Runs the benchmark
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--models", nargs="+", default=["hnsw_lightfm", "dssm"], help="models")
+    parser.add_argument("--users", type=int, default=200, help="sampled users per bucket")
+    args = parser.parse_args()
+
+    print(f"{'model':<14} {'history':<10} {'filter':<10} {'p50 ms':>8} {'p99 ms':>8} {'same':>6}")
+    for model_name in args.models:
+        recommender = RecommenderRegister.get_recommender_class(model_name)()
+        for bucket, user_ids in get_bucket_users(recommender, args.users).items():
+            reference = None
+            for viewed_filter in ViewedFilterEnum:
+                settings.ann_viewed_filter = viewed_filter
+                measure(recommender, user_ids[:1])
+                latencies, recommendations = measure(recommender, user_ids)
+                reference = reference or recommendations
+                same = np.mean([items == ref for items, ref in zip(recommendations, reference)])
+                print(
+                    f"{model_name:<14} {bucket:<10} {viewed_filter.value:<10} "
+                    f"{np.percentile(latencies, 50):>8.3f} {np.percentile(latencies, 99):>8.3f} "
+                    f"{same:>6.3f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
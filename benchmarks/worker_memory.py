@@ -0,0 +1,150 @@
+"""
+Benchmarks memory of the serving processes: unique (USS) and proportional (PSS) memory
+of each worker and total PSS of all processes with uvicorn workers,
+each importing and loading the models, and with pre-forked workers
+sharing the models loaded by the master
+
+Run from the directory with the artefacts (or set ARTEFACTS_DIR)
+Usage: python -m benchmarks.worker_memory [--workers 4] [--models lightfm dssm auto_encoder]
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+from src.config import settings
+
+SCENARIOS = {
+    "uvicorn workers": [sys.executable, "-m", "uvicorn", "src.app:app", "--port", "{port}"],
+    "pre-fork": [sys.executable, "-m", "src.serve", "--port", "{port}"],
+}
+
+
+def get_children(pid: int) -> list[int]:
+    """
+    Returns IDs of all descendant processes of the process
+    """
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat", "r", encoding="utf-8") as f:
+                    parents[int(entry)] = int(f.read().rsplit(")", 1)[1].split()[1])
+            except OSError:
+                continue
+    children, queue = [], [pid]
+    while queue:
+        parent = queue.pop()
+        for child, child_parent in parents.items():
+            if child_parent == parent:
+                children.append(child)
+                queue.append(child)
+    return children
+
+
+def get_memory(pid: int) -> tuple[float, float]:
+    """
+    Returns unique (private) and proportional set size of the process in MB
+    """
+    memory = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                memory[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return memory["Private_Clean"] + memory["Private_Dirty"], memory["Pss"]
+
+
+def send_requests(port: int, model_names: list[str], n_requests: int) -> None:
+    """
+    Waits for the service to be ready and sends recommendation requests to the models
+    """
+    deadline = time.monotonic() + 600
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=5):
+                break
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.5)
+    headers = {"Authorization": f"Bearer {settings.token}"}
+    for user_id in range(n_requests):
+        for model_name in model_names:
+            request = urllib.request.Request(
+                f"http://127.0.0.1:{port}/reco/{model_name}/{user_id}", headers=headers
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=30):
+                    pass
+            except urllib.error.HTTPError:
+                pass
+
+
+def measure(command: list[str], env: dict[str, str], args: argparse.Namespace) -> dict:
+    """
+    Starts the service, loads it with requests and returns memory of its processes
+    """
+    with subprocess.Popen(
+        command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    ) as process:
+        try:
+            send_requests(args.port, args.models, args.requests)
+            time.sleep(args.settle_seconds)
+            workers = get_children(process.pid)
+            memory = {pid: get_memory(pid) for pid in [process.pid, *workers]}
+        finally:
+            process.send_signal(signal.SIGTERM)
+            process.wait(60)
+    worker_memory = np.array([memory[pid] for pid in workers if pid in memory])
+    return {
+        "n_processes": len(memory),
+        "worker_uss_mb": float(worker_memory[:, 0].mean()),
+        "worker_pss_mb": float(worker_memory[:, 1].mean()),
+        "total_pss_mb": sum(pss for _, pss in memory.values()),
+    }
+
+
+def main() -> None:
+    """
+    Runs the benchmark
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4, help="number of workers")
+    parser.add_argument(
+        "--models",
+        nargs="+",
+        default=["lightfm", "user_knn_tf_idf", "dssm", "auto_encoder", "two_stages"],
+        help="models loaded by the workers",
+    )
+    parser.add_argument("--requests", type=int, default=50, help="requests per model")
+    parser.add_argument("--port", type=int, default=5055, help="port of the service")
+    parser.add_argument("--settle-seconds", type=float, default=2.0, help="pause before measuring")
+    args = parser.parse_args()
+
+    env = {
+        **os.environ,
+        "WARMUP_MODELS": json.dumps(args.models),
+        "PYTHONPATH": os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")])),
+    }
+    print(f"{args.workers} workers, models: {', '.join(args.models)}")
+    print(
+        f"{'scenario':<16} {'processes':>9} {'worker USS MB':>14} "
+        f"{'worker PSS MB':>14} {'total PSS MB':>13}"
+    )
+    for scenario, command in SCENARIOS.items():
+        command = [part.format(port=args.port) for part in command]
+        result = measure(command + ["--workers", str(args.workers)], env, args)
+        print(
+            f"{scenario:<16} {result['n_processes']:>9} {result['worker_uss_mb']:>14.1f} "
+            f"{result['worker_pss_mb']:>14.1f} {result['total_pss_mb']:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
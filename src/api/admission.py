@@ -0,0 +1,145 @@
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator
+
+from src.api.executor import get_prediction_executor
+from src.config import settings
+from src.exceptions import ServiceOverloadedError, TooManyRequestsError
+from src.metrics import ADMITTED_REQUESTS, SHED_REQUESTS
+
+
+# pylint: disable=too-few-public-methods
+class TokenBucket:
+    """
+    Rate limiter refilled with 'rate' tokens per second up to 'burst' tokens,
+    each admitted request takes a token
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+
+    def try_acquire(self) -> bool:
+        """
+        Takes a token if there is one
+        """
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+class AdmissionController:
+    """
+    Admission control in front of the recommendations
+    Requests exceeding the global or per-client rate are rejected with 429,
+    online scoring exceeding the global or per-client concurrency or arriving
+    when 'admission_max_queue_depth' predictions are pending is shed with 503,
+    so cached and materialized recommendations keep being served under overload
+    Limits set to 0 are disabled
+    """
+
+    def __init__(self):
+        self._bucket: TokenBucket | None = None
+        self._client_buckets: dict[str, TokenBucket] = {}
+        self._n_running = 0
+        self._n_client_running: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def check_rate(self, client_id: str) -> None:
+        """
+        Takes the request into the rate limits of the client and of the service
+        Raises TooManyRequestsError if any of them is exceeded
+        """
+        with self._lock:
+            if settings.admission_client_rate_per_second > 0:
+                if client_id not in self._client_buckets:
+                    self._client_buckets[client_id] = TokenBucket(
+                        settings.admission_client_rate_per_second, settings.admission_client_burst
+                    )
+                if not self._client_buckets[client_id].try_acquire():
+                    SHED_REQUESTS.inc(reason="client_rate")
+                    raise TooManyRequestsError()
+            if settings.admission_rate_per_second > 0:
+                if self._bucket is None:
+                    self._bucket = TokenBucket(
+                        settings.admission_rate_per_second, settings.admission_burst
+                    )
+                if not self._bucket.try_acquire():
+                    SHED_REQUESTS.inc(reason="rate")
+                    raise TooManyRequestsError()
+
+    @contextmanager
+    def admit(self, client_id: str, model_name: str) -> Iterator[None]:
+        """
+        Admits prediction of the model for the duration of the context,
+        online scoring takes a place in the concurrency limits
+        Raises ServiceOverloadedError if the scoring is shed
+        """
+        if model_name in settings.materialized_models:
+            ADMITTED_REQUESTS.inc(path="materialized")
+            yield
+            return
+        self._acquire(client_id)
+        ADMITTED_REQUESTS.inc(path="scored")
+        try:
+            yield
+        finally:
+            self._release(client_id)
+
+    def get_running_count(self) -> int:
+        """
+        Returns number of admitted online scoring requests in progress
+        """
+        with self._lock:
+            return self._n_running
+
+    def _acquire(self, client_id: str) -> None:
+        """
+        Reserves places of the request in the concurrency limits
+        """
+        if 0 < settings.admission_max_queue_depth <= get_queue_depth():
+            SHED_REQUESTS.inc(reason="queue_depth")
+            raise ServiceOverloadedError()
+        with self._lock:
+            n_client_running = self._n_client_running.get(client_id, 0)
+            if 0 < settings.admission_client_max_concurrency <= n_client_running:
+                SHED_REQUESTS.inc(reason="client_concurrency")
+                raise ServiceOverloadedError()
+            if 0 < settings.admission_max_concurrency <= self._n_running:
+                SHED_REQUESTS.inc(reason="concurrency")
+                raise ServiceOverloadedError()
+            self._n_running += 1
+            self._n_client_running[client_id] = n_client_running + 1
+
+    def _release(self, client_id: str) -> None:
+        """
+        Frees places of the request in the concurrency limits
+        """
+        with self._lock:
+            self._n_running -= 1
+            self._n_client_running[client_id] -= 1
+            if not self._n_client_running[client_id]:
+                del self._n_client_running[client_id]
+
+
+def get_queue_depth() -> int:
+    """
+    Returns number of running and queued predictions of all models
+    """
+    return sum(get_prediction_executor().get_pending_counts().values())
+
+
+@lru_cache(maxsize=None)
+def get_admission_controller() -> AdmissionController:
+    """
+    Returns admission controller shared within the process
+    """
+    return AdmissionController()
@@ -0,0 +1,87 @@
+import asyncio
+from functools import lru_cache
+from typing import Callable
+
+from src.api.executor import get_prediction_executor
+from src.config import settings
+from src.metrics import MICRO_BATCH_SIZE
+from src.recommenders.base_recommender import BaseRecommender
+
+
+# pylint: disable=too-few-public-methods
+class MicroBatcher:
+    """
+    Collects single-user predictions of the model arriving within a short window
+    and runs them as one batch prediction, so the model scores them
+    with a single stacked search, forward or matmul
+    """
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._pending: list[tuple[int, asyncio.Future]] = []
+        self._get_recommender: Callable[[], BaseRecommender] | None = None
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def predict(
+        self, get_recommender: Callable[[], BaseRecommender], user_id: int
+    ) -> list[int]:
+        """
+        Returns list of item IDs recommended to the user with id 'user_id'
+        The prediction is delayed by at most 'micro_batch_window_ms'
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self._pending:
+            self._get_recommender = get_recommender
+        self._pending.append((user_id, future))
+        if len(self._pending) >= settings.micro_batch_max_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(settings.micro_batch_window_ms / 1000, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        """
+        Starts batch prediction of the collected requests
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        if not pending or self._get_recommender is None:
+            return
+        MICRO_BATCH_SIZE.observe(len(pending), model_name=self.model_name)
+        task = asyncio.ensure_future(self._predict_batch(self._get_recommender, pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _predict_batch(
+        self,
+        get_recommender: Callable[[], BaseRecommender],
+        pending: list[tuple[int, asyncio.Future]],
+    ) -> None:
+        """
+        Predicts the collected requests and passes the results to them
+        """
+        user_ids = [user_id for user_id, _ in pending]
+        try:
+            items = await get_prediction_executor().run(
+                self.model_name, get_recommender, "predict_batch", user_ids
+            )
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future), user_items in zip(pending, items):
+            if not future.done():
+                future.set_result(user_items)
+
+
+@lru_cache(maxsize=None)
+def get_micro_batcher(model_name: str) -> MicroBatcher:
+    """
+    Returns micro-batcher of the model shared within the process
+    """
+    return MicroBatcher(model_name)
@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+from src.config import settings
+from src.metrics import RESPONSE_CACHE_EVICTIONS, RESPONSE_CACHE_HITS, RESPONSE_CACHE_MISSES
+from src.recommenders.base_recommender import BaseRecommender
+
+ENTRY_OVERHEAD_BYTES = 256
+
+CacheKey = tuple[str, str, int]
+
+
+class ResponseCache:
+    """
+    LRU cache of the recommendations with expiration and memory budget
+    Keys include the artefact version of the model, so entries of a reloaded model
+    are never returned and are evicted as the least recently used,
+    the latest entry of each user stays available to degraded responses,
+    expired entries are not returned by 'get' but are kept until evicted or replaced
+    """
+
+    def __init__(self):
+        self._entries: OrderedDict[CacheKey, tuple[np.ndarray, float]] = OrderedDict()
+        self._latest_keys: dict[tuple[str, int], CacheKey] = {}
+        self._memory_usage = 0
+        self._lock = threading.Lock()
+
+    def get(self, model_name: str, artefact_version: str, user_id: int) -> list[int] | None:
+        """
+        Returns cached recommendations for the user or None
+        """
+        key = (model_name, artefact_version, user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                RESPONSE_CACHE_MISSES.inc(model_name=model_name)
+                return None
+            self._entries.move_to_end(key)
+        RESPONSE_CACHE_HITS.inc(model_name=model_name)
+        return entry[0].tolist()
+
+    def get_stale(self, model_name: str, user_id: int) -> list[int] | None:
+        """
+        Returns the latest cached recommendations for the user or None
+        regardless of their artefact version and expiration
+        """
+        with self._lock:
+            key = self._latest_keys.get((model_name, user_id))
+            if key is None:
+                return None
+            return self._entries[key][0].tolist()
+
+    def put(self, model_name: str, artefact_version: str, user_id: int, items: list[int]) -> None:
+        """
+        Caches recommendations for the user
+        The least recently used entries are evicted to satisfy the memory budget
+        """
+        key = (model_name, artefact_version, user_id)
+        entry = (
+            np.array(items, dtype=np.int64),
+            time.monotonic() + settings.response_cache_ttl_seconds,
+        )
+        memory_budget = settings.response_cache_memory_mb * 1024**2
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._latest_keys[(model_name, user_id)] = key
+            self._memory_usage += get_entry_size(entry[0])
+            while self._entries and self._memory_usage > memory_budget:
+                self._remove(next(iter(self._entries)), "memory")
+
+    def get_memory_usage(self) -> int:
+        """
+        Returns the estimated number of bytes occupied by the entries
+        """
+        with self._lock:
+            return self._memory_usage
+
+    def clear(self) -> None:
+        """
+        Removes all entries
+        """
+        with self._lock:
+            self._entries.clear()
+            self._latest_keys.clear()
+            self._memory_usage = 0
+
+    def _remove(self, key: CacheKey, reason: str | None = None) -> None:
+        """
+        Removes the entry and counts its eviction for the reason
+        Must be called under the cache lock
+        """
+        items, _ = self._entries.pop(key)
+        self._memory_usage -= get_entry_size(items)
+        if self._latest_keys.get((key[0], key[2])) == key:
+            del self._latest_keys[(key[0], key[2])]
+        if reason is not None:
+            RESPONSE_CACHE_EVICTIONS.inc(model_name=key[0], reason=reason)
+
+
+@lru_cache(maxsize=None)
+def get_response_cache() -> ResponseCache:
+    """
+    Returns response cache shared within the process
+    """
+    return ResponseCache()
+
+
+def get_entry_size(items: np.ndarray) -> int:
+    """
+    Returns the estimated number of bytes occupied by the cache entry
+    """
+    return ENTRY_OVERHEAD_BYTES + items.nbytes
+
+
+def is_cacheable(recommender: BaseRecommender) -> bool:
+    """
+    Checks whether the recommendations of the recommender may be cached
+    """
+    return (
+        recommender.CACHEABLE
+        and settings.response_cache_memory_mb > 0
+        and recommender.MODEL_NAME not in settings.response_cache_disabled_models
+    )
@@ -0,0 +1,94 @@
+import asyncio
+import json
+from functools import lru_cache
+from typing import Any, Awaitable
+
+from src.api.cache import get_response_cache
+from src.config import settings
+from src.metrics import DEGRADED_RESPONSES
+from src.recommenders.artefact_store import get_artefact_store
+
+TOP_ITEMS_FILE = "top_items.json"
+
+_background_tasks: set[asyncio.Task] = set()
+
+
+def get_deadline_seconds(model_name: str, deadline_ms: float | None = None) -> float | None:
+    """
+    Returns latency budget of the request to the model in seconds
+    from 'deadline_ms' of the request, 'request_deadlines_ms' of the model
+    or 'default_request_deadline_ms', None if the request is not limited
+    """
+    if deadline_ms is None and model_name in settings.request_deadlines_ms:
+        deadline_ms = settings.request_deadlines_ms[model_name]
+    if deadline_ms is None:
+        deadline_ms = settings.default_request_deadline_ms
+    return deadline_ms / 1000 if deadline_ms > 0 else None
+
+
+async def run_with_deadline(
+    awaitable: Awaitable, deadline_seconds: float | None
+) -> tuple[Any, bool]:
+    """
+    Waits for the result until the deadline and returns it with flag whether
+    the deadline is missed, in that case the result is None, None deadline waits forever
+    The prediction is not interrupted and finishes in the background,
+    so the response cache and the model being loaded are ready for the next requests
+    """
+    if deadline_seconds is None:
+        return await awaitable, False
+    task = asyncio.ensure_future(awaitable)
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), deadline_seconds), False
+    except asyncio.TimeoutError:
+        return None, True
+    finally:
+        if not task.done():
+            _background_tasks.add(task)
+            task.add_done_callback(finish_background_task)
+
+
+def finish_background_task(task: asyncio.Task) -> None:
+    """
+    Forgets the prediction finished after its request and consumes its exception
+    """
+    _background_tasks.discard(task)
+    if not task.cancelled():
+        task.exception()
+
+
+def get_degraded_recommendations(model_name: str, user_id: int) -> list[int]:
+    """
+    Returns recommendations for the user whose request missed the deadline:
+    the previous answer of the model from the response cache, even outdated,
+    or popular items
+    """
+    items = get_response_cache().get_stale(model_name, user_id)
+    if items is not None:
+        DEGRADED_RESPONSES.inc(model_name=model_name, fallback="cached")
+        return items
+    DEGRADED_RESPONSES.inc(model_name=model_name, fallback="popular")
+    return get_popular_items()
+
+
+def get_popular_items() -> list[int]:
+    """
+    Returns the current popular items, empty list if there are none
+    """
+    store = get_artefact_store()
+    try:
+        return list(
+            load_popular_items(store.get_path(TOP_ITEMS_FILE), store.get_version([TOP_ITEMS_FILE]))
+        )
+    except OSError:
+        return []
+
+
+@lru_cache(maxsize=4)
+def load_popular_items(path: str, artefact_version: str) -> tuple[int, ...]:
+    """
+    Reads popular items trimmed to 'n_returned_items', read once per artefact version
+    """
+    # pylint: disable=unused-argument
+    with open(path, "r", encoding="utf-8") as f:
+        return tuple(json.load(f)["items"][: settings.n_returned_items])
@@ -1,6 +1,8 @@
-from fastapi import Path
+from fastapi import Header, Path, Query, Request
 
-from src.exceptions import UserNotFoundError
+from src.api.schemas import BatchRecommendationRequest
+from src.config import settings
+from src.exceptions import BatchTooLargeError, UserNotFoundError
 from src.recommenders.base_recommender import BaseRecommender
 from src.recommenders.two_stage_recommender import TwoStageRecommender
 
@@ -15,6 +17,52 @@ def get_user_id(user_id: int = Path()) -> int:
     return user_id
 
 
+def get_user_ids(batch: BatchRecommendationRequest) -> list[int]:
+    """
+    Extracts user IDs from the request body
+    Checks for the batch size and the correctness of the values
+    """
+    if len(batch.user_ids) > settings.max_batch_size:
+        raise BatchTooLargeError()
+    if any(user_id > 10**9 for user_id in batch.user_ids):
+        raise UserNotFoundError()
+    return batch.user_ids
+
+
+def is_profiled(
+    profile: bool = Query(False, description="return timings of the prediction stages"),
+    x_profile: bool = Header(False),
+) -> bool:
+    """
+    Checks whether the request asks for timings of the prediction stages
+    with 'profile' query flag or 'X-Profile' header
+    """
+    return profile or x_profile
+
+
+def get_deadline_ms(
+    x_deadline_ms: float | None = Header(None, description="latency budget of the request"),
+) -> float | None:
+    """
+    Extracts latency budget of the request in milliseconds from 'X-Deadline-Ms' header,
+    0 disables the deadline
+    """
+    return x_deadline_ms
+
+
+def get_client_id(
+    request: Request,
+    x_client_id: str | None = Header(None, description="identity of the client"),
+) -> str:
+    """
+    Extracts identity of the client sharing the admission limits from 'X-Client-Id' header,
+    requests without it are identified by the client address
+    """
+    if x_client_id:
+        return x_client_id
+    return request.client.host if request.client is not None else ""
+
+
 def get_actual_recommender() -> BaseRecommender:
     """
     Gets actual recommender (for bot ddos)
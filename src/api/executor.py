@@ -0,0 +1,176 @@
+import asyncio
+import contextvars
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache, partial
+from typing import Any, Callable
+
+from src.config import settings
+from src.exceptions import ServiceOverloadedError
+from src.profiling import get_sampled_profiler
+from src.recommenders.base_recommender import BaseRecommender
+from src.recommenders.recommender_register import RecommenderRegister
+
+
+class PredictionExecutor:
+    """
+    Runs CPU-bound predictions off the event loop
+    Each model gets its own thread pool limited by the model concurrency,
+    models listed in 'process_pool_models' share a pool of processes
+    Requests exceeding the concurrency and the queue size of the model are rejected
+    """
+
+    def __init__(self):
+        self._thread_pools: dict[str, ThreadPoolExecutor] = {}
+        self._process_pool: ProcessPoolExecutor | None = None
+        self._n_pending: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    async def run(
+        self,
+        model_name: str,
+        get_recommender: Callable[[], BaseRecommender],
+        method_name: str,
+        *args: Any,
+    ) -> Any:
+        """
+        Calls method 'method_name' of the recommender 'model_name' with 'args'
+        in the pool of the model, threads run in a copy of the current context
+        Raises ServiceOverloadedError if the model queue is full
+        """
+        if model_name in settings.process_pool_models:
+            pool = self._get_process_pool()
+            call = partial(call_registered_recommender, model_name, method_name, *args)
+        else:
+            pool = self._get_thread_pool(model_name)
+            call = partial(
+                contextvars.copy_context().run,
+                call_recommender,
+                get_recommender,
+                method_name,
+                *args,
+            )
+        self._acquire(model_name)
+        try:
+            future = pool.submit(call)
+        except BaseException:
+            self._release(model_name)
+            raise
+        future.add_done_callback(lambda _: self._release(model_name))
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            self._discard_process_pool(pool)
+            raise
+
+    def get_pending_counts(self) -> dict[str, int]:
+        """
+        Returns number of running and queued predictions of each model
+        """
+        with self._lock:
+            return dict(self._n_pending)
+
+    def shutdown(self) -> None:
+        """
+        Stops all pools
+        """
+        with self._lock:
+            pools: list[Executor] = list(self._thread_pools.values())
+            if self._process_pool is not None:
+                pools.append(self._process_pool)
+            self._thread_pools.clear()
+            self._process_pool = None
+        for pool in pools:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _acquire(self, model_name: str) -> None:
+        """
+        Reserves a place in the model queue
+        """
+        max_pending = get_model_concurrency(model_name) + settings.prediction_queue_size
+        with self._lock:
+            n_pending = self._n_pending.get(model_name, 0)
+            if n_pending >= max_pending:
+                raise ServiceOverloadedError()
+            self._n_pending[model_name] = n_pending + 1
+
+    def _release(self, model_name: str) -> None:
+        """
+        Frees a place in the model queue
+        """
+        with self._lock:
+            self._n_pending[model_name] -= 1
+
+    def _get_thread_pool(self, model_name: str) -> ThreadPoolExecutor:
+        """
+        Returns thread pool of the model
+        """
+        with self._lock:
+            if model_name not in self._thread_pools:
+                self._thread_pools[model_name] = ThreadPoolExecutor(
+                    max_workers=get_model_concurrency(model_name),
+                    thread_name_prefix=f"predict-{model_name}",
+                )
+            return self._thread_pools[model_name]
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        """
+        Returns pool of processes shared by the models
+        listed in 'process_pool_models'
+        """
+        with self._lock:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=settings.process_pool_size,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._process_pool
+
+    def _discard_process_pool(self, pool: Executor) -> None:
+        """
+        Forgets the broken pool of processes, so the next call starts a new one
+        """
+        with self._lock:
+            if self._process_pool is pool:
+                self._process_pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache(maxsize=None)
+def get_prediction_executor() -> PredictionExecutor:
+    """
+    Returns prediction executor shared within the process
+    """
+    return PredictionExecutor()
+
+
+def get_model_concurrency(model_name: str) -> int:
+    """
+    Returns maximum number of concurrent predictions of the model
+    """
+    if model_name in settings.prediction_concurrency:
+        return settings.prediction_concurrency[model_name]
+    return settings.default_prediction_concurrency
+
+
+def call_recommender(
+    get_recommender: Callable[[], BaseRecommender], method_name: str, *args: Any
+) -> Any:
+    """
+    Calls method of the recommender, sampled calls are profiled
+    """
+    recommender = get_recommender()
+    return get_sampled_profiler().call(
+        recommender.MODEL_NAME, getattr(recommender, method_name), *args
+    )
+
+
+def call_registered_recommender(model_name: str, method_name: str, *args: Any) -> Any:
+    """
+    Calls method of the recommender loaded by the register of the current process
+    """
+    return call_recommender(
+        partial(RecommenderRegister.get_recommender_by_model_name, model_name), method_name, *args
+    )
@@ -0,0 +1,49 @@
+import time
+
+from src.metrics import REQUEST_DURATION
+from src.recommenders.recommender_register import RecommenderRegister
+
+
+# pylint: disable=too-few-public-methods
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware observing end-to-end duration of HTTP requests
+    labelled by route template, model name and status code
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start_time = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            REQUEST_DURATION.observe(
+                time.perf_counter() - start_time,
+                route=getattr(route, "path", "unmatched"),
+                model_name=get_model_label(scope.get("path_params", {}).get("model_name", "")),
+                status=str(status),
+            )
+
+
+def get_model_label(model_name: str) -> str:
+    """
+    Returns model name for metric labels, unknown names are replaced
+    so that arbitrary paths do not create new series
+    """
+    if not model_name:
+        return ""
+    return model_name if model_name in RecommenderRegister.get_model_names() else "unknown"
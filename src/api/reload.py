@@ -0,0 +1,134 @@
+import logging
+import threading
+from functools import lru_cache
+
+from starlette.datastructures import State
+
+from src.api.warmup import warm_up_recommender
+from src.config import settings
+from src.exceptions import ModelNotFoundError, ModelReloadError
+from src.metrics import MODEL_RELOADS
+from src.recommenders.artefact_store import get_artefact_store
+from src.recommenders.base_recommender import BaseRecommender
+from src.recommenders.recommender_register import RecommenderRegister
+
+logger = logging.getLogger(__name__)
+
+
+class ArtefactsReloader:
+    """
+    Reloads recommenders from new artefacts without restarting the service
+    The new instance is loaded and warmed up in the background and then swapped in,
+    requests keep being answered by the previous instance until the swap
+    With 'artefacts_reload_interval_seconds' the artefacts of the resident recommenders
+    are polled for changes, a change is applied once it stays the same between two polls,
+    so artefacts that are still being copied are not loaded
+    """
+
+    def __init__(self):
+        self._state: State | None = None
+        self._seen_versions: dict[str, str] = {}
+        self._failed_versions: dict[str, str] = {}
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self, state: State | None = None) -> None:
+        """
+        Starts polling of the artefacts if 'artefacts_reload_interval_seconds' is set,
+        the recommender preloaded into 'state' is reloaded as well
+        """
+        self._state = state
+        if settings.artefacts_reload_interval_seconds <= 0 or self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._watch, name="artefacts-reload", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops polling of the artefacts
+        """
+        self._stopped.set()
+        self._thread = None
+
+    def reload(self, model_name: str) -> tuple[BaseRecommender, str | None]:
+        """
+        Reloads the recommender from the current artefacts
+        Returns the new instance and the artefact version of the replaced one
+        Raises ModelReloadError if the new instance fails to load or warm up
+        """
+        previous = self._get_serving_recommenders().get(model_name)
+        previous_version = previous.get_artefact_version() if previous is not None else None
+        del previous
+        try:
+            recommender = RecommenderRegister.reload_recommender(model_name, warm_up_recommender)
+        except ModelNotFoundError:
+            raise
+        except Exception as exc:
+            MODEL_RELOADS.inc(model_name=model_name, status="failed")
+            logger.exception("Reload of model %s failed, the previous version is kept", model_name)
+            raise ModelReloadError() from exc
+        state_recommender = getattr(self._state, "recommender", None)
+        if state_recommender is not None and state_recommender.MODEL_NAME == model_name:
+            self._state.recommender = recommender
+        MODEL_RELOADS.inc(model_name=model_name, status="swapped")
+        logger.info(
+            "Model %s reloaded, artefact version %s -> %s",
+            model_name,
+            previous_version,
+            recommender.get_artefact_version(),
+        )
+        return recommender, previous_version
+
+    def check(self) -> list[str]:
+        """
+        Reloads the serving recommenders whose artefacts have changed since they were loaded
+        and stayed the same since the previous check
+        Returns names of the reloaded models
+        """
+        reloaded = []
+        for model_name, recommender in self._get_serving_recommenders().items():
+            version = get_artefact_store().get_version(recommender.ARTEFACT_FILES)
+            seen_version = self._seen_versions.get(model_name)
+            self._seen_versions[model_name] = version
+            if (
+                version == recommender.get_artefact_version()
+                or version != seen_version
+                or version == self._failed_versions.get(model_name)
+            ):
+                continue
+            try:
+                self.reload(model_name)
+            except ModelReloadError:
+                self._failed_versions[model_name] = version
+                continue
+            reloaded.append(model_name)
+        return reloaded
+
+    def _get_serving_recommenders(self) -> dict[str, BaseRecommender]:
+        """
+        Returns the resident recommenders and the one preloaded into the state
+        """
+        recommenders = RecommenderRegister.get_resident_recommenders()
+        state_recommender = getattr(self._state, "recommender", None)
+        if state_recommender is not None:
+            recommenders[state_recommender.MODEL_NAME] = state_recommender
+        return recommenders
+
+    def _watch(self) -> None:
+        """
+        Polls the artefacts until the reloader is stopped
+        """
+        while not self._stopped.wait(settings.artefacts_reload_interval_seconds):
+            try:
+                self.check()
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Check of the artefacts failed")
+
+
+@lru_cache(maxsize=None)
+def get_artefacts_reloader() -> ArtefactsReloader:
+    """
+    Returns reloader of the artefacts shared within the process
+    """
+    return ArtefactsReloader()
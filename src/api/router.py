@@ -1,17 +1,137 @@
+import asyncio
+import time
+from functools import partial
+
 from fastapi import APIRouter, Depends, Header, Path, Request
+from fastapi.responses import PlainTextResponse
 
+from src.api.admission import get_admission_controller
 from src.api.auth import check_authorization_token
-from src.api.dependencies import get_user_id
+from src.api.batcher import get_micro_batcher
+from src.api.cache import get_response_cache, is_cacheable
+from src.api.deadline import get_deadline_seconds, get_degraded_recommendations, run_with_deadline
+from src.api.dependencies import (
+    get_client_id,
+    get_deadline_ms,
+    get_user_id,
+    get_user_ids,
+    is_profiled,
+)
+from src.api.executor import get_prediction_executor
+from src.api.reload import get_artefacts_reloader
+from src.api.warmup import get_models_warm_up
 from src.api.schemas import (
+    ArtefactResidency,
+    ArtefactsResidencyResponse,
+    BatchRecommendationResponse,
     ErrorMessage,
     HealthCheckResponse,
+    ModelReloadResponse,
+    ReadinessResponse,
+    RecommendationProfile,
+    ResidentModel,
+    ResidentModelsResponse,
     UserRecommendationResponse,
 )
+from src.config import settings
+from src.exceptions import ServiceNotReadyError
+from src.metrics import ADMITTED_REQUESTS, registry
+from src.profiling import capture_stage_durations
+from src.recommenders.artefact_store import get_artefact_store
+from src.recommenders.base_recommender import BaseRecommender
 from src.recommenders.recommender_register import RecommenderRegister
 
 router = APIRouter()
 
 
+def get_recommender(request: Request, model_name: str) -> BaseRecommender:
+    """
+    Returns the preloaded recommender or the one from the register
+    """
+    recommender = get_resident_recommender(request, model_name)
+    if recommender is None:
+        recommender = RecommenderRegister.get_recommender_by_model_name(model_name)
+    return recommender
+
+
+def get_resident_recommender(request: Request, model_name: str) -> BaseRecommender | None:
+    """
+    Returns the preloaded recommender or the one resident in the register
+    without loading it
+    """
+    if (
+        hasattr(request.app.state, "recommender")
+        and request.app.state.recommender.MODEL_NAME == model_name
+    ):
+        return request.app.state.recommender
+    return RecommenderRegister.get_resident_recommender(model_name)
+
+
+async def predict(request: Request, model_name: str, user_id: int, client_id: str) -> list[int]:
+    """
+    Returns recommendations for the user from the response cache
+    or predicts them if they are missing
+    """
+    recommender = get_resident_recommender(request, model_name)
+    if recommender is None or not is_cacheable(recommender):
+        return await predict_uncached(request, model_name, user_id, client_id)
+    artefact_version = recommender.get_artefact_version()
+    items = get_response_cache().get(model_name, artefact_version, user_id)
+    if items is None:
+        items = await predict_uncached(request, model_name, user_id, client_id)
+        get_response_cache().put(model_name, artefact_version, user_id, items)
+    else:
+        ADMITTED_REQUESTS.inc(path="cached")
+    return items
+
+
+async def predict_uncached(
+    request: Request, model_name: str, user_id: int, client_id: str
+) -> list[int]:
+    """
+    Predicts recommendations for the user off the event loop if admission control admits it,
+    concurrent requests to the models with micro-batching are predicted together
+    """
+    get_model = partial(get_recommender, request, model_name)
+    with get_admission_controller().admit(client_id, model_name):
+        if model_name in settings.micro_batching_models:
+            return await get_micro_batcher(model_name).predict(get_model, user_id)
+        return await get_prediction_executor().run(model_name, get_model, "predict", user_id)
+
+
+async def predict_batch(
+    request: Request, model_name: str, user_ids: list[int], client_id: str
+) -> list[list[int]]:
+    """
+    Predicts recommendations for the users off the event loop if admission control admits it
+    """
+    with get_admission_controller().admit(client_id, model_name):
+        return await get_prediction_executor().run(
+            model_name, partial(get_recommender, request, model_name), "predict_batch", user_ids
+        )
+
+
+async def predict_profiled(
+    request: Request, model_name: str, user_id: int, client_id: str
+) -> tuple[list[int], RecommendationProfile]:
+    """
+    Predicts recommendations for the user bypassing the response cache and micro-batching
+    and measures the durations of the prediction stages
+    """
+    start_time = time.perf_counter()
+    with get_admission_controller().admit(
+        client_id, model_name
+    ), capture_stage_durations() as durations:
+        items = await get_prediction_executor().run(
+            model_name, partial(get_recommender, request, model_name), "predict", user_id
+        )
+    profile = RecommendationProfile(
+        total_ms=(time.perf_counter() - start_time) * 1000,
+        stages_ms={stage: duration * 1000 for stage, duration in durations.items()},
+    )
+    return items, profile
+
+
 @router.get("/health", tags=["Health"], response_model=HealthCheckResponse)
 async def health_check():
     """
@@ -20,29 +140,204 @@ async def health_check():
     return HealthCheckResponse()
 
 
+@router.get(
+    "/ready",
+    tags=["Health"],
+    response_model=ReadinessResponse,
+    responses={503: {"model": ErrorMessage}},
+)
+async def readiness_check():
+    """
+    Checks if the service has finished warm-up of the models and is ready for requests
+    """
+    warm_up = get_models_warm_up()
+    if not warm_up.is_ready():
+        raise ServiceNotReadyError()
+    return ReadinessResponse(load_seconds=warm_up.get_load_seconds())
+
+
+@router.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Returns metrics of the service in Prometheus text format
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @router.get(
     "/reco/{model_name}/{user_id}",
     tags=["Recommendations"],
     response_model=UserRecommendationResponse,
-    responses={401: {"model": ErrorMessage}, 404: {"model": ErrorMessage}},
+    response_model_exclude_none=True,
+    responses={
+        401: {"model": ErrorMessage},
+        404: {"model": ErrorMessage},
+        429: {"model": ErrorMessage},
+        503: {"model": ErrorMessage},
+    },
 )
-async def get_recommendations(
+async def get_recommendations(  # pylint: disable=too-many-arguments
     request: Request,
     model_name: str = Path(),
     user_id: int = Depends(get_user_id),
     authorization: str = Header(None),
+    profiled: bool = Depends(is_profiled),
+    deadline_ms: float | None = Depends(get_deadline_ms),
+    client_id: str = Depends(get_client_id),
 ):
     """
     Generates models recommendations with name
     'model_name' for a user with id 'user_id'
+    Authorized requests with 'profile' query flag or 'X-Profile' header
+    also get timings of the prediction stages
+    Requests missing the deadline get degraded recommendations,
+    requests over the limits of admission control are rejected
     """
     check_authorization_token(authorization)
-    if (
-        hasattr(request.app.state, "recommender")
-        and request.app.state.recommender.MODEL_NAME == model_name
-    ):
-        recommender = request.app.state.recommender
-    else:
-        recommender = RecommenderRegister.get_recommender_by_model_name(model_name)
-    items = recommender.predict(user_id)
+    RecommenderRegister.check_model_name(model_name)
+    get_admission_controller().check_rate(client_id)
+    if profiled:
+        items, recommendation_profile = await predict_profiled(
+            request, model_name, user_id, client_id
+        )
+        return UserRecommendationResponse(
+            user_id=user_id, items=items, profile=recommendation_profile
+        )
+    items, missed_deadline = await run_with_deadline(
+        predict(request, model_name, user_id, client_id),
+        get_deadline_seconds(model_name, deadline_ms),
+    )
+    if missed_deadline:
+        return UserRecommendationResponse(
+            user_id=user_id,
+            items=get_degraded_recommendations(model_name, user_id),
+            degraded=True,
+        )
     return UserRecommendationResponse(user_id=user_id, items=items)
+
+
+@router.post(
+    "/reco/{model_name}/batch",
+    tags=["Recommendations"],
+    response_model=BatchRecommendationResponse,
+    responses={
+        401: {"model": ErrorMessage},
+        404: {"model": ErrorMessage},
+        413: {"model": ErrorMessage},
+        429: {"model": ErrorMessage},
+        503: {"model": ErrorMessage},
+    },
+)
+async def get_batch_recommendations(  # pylint: disable=too-many-arguments
+    request: Request,
+    model_name: str = Path(),
+    user_ids: list[int] = Depends(get_user_ids),
+    authorization: str = Header(None),
+    deadline_ms: float | None = Depends(get_deadline_ms),
+    client_id: str = Depends(get_client_id),
+):
+    """
+    Generates models recommendations with name
+    'model_name' for users with ids 'user_ids'
+    Requests missing the deadline get degraded recommendations,
+    requests over the limits of admission control are rejected
+    """
+    check_authorization_token(authorization)
+    RecommenderRegister.check_model_name(model_name)
+    get_admission_controller().check_rate(client_id)
+    items, missed_deadline = await run_with_deadline(
+        predict_batch(request, model_name, user_ids, client_id),
+        get_deadline_seconds(model_name, deadline_ms),
+    )
+    if missed_deadline:
+        return BatchRecommendationResponse(
+            recommendations=[
+                UserRecommendationResponse(
+                    user_id=user_id,
+                    items=get_degraded_recommendations(model_name, user_id),
+                    degraded=True,
+                )
+                for user_id in user_ids
+            ]
+        )
+    return BatchRecommendationResponse(
+        recommendations=[
+            UserRecommendationResponse(user_id=user_id, items=user_items)
+            for user_id, user_items in zip(user_ids, items)
+        ]
+    )
+
+
+@router.get(
+    "/models",
+    tags=["Models"],
+    response_model=ResidentModelsResponse,
+    responses={401: {"model": ErrorMessage}},
+)
+async def get_resident_models(authorization: str = Header(None)):
+    """
+    Returns models loaded into memory with their memory usage
+    ordered from the least to the most recently used
+    """
+    check_authorization_token(authorization)
+    memory_usages = RecommenderRegister.get_memory_usages()
+    return ResidentModelsResponse(
+        models=[
+            ResidentModel(model_name=model_name, memory_bytes=memory_bytes)
+            for model_name, memory_bytes in memory_usages.items()
+        ],
+        total_memory_bytes=sum(memory_usages.values()),
+        memory_budget_bytes=settings.models_memory_budget_mb * 1024**2,
+    )
+
+
+@router.post(
+    "/models/{model_name}/reload",
+    tags=["Models"],
+    response_model=ModelReloadResponse,
+    responses={
+        401: {"model": ErrorMessage},
+        404: {"model": ErrorMessage},
+        500: {"model": ErrorMessage},
+    },
+)
+async def reload_model(model_name: str = Path(), authorization: str = Header(None)):
+    """
+    Reloads the model from the current artefacts without interrupting its requests,
+    the new instance is swapped in after it is loaded and warmed up
+    """
+    check_authorization_token(authorization)
+    RecommenderRegister.get_recommender_class(model_name)
+    start_time = time.perf_counter()
+    recommender, previous_version = await asyncio.to_thread(
+        get_artefacts_reloader().reload, model_name
+    )
+    return ModelReloadResponse(
+        model_name=model_name,
+        artefact_version=recommender.get_artefact_version(),
+        previous_artefact_version=previous_version,
+        reload_seconds=time.perf_counter() - start_time,
+    )
+
+
+@router.get(
+    "/artefacts",
+    tags=["Models"],
+    response_model=ArtefactsResidencyResponse,
+    responses={401: {"model": ErrorMessage}},
+)
+async def get_artefacts_residency(authorization: str = Header(None)):
+    """
+    Returns how much of each memory-mapped artefact is resident in the page cache
+    """
+    check_authorization_token(authorization)
+    return ArtefactsResidencyResponse(
+        artefacts=[
+            ArtefactResidency(
+                file_name=file_name, resident_bytes=resident_bytes, total_bytes=total_bytes
+            )
+            for file_name, (resident_bytes, total_bytes) in sorted(
+                get_artefact_store().get_residency().items()
+            )
+        ]
+    )
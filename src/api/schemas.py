@@ -9,6 +9,26 @@ class HealthCheckResponse(BaseModel):
     status: str = "ok"
 
 
+class ReadinessResponse(BaseModel):
+    """
+    Response scheme for checking the readiness of the service
+    with load time in seconds of the warmed up models
+    """
+
+    status: str = "ready"
+    load_seconds: dict[str, float] = {}
+
+
+class RecommendationProfile(BaseModel):
+    """
+    The scheme of the timings of the profiled recommendation request in milliseconds,
+    stages are measured for the models predicting in the threads of the service
+    """
+
+    total_ms: float
+    stages_ms: dict[str, float]
+
+
 class UserRecommendationResponse(BaseModel):
     """
     The scheme of the recommendations response for the user
@@ -16,6 +36,72 @@ class UserRecommendationResponse(BaseModel):
 
     user_id: int
     items: list[int]
+    degraded: bool | None = None
+    profile: RecommendationProfile | None = None
+
+
+class BatchRecommendationRequest(BaseModel):
+    """
+    The scheme of the request of recommendations for several users
+    """
+
+    user_ids: list[int]
+
+
+class BatchRecommendationResponse(BaseModel):
+    """
+    The scheme of the recommendations response for several users
+    """
+
+    recommendations: list[UserRecommendationResponse]
+
+
+class ResidentModel(BaseModel):
+    """
+    The scheme of the model loaded into memory
+    """
+
+    model_name: str
+    memory_bytes: int
+
+
+class ResidentModelsResponse(BaseModel):
+    """
+    The scheme of the response with models loaded into memory
+    """
+
+    models: list[ResidentModel]
+    total_memory_bytes: int
+    memory_budget_bytes: int
+
+
+class ModelReloadResponse(BaseModel):
+    """
+    The scheme of the response with the model reloaded from new artefacts
+    """
+
+    model_name: str
+    artefact_version: str
+    previous_artefact_version: str | None = None
+    reload_seconds: float
+
+
+class ArtefactResidency(BaseModel):
+    """
+    The scheme of the memory-mapped artefact residency
+    """
+
+    file_name: str
+    resident_bytes: int
+    total_bytes: int
+
+
+class ArtefactsResidencyResponse(BaseModel):
+    """
+    The scheme of the response with residency of memory-mapped artefacts
+    """
+
+    artefacts: list[ArtefactResidency]
 
 
 class ErrorMessage(BaseModel):
@@ -0,0 +1,116 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+from src.config import settings
+from src.recommenders.base_recommender import BaseRecommender
+from src.recommenders.recommender_register import RecommenderRegister
+
+logger = logging.getLogger(__name__)
+
+
+class ModelsWarmUp:
+    """
+    Loads the models in parallel threads in the background and runs synthetic predictions,
+    so memory-mapped pages, lazy imports and BLAS/JIT state are warm before user requests
+    The service is ready when no warm-up is running
+    """
+
+    def __init__(self):
+        self._finished = threading.Event()
+        self._finished.set()
+        self._load_seconds: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def start(self, model_names: list[str]) -> None:
+        """
+        Starts warm-up of the models in a background thread
+        """
+        if not model_names:
+            return
+        self._finished.clear()
+        threading.Thread(target=self.run, args=(model_names,), name="warm-up", daemon=True).start()
+
+    def run(self, model_names: list[str]) -> None:
+        """
+        Warms up the models in parallel and marks the service as ready
+        """
+        try:
+            with ThreadPoolExecutor(
+                max_workers=len(model_names), thread_name_prefix="warm-up"
+            ) as pool:
+                list(pool.map(self.warm_up_model, model_names))
+        finally:
+            self._finished.set()
+
+    def warm_up_model(self, model_name: str) -> None:
+        """
+        Loads the model and predicts for a few of its users and an unknown user
+        Failures are logged, the model is then loaded on the first request
+        """
+        start_time = time.perf_counter()
+        try:
+            recommender = RecommenderRegister.get_recommender_by_model_name(model_name)
+            load_seconds = time.perf_counter() - start_time
+            warm_up_recommender(recommender)
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.exception("Warm-up of model %s failed", model_name)
+            return
+        with self._lock:
+            self._load_seconds[model_name] = load_seconds
+        logger.info(
+            "Model %s loaded in %.3f s, warmed up in %.3f s",
+            model_name,
+            load_seconds,
+            time.perf_counter() - start_time,
+        )
+
+    def is_ready(self) -> bool:
+        """
+        Checks whether warm-up is finished
+        """
+        return self._finished.is_set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """
+        Waits for warm-up to finish, returns whether it is finished
+        """
+        return self._finished.wait(timeout)
+
+    def get_load_seconds(self) -> dict[str, float]:
+        """
+        Returns load time in seconds of the warmed up models
+        """
+        with self._lock:
+            return dict(self._load_seconds)
+
+
+@lru_cache(maxsize=None)
+def get_models_warm_up() -> ModelsWarmUp:
+    """
+    Returns warm-up of the models shared within the process
+    """
+    return ModelsWarmUp()
+
+
+def warm_up_recommender(recommender: BaseRecommender) -> None:
+    """
+    Runs synthetic batch and single predictions for a few users of the recommender
+    """
+    user_ids = get_warm_up_user_ids(recommender.get_user_ids())
+    recommender.predict_batch(user_ids)
+    for user_id in user_ids:
+        recommender.predict(user_id)
+
+
+def get_warm_up_user_ids(user_ids: np.ndarray) -> list[int]:
+    """
+    Returns sampled known users and an unknown user for synthetic predictions
+    """
+    n_users = min(settings.warmup_predictions, len(user_ids))
+    sampled = np.random.default_rng(0).choice(user_ids, n_users, replace=False).tolist()
+    return sampled + [int(np.max(user_ids, initial=0)) + 1]
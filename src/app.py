@@ -3,7 +3,11 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 
+from src.api.executor import get_prediction_executor
+from src.api.middleware import RequestMetricsMiddleware
+from src.api.reload import get_artefacts_reloader
 from src.api.router import router
+from src.api.warmup import get_models_warm_up
 from src.exceptions import RecSysServiceError
 from src.api.dependencies import get_actual_recommender
 from src.config import settings, ModeEnum
@@ -12,14 +16,22 @@ from src.config import settings, ModeEnum
 @asynccontextmanager
 async def lifespan(application: FastAPI):
     """
-    Executes start actions
+    Executes start actions: preloads the actual recommender in production
+    unless the pre-fork master has done it,
+    starts warm-up of 'warmup_models' and polling of the artefacts in the background
     """
-    application.state.recommender = get_actual_recommender()
+    if settings.mode == ModeEnum.PRODUCTION and not hasattr(application.state, "recommender"):
+        application.state.recommender = get_actual_recommender()
+        application.state.recommender.get_artefact_version()
+    get_models_warm_up().start(settings.warmup_models)
+    get_artefacts_reloader().start(application.state)
     yield
+    get_artefacts_reloader().stop()
+    get_prediction_executor().shutdown()
 
 
 app = FastAPI(
-    lifespan=lifespan if settings.mode == ModeEnum.PRODUCTION else None,
+    lifespan=lifespan,
     title="Recommendation System Service",
     version="0.0.1",
     docs_url="/docs",
@@ -27,6 +39,7 @@ app = FastAPI(
 )
 
 app.include_router(router)
+app.add_middleware(RequestMetricsMiddleware)
 
 
 @app.exception_handler(RecSysServiceError)
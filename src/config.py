@@ -13,12 +13,105 @@ class ModeEnum(str, Enum):
     PRODUCTION = "prod"
 
 
+class AutoEncoderInferenceEnum(str, Enum):
+    """
+    Variant of AutoEncoder decoder used for inference
+    """
+
+    FLOAT = "float"
+    INT8 = "int8"
+    TORCHSCRIPT = "torchscript"
+
+
+class ViewedFilterEnum(str, Enum):
+    """
+    Strategy of excluding viewed items from ANN search results
+    """
+
+    OVERFETCH = "overfetch"
+    BITMAP = "bitmap"
+    BATCH = "batch"
+
+
+class RankFusionEnum(str, Enum):
+    """
+    Method of merging ranked recommendations of the ensemble sub-models
+    """
+
+    RRF = "rrf"
+    LINEAR = "linear"
+
+
 class Settings(BaseSettings):
     """Settings for the service"""
 
     mode: ModeEnum = Field(alias="MODE", default=ModeEnum.TEST)
     token: str = Field(alias="TOKEN", default="TEST_TOKEN")
     n_returned_items: int = Field(alias="N_RETURNED_ITEMS", default=10)
+    viewed_overfetch_factor: float = Field(alias="VIEWED_OVERFETCH_FACTOR", default=1.0)
+    ann_viewed_filter: ViewedFilterEnum = Field(
+        alias="ANN_VIEWED_FILTER", default=ViewedFilterEnum.OVERFETCH
+    )
+    max_batch_size: int = Field(alias="MAX_BATCH_SIZE", default=1000)
+    artefacts_dir: str = Field(alias="ARTEFACTS_DIR", default="src/recommenders/artefacts")
+    artefacts_reload_interval_seconds: float = Field(
+        alias="ARTEFACTS_RELOAD_INTERVAL_SECONDS", default=0.0
+    )
+    enabled_models: list[str] | None = Field(alias="ENABLED_MODELS", default=None)
+    warmup_models: list[str] = Field(alias="WARMUP_MODELS", default_factory=list)
+    warmup_predictions: int = Field(alias="WARMUP_PREDICTIONS", default=8)
+    models_memory_budget_mb: int = Field(alias="MODELS_MEMORY_BUDGET_MB", default=4096)
+    default_prediction_concurrency: int = Field(alias="DEFAULT_PREDICTION_CONCURRENCY", default=4)
+    prediction_concurrency: dict[str, int] = Field(
+        alias="PREDICTION_CONCURRENCY", default_factory=dict
+    )
+    prediction_queue_size: int = Field(alias="PREDICTION_QUEUE_SIZE", default=64)
+    process_pool_models: list[str] = Field(alias="PROCESS_POOL_MODELS", default_factory=list)
+    process_pool_size: int = Field(alias="PROCESS_POOL_SIZE", default=2)
+    micro_batching_models: list[str] = Field(
+        alias="MICRO_BATCHING_MODELS", default=["hnsw_lightfm", "dssm", "auto_encoder"]
+    )
+    micro_batch_window_ms: float = Field(alias="MICRO_BATCH_WINDOW_MS", default=1.0)
+    micro_batch_max_size: int = Field(alias="MICRO_BATCH_MAX_SIZE", default=64)
+    materialized_models: list[str] = Field(alias="MATERIALIZED_MODELS", default_factory=list)
+    autoencoder_inference: AutoEncoderInferenceEnum = Field(
+        alias="AUTOENCODER_INFERENCE", default=AutoEncoderInferenceEnum.FLOAT
+    )
+    ensemble_models: dict[str, float] = Field(
+        alias="ENSEMBLE_MODELS",
+        default={"lightfm": 1.0, "hnsw_lightfm": 1.0, "user_knn_tf_idf": 1.0, "two_stages": 1.0},
+    )
+    ensemble_fusion: RankFusionEnum = Field(alias="ENSEMBLE_FUSION", default=RankFusionEnum.RRF)
+    ensemble_rrf_k: float = Field(alias="ENSEMBLE_RRF_K", default=60.0)
+    ensemble_deadline_ms: float = Field(alias="ENSEMBLE_DEADLINE_MS", default=50.0)
+    ensemble_threads: int = Field(alias="ENSEMBLE_THREADS", default=16)
+    dssm_index_factory: str = Field(alias="DSSM_INDEX_FACTORY", default="Flat")
+    dssm_search_params: str = Field(alias="DSSM_SEARCH_PARAMS", default="")
+    lightfm_load_pickle: bool = Field(alias="LIGHTFM_LOAD_PICKLE", default=False)
+    inference_threads: int = Field(alias="INFERENCE_THREADS", default=0)
+    profile_sample_rate: int = Field(alias="PROFILE_SAMPLE_RATE", default=0)
+    profile_dir: str = Field(alias="PROFILE_DIR", default="profiles")
+    profile_max_files: int = Field(alias="PROFILE_MAX_FILES", default=200)
+    admission_rate_per_second: float = Field(alias="ADMISSION_RATE_PER_SECOND", default=0.0)
+    admission_burst: int = Field(alias="ADMISSION_BURST", default=100)
+    admission_client_rate_per_second: float = Field(
+        alias="ADMISSION_CLIENT_RATE_PER_SECOND", default=0.0
+    )
+    admission_client_burst: int = Field(alias="ADMISSION_CLIENT_BURST", default=20)
+    admission_max_concurrency: int = Field(alias="ADMISSION_MAX_CONCURRENCY", default=0)
+    admission_client_max_concurrency: int = Field(
+        alias="ADMISSION_CLIENT_MAX_CONCURRENCY", default=0
+    )
+    admission_max_queue_depth: int = Field(alias="ADMISSION_MAX_QUEUE_DEPTH", default=0)
+    default_request_deadline_ms: float = Field(alias="DEFAULT_REQUEST_DEADLINE_MS", default=0.0)
+    request_deadlines_ms: dict[str, float] = Field(
+        alias="REQUEST_DEADLINES_MS", default_factory=dict
+    )
+    response_cache_memory_mb: int = Field(alias="RESPONSE_CACHE_MEMORY_MB", default=256)
+    response_cache_ttl_seconds: float = Field(alias="RESPONSE_CACHE_TTL_SECONDS", default=600.0)
+    response_cache_disabled_models: list[str] = Field(
+        alias="RESPONSE_CACHE_DISABLED_MODELS", default_factory=list
+    )
 
 
 load_dotenv()
@@ -70,3 +70,78 @@ class IncorrectAuthTokenError(RecSysServiceError):
         error_message: str = DEFAULT_MESSAGE,
     ) -> None:
         super().__init__(status_code, error_message)
+
+
+class BatchTooLargeError(RecSysServiceError):
+    """
+    Error of requesting recommendations for too many users at once
+    """
+
+    DEFAULT_MESSAGE = "Too many users in batch"
+
+    def __init__(
+        self,
+        status_code: int = HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+        error_message: str = DEFAULT_MESSAGE,
+    ) -> None:
+        super().__init__(status_code, error_message)
+
+
+class ServiceOverloadedError(RecSysServiceError):
+    """
+    Error of exceeding the queue of the model predictions
+    """
+
+    DEFAULT_MESSAGE = "Service is overloaded, try again later"
+
+    def __init__(
+        self,
+        status_code: int = HTTPStatus.SERVICE_UNAVAILABLE,
+        error_message: str = DEFAULT_MESSAGE,
+    ) -> None:
+        super().__init__(status_code, error_message)
+
+
+class TooManyRequestsError(RecSysServiceError):
+    """
+    Error of exceeding the rate limits of the service or of the token
+    """
+
+    DEFAULT_MESSAGE = "Too many requests, slow down"
+
+    def __init__(
+        self,
+        status_code: int = HTTPStatus.TOO_MANY_REQUESTS,
+        error_message: str = DEFAULT_MESSAGE,
+    ) -> None:
+        super().__init__(status_code, error_message)
+
+
+class ServiceNotReadyError(RecSysServiceError):
+    """
+    Error of the service whose models are still warming up
+    """
+
+    DEFAULT_MESSAGE = "Service is warming up"
+
+    def __init__(
+        self,
+        status_code: int = HTTPStatus.SERVICE_UNAVAILABLE,
+        error_message: str = DEFAULT_MESSAGE,
+    ) -> None:
+        super().__init__(status_code, error_message)
+
+
+class ModelReloadError(RecSysServiceError):
+    """
+    Error of reloading the model from new artefacts, the previous instance keeps serving
+    """
+
+    DEFAULT_MESSAGE = "Model could not be reloaded, the previous version is kept"
+
+    def __init__(
+        self,
+        status_code: int = HTTPStatus.INTERNAL_SERVER_ERROR,
+        error_message: str = DEFAULT_MESSAGE,
+    ) -> None:
+        super().__init__(status_code, error_message)
@@ -0,0 +1,146 @@
+"""
+Aggregates sampled cProfile dumps of the predictions into a report of the hottest functions
+
+Usage: python -m src.profiling [--dir profiles] [--model lightfm] [--sort cumulative] [--top 30]
+"""
+import argparse
+import cProfile
+import glob
+import itertools
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Callable, Iterator
+
+from src.config import settings
+
+_stage_durations: ContextVar[dict[str, float] | None] = ContextVar("stage_durations", default=None)
+
+
+@contextmanager
+def capture_stage_durations() -> Iterator[dict[str, float]]:
+    """
+    Collects durations in seconds of the prediction stages run in the current context
+    and in the contexts copied from it
+    """
+    durations: dict[str, float] = {}
+    token = _stage_durations.set(durations)
+    try:
+        yield durations
+    finally:
+        _stage_durations.reset(token)
+
+
+def record_stage_duration(stage: str, duration: float) -> None:
+    """
+    Adds duration of the stage to the durations captured in the current context
+    """
+    durations = _stage_durations.get()
+    if durations is not None:
+        durations[stage] = durations.get(stage, 0.0) + duration
+
+
+# pylint: disable=too-few-public-methods
+class SampledProfiler:
+    """
+    Profiles every 'profile_sample_rate'-th prediction call of each model with cProfile
+    and dumps the stats into 'profile_dir' keeping at most 'profile_max_files' dumps
+    Only one call is profiled at a time, calls sampled meanwhile run unprofiled
+    """
+
+    def __init__(self):
+        self._counters: dict[str, itertools.count] = {}
+        self._profile_lock = threading.Lock()
+
+    def call(self, model_name: str, function: Callable[..., Any], *args: Any) -> Any:
+        """
+        Calls the function with 'args', profiles the call if it is sampled
+        """
+        if not self._is_sampled(model_name):
+            return function(*args)
+        if not self._profile_lock.acquire(blocking=False):  # pylint: disable=consider-using-with
+            return function(*args)
+        try:
+            profile = cProfile.Profile()
+            result = profile.runcall(function, *args)
+            self._dump(profile, model_name)
+            return result
+        finally:
+            self._profile_lock.release()
+
+    def _is_sampled(self, model_name: str) -> bool:
+        """
+        Checks whether the current call of the model is sampled
+        """
+        if settings.profile_sample_rate <= 0:
+            return False
+        counter = self._counters.get(model_name)
+        if counter is None:
+            counter = self._counters.setdefault(model_name, itertools.count())
+        return next(counter) % settings.profile_sample_rate == 0
+
+    @staticmethod
+    def _dump(profile: cProfile.Profile, model_name: str) -> None:
+        """
+        Writes stats of the profile and removes the oldest dumps over the limit
+        """
+        try:
+            os.makedirs(settings.profile_dir, exist_ok=True)
+            path = os.path.join(
+                settings.profile_dir, f"{model_name}-{time.time_ns()}-{os.getpid()}.prof"
+            )
+            profile.dump_stats(f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+            dump_paths = sorted(get_dump_paths(settings.profile_dir), key=os.path.getmtime)
+            for dump_path in dump_paths[: max(len(dump_paths) - settings.profile_max_files, 0)]:
+                os.remove(dump_path)
+        except OSError:
+            pass
+
+
+@lru_cache(maxsize=None)
+def get_sampled_profiler() -> SampledProfiler:
+    """
+    Returns sampled profiler shared within the process
+    """
+    return SampledProfiler()
+
+
+def get_dump_paths(dir_path: str, model_name: str = "*") -> list[str]:
+    """
+    Returns paths of the profile dumps of the model
+    """
+    return glob.glob(os.path.join(dir_path, f"{model_name}-*.prof"))
+
+
+def main() -> None:
+    """
+    Prints the hottest functions of the sampled predictions
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dir", default=settings.profile_dir, help="directory of the dumps")
+    parser.add_argument("--model", default="*", help="name of the model, all models by default")
+    parser.add_argument(
+        "--sort", default="cumulative", choices=["cumulative", "tottime", "ncalls"], help="order"
+    )
+    parser.add_argument("--top", type=int, default=30, help="number of reported functions")
+    args = parser.parse_args()
+    dump_paths = get_dump_paths(args.dir, args.model)
+    if not dump_paths:
+        parser.error(f"no profile dumps of model {args.model} in {args.dir}")
+    n_dumps = {}
+    for dump_path in dump_paths:
+        model_name = os.path.basename(dump_path).rsplit("-", 2)[0]
+        n_dumps[model_name] = n_dumps.get(model_name, 0) + 1
+    print(", ".join(f"{model_name}: {n} dumps" for model_name, n in sorted(n_dumps.items())))
+    stats = pstats.Stats(*dump_paths)
+    stats.files = []
+    stats.strip_dirs().sort_stats(args.sort).print_stats(args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import ctypes
+import ctypes.util
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+from functools import lru_cache
+from typing import Any, BinaryIO, Callable, Iterable
+
+import numpy as np
+from scipy import sparse
+
+from src.config import settings
+
+MATRIX_COMPONENTS = ("data", "indices", "indptr", "shape")
+
+
+class ArtefactStore:
+    """
+    Store of artefacts kept in uncompressed on-disk layouts
+    Arrays are opened with memory mapping, so all workers on the host
+    share a single page-cache copy of them
+    """
+
+    def __init__(self, dir_path: str):
+        self.dir_path = dir_path
+        self._arrays: dict[str, tuple[tuple[int, int, int], np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def get_path(self, file_name: str) -> str:
+        """
+        Returns path of the artefact
+        """
+        return os.path.join(self.dir_path, file_name)
+
+    def load_array(self, file_name: str) -> np.ndarray:
+        """
+        Opens .npy array with read-only memory mapping
+        The array is opened once per process and reopened when the file is replaced,
+        arrays opened before keep mapping the replaced file
+        """
+        path = self.get_path(file_name)
+        stat = os.stat(path)
+        file_key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if file_name not in self._arrays or self._arrays[file_name][0] != file_key:
+                self._arrays[file_name] = (file_key, np.load(path, mmap_mode="r"))
+            return self._arrays[file_name][1]
+
+    def load_csr_matrix(self, file_name: str) -> sparse.csr_matrix:
+        """
+        Opens sparse matrix saved as .npz in CSR format
+        from its uncompressed memory-mapped components
+        Components are exported next to .npz-file if they are missing or outdated
+        """
+        return self._load_compressed_matrix(file_name, "csr")
+
+    def load_csc_matrix(self, file_name: str) -> sparse.csc_matrix:
+        """
+        Opens sparse matrix saved as .npz in CSC format
+        from its uncompressed memory-mapped components
+        Components are exported next to .npz-file if they are missing or outdated
+        """
+        return self._load_compressed_matrix(file_name, "csc")
+
+    def _load_compressed_matrix(
+        self, file_name: str, matrix_format: str
+    ) -> sparse.csr_matrix | sparse.csc_matrix:
+        """
+        Opens sparse matrix in compressed format from its memory-mapped components
+        """
+        component_files = [
+            get_matrix_component_file(file_name, component, matrix_format)
+            for component in MATRIX_COMPONENTS
+        ]
+        if not is_up_to_date(
+            [self.get_path(file) for file in component_files], self.get_path(file_name)
+        ):
+            export_compressed_matrix(self.get_path(file_name), matrix_format)
+        data, indices, indptr, shape = (self.load_array(file) for file in component_files)
+        matrix_class = sparse.csr_matrix if matrix_format == "csr" else sparse.csc_matrix
+        return matrix_class((data, indices, indptr), shape=tuple(shape), copy=False)
+
+    def get_version(self, file_names: Iterable[str]) -> str:
+        """
+        Returns fingerprint of the artefacts by their location, sizes and modification times
+        """
+        fingerprint = hashlib.sha256(os.path.realpath(self.dir_path).encode("utf-8"))
+        for file_name in sorted(file_names):
+            try:
+                stat = os.stat(self.get_path(file_name))
+                fingerprint.update(
+                    f"{file_name}:{stat.st_size}:{stat.st_mtime_ns};".encode("utf-8")
+                )
+            except OSError:
+                fingerprint.update(f"{file_name}:missing;".encode("utf-8"))
+        return fingerprint.hexdigest()[:16]
+
+    def get_residency(self) -> dict[str, tuple[int, int]]:
+        """
+        Returns resident in the page cache and total number of bytes
+        for each opened artefact
+        """
+        with self._lock:
+            arrays = {file_name: array for file_name, (_, array) in self._arrays.items()}
+        return {
+            file_name: (get_resident_bytes(array), array.nbytes)
+            for file_name, array in arrays.items()
+        }
+
+
+@lru_cache(maxsize=None)
+def get_artefact_store(dir_path: str | None = None) -> ArtefactStore:
+    """
+    Returns the store of the artefacts directory shared within the process
+    """
+    return ArtefactStore(dir_path or settings.artefacts_dir)
+
+
+def get_matrix_component_file(file_name: str, component: str, matrix_format: str = "csr") -> str:
+    """
+    Returns file name of the uncompressed component of sparse matrix
+    in compressed format (CSR or CSC)
+    """
+    base_name = os.path.splitext(file_name)[0]
+    if matrix_format == "csr":
+        return f"{base_name}.{component}.npy"
+    return f"{base_name}.{matrix_format}.{component}.npy"
+
+
+def export_compressed_matrix(path: str, matrix_format: str = "csr") -> None:
+    """
+    Exports components of sparse matrix in compressed format (CSR or CSC)
+    from .npz-file to uncompressed .npy-files, replaced atomically
+    """
+    matrix = sparse.load_npz(path).asformat(matrix_format)
+    components = {
+        "data": matrix.data,
+        "indices": matrix.indices,
+        "indptr": matrix.indptr,
+        "shape": np.array(matrix.shape, dtype=np.int64),
+    }
+    dir_path, file_name = os.path.split(path)
+    for component, array in components.items():
+        save_array(
+            os.path.join(dir_path, get_matrix_component_file(file_name, component, matrix_format)),
+            array,
+        )
+
+
+def is_up_to_date(paths: list[str], source_path: str) -> bool:
+    """
+    Checks whether the files derived from the source file exist and are not older than it
+    """
+    if not all(os.path.exists(path) for path in paths):
+        return False
+    return not os.path.exists(source_path) or min(map(os.path.getmtime, paths)) >= os.path.getmtime(
+        source_path
+    )
+
+
+def save_array(path: str, array: np.ndarray) -> None:
+    """
+    Saves array into .npy-file atomically
+    """
+    write_atomically(path, lambda f: np.save(f, array))
+
+
+def write_atomically(path: str, write: Callable[[BinaryIO], Any]) -> None:
+    """
+    Writes binary file through a temporary one which then replaces the target,
+    so processes opening the file never see it partially written
+    """
+    file_descriptor, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def get_resident_bytes(array: np.ndarray) -> int:
+    """
+    Returns number of bytes of memory-mapped array resident in the page cache
+    """
+    if array.nbytes == 0:
+        return 0
+    page_size = mmap.PAGESIZE
+    address = array.ctypes.data
+    start = address - address % page_size
+    length = address + array.nbytes - start
+    pages = (ctypes.c_ubyte * ((length + page_size - 1) // page_size))()
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    if libc.mincore(ctypes.c_void_p(start), ctypes.c_size_t(length), pages) != 0:
+        raise OSError(ctypes.get_errno(), "mincore failed")
+    n_resident_pages = int(np.count_nonzero(np.frombuffer(pages, dtype=np.uint8) & 1))
+    return min(n_resident_pages * page_size, array.nbytes)
+
+
+def is_memory_mapped(array: np.ndarray) -> bool:
+    """
+    Checks whether the array is a view of memory-mapped file
+    """
+    while array is not None:
+        if isinstance(array, (np.memmap, mmap.mmap)):
+            return True
+        array = getattr(array, "base", None)
+    return False
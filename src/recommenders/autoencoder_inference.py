@@ -0,0 +1,60 @@
+import numpy as np
+import torch
+from scipy import sparse
+from torch import nn
+
+from src.config import AutoEncoderInferenceEnum
+
+
+# pylint: disable=too-few-public-methods
+class AutoEncoderInference:
+    """
+    CPU inference engine of AutoEncoder
+    The first layer is computed as a sparse product, so only the weights
+    of the items the user interacted with are gathered,
+    the decoder is run as float, dynamically quantized int8 or frozen TorchScript module
+    """
+
+    def __init__(
+        self,
+        encoder: nn.Linear,
+        decoder: nn.Linear,
+        variant: AutoEncoderInferenceEnum = AutoEncoderInferenceEnum.FLOAT,
+    ):
+        self.variant = AutoEncoderInferenceEnum(variant)
+        with torch.inference_mode():
+            self.encoder_weights = np.ascontiguousarray(
+                encoder.weight.detach().numpy().T, dtype=np.float32
+            )
+            self.encoder_bias = encoder.bias.detach().numpy().astype(np.float32)
+        self.decoder = build_decoder(decoder, self.variant)
+
+    def get_scores(self, user_interactions: sparse.csr_matrix) -> np.ndarray:
+        """
+        Gets scores of all items for the users given by rows of interactions matrix
+        """
+        user_interactions = sparse.csr_matrix(user_interactions, dtype=np.float32)
+        hidden = user_interactions @ self.encoder_weights
+        hidden += self.encoder_bias
+        with torch.inference_mode():
+            return self.decoder(torch.from_numpy(hidden)).numpy()
+
+
+def build_decoder(decoder: nn.Linear, variant: AutoEncoderInferenceEnum) -> nn.Module:
+    """
+    Builds module computing scores from the hidden layer before activation
+    """
+    module = nn.Sequential(nn.ReLU(), decoder).eval()
+    if variant == AutoEncoderInferenceEnum.INT8:
+        return torch.ao.quantization.quantize_dynamic(module, {nn.Linear}, dtype=torch.qint8)
+    if variant == AutoEncoderInferenceEnum.TORCHSCRIPT:
+        return torch.jit.freeze(torch.jit.script(module))
+    return module
+
+
+def set_inference_threads(n_threads: int) -> None:
+    """
+    Sets number of intra-op threads of torch in the process, 0 keeps the default
+    """
+    if n_threads > 0:
+        torch.set_num_threads(n_threads)
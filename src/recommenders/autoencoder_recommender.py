@@ -1,23 +1,34 @@
-import json
+import time
 
 import torch
 from torch import nn
 import numpy as np
-from scipy import sparse
 
-from src.recommenders.base_recommender import FilterViewedAndPopularRecommender
-
-
-DIR_PATH = "src/recommenders/artefacts"
-ITEM_INV_MAPPING_PATH = f"{DIR_PATH}/lightfm_item_inv_mappings.json"
-USER_MAPPING_PATH = f"{DIR_PATH}/lightfm_user_mappings.json"
-USER_ITEM_MATRIX_PATH = f"{DIR_PATH}/user_item_matrix.npz"
-TOP_ITEMS_PATH = f"{DIR_PATH}/top_items.json"
-
-MODEL_PATH = f"{DIR_PATH}/autoencoder.pth"
-MODEL_USER_MAPPING_PATH = f"{DIR_PATH}/autoencoder_user_mappings.json"
-MODEL_ITEM_INV_MAPPING_PATH = f"{DIR_PATH}/autoencoder_item_inv_mappings.json"
-MODEL_USER_ITEM_MATRIX_PATH = f"{DIR_PATH}/autoencoder_user_item_matrix.npz"
+from src.config import settings
+from src.recommenders.artefact_store import get_artefact_store
+from src.recommenders.autoencoder_inference import AutoEncoderInference, set_inference_threads
+from src.recommenders.base_recommender import (
+    FilterViewedAndPopularRecommender,
+    select_top_k,
+    select_unviewed_top_k,
+)
+from src.recommenders.mappings import (
+    compose_item_mappings,
+    compose_user_mappings,
+    load_item_inv_mapping,
+    load_user_mapping,
+)
+
+
+ITEM_INV_MAPPING_FILE = "lightfm_item_inv_mappings.json"
+USER_MAPPING_FILE = "lightfm_user_mappings.json"
+USER_ITEM_MATRIX_FILE = "user_item_matrix.npz"
+TOP_ITEMS_FILE = "top_items.json"
+
+MODEL_FILE = "autoencoder.pth"
+MODEL_USER_MAPPING_FILE = "autoencoder_user_mappings.json"
+MODEL_ITEM_INV_MAPPING_FILE = "autoencoder_item_inv_mappings.json"
+MODEL_USER_ITEM_MATRIX_FILE = "autoencoder_user_item_matrix.npz"
 
 
 class Model(nn.Module):
@@ -49,27 +60,41 @@ class AutoEncoderRecommender(FilterViewedAndPopularRecommender):
     The base class for the recommendation system
     """
 
+    # pylint: disable=duplicate-code
     MODEL_NAME = "auto_encoder"
+    ARTEFACT_FILES = [
+        USER_ITEM_MATRIX_FILE,
+        TOP_ITEMS_FILE,
+        USER_MAPPING_FILE,
+        ITEM_INV_MAPPING_FILE,
+        MODEL_FILE,
+        MODEL_USER_MAPPING_FILE,
+        MODEL_ITEM_INV_MAPPING_FILE,
+        MODEL_USER_ITEM_MATRIX_FILE,
+    ]
 
-    # pylint: disable=duplicate-code
     def __init__(self):
         super().__init__()
         self.load_artefacts(
-            USER_ITEM_MATRIX_PATH,
-            TOP_ITEMS_PATH,
-            USER_MAPPING_PATH,
-            ITEM_INV_MAPPING_PATH,
+            USER_ITEM_MATRIX_FILE,
+            TOP_ITEMS_FILE,
+            USER_MAPPING_FILE,
+            ITEM_INV_MAPPING_FILE,
+        )
+        store = get_artefact_store()
+        self.model_item_ids = load_item_inv_mapping(store.get_path(MODEL_ITEM_INV_MAPPING_FILE))
+        self.model_item_index = compose_item_mappings(self.item_ids, self.model_item_ids)
+        self.model_user_ids = compose_user_mappings(
+            self.user_mappings, load_user_mapping(store.get_path(MODEL_USER_MAPPING_FILE))
+        )
+        self.model_user_item_matrix = store.load_csr_matrix(MODEL_USER_ITEM_MATRIX_FILE)
+        model = Model(len(self.model_item_ids))
+        model.load_state_dict(torch.load(store.get_path(MODEL_FILE)))
+        model.eval()
+        set_inference_threads(settings.inference_threads)
+        self.inference = AutoEncoderInference(
+            model.sequential[0], model.sequential[2], settings.autoencoder_inference
         )
-        self.inv_user_mappings = {str(v): int(k) for (k, v) in self.user_mappings.items()}
-
-        with open(MODEL_ITEM_INV_MAPPING_PATH, "r", encoding="utf-8") as f:
-            self.model_item_inv_mappings = json.load(f)
-        with open(MODEL_USER_MAPPING_PATH, "r", encoding="utf-8") as f:
-            self.model_user_mappings = json.load(f)
-        self.model_user_item_matrix = sparse.load_npz(MODEL_USER_ITEM_MATRIX_PATH)
-        self.model = Model(len(self.model_item_inv_mappings))
-        self.model.load_state_dict(torch.load(MODEL_PATH))
-        self.model.eval()
 
     def get_recommendations(self, user_id: int, k: int) -> list[int]:
         """
@@ -77,12 +102,54 @@ class AutoEncoderRecommender(FilterViewedAndPopularRecommender):
         user_id - internal_user_id in full matrix
         for autoencoder we need get internal_user_id in other matrix
         """
-        external_user_id = self.inv_user_mappings[str(user_id)]
-        internal_user_id = self.model_user_mappings[str(external_user_id)]
-
-        user_interactions = self.model_user_item_matrix[internal_user_id, :].toarray()
-        with torch.no_grad():
-            predicted_scores = self.model(torch.Tensor(user_interactions))
-        indexes = np.argpartition(predicted_scores.numpy().reshape(-1), -k)[-k:][::-1]
-        item_id_list = [self.model_item_inv_mappings[str(ind)] for ind in indexes]
+        internal_user_id = self.model_user_ids[user_id]
+        if internal_user_id < 0:
+            raise KeyError(user_id)
+
+        predicted_scores = self.get_scores_batch(np.array([internal_user_id]))
+        indexes = select_top_k(predicted_scores.reshape(-1), k)
+        item_id_list = self.model_item_ids[indexes].tolist()
         return item_id_list
+
+    def get_recommendations_batch(self, user_ids: np.ndarray, k: int) -> np.ndarray:
+        """
+        Gets recommendations for several users with a single forward pass of AutoEncoder
+        """
+        model_user_ids = self.model_user_ids[user_ids]
+        is_known = model_user_ids >= 0
+        recommended_items = np.full((len(user_ids), k), -1, dtype=np.int64)
+        if is_known.any():
+            indexes = select_top_k(self.get_scores_batch(model_user_ids[is_known]), k)
+            recommended_items[is_known, : indexes.shape[1]] = self.model_item_ids[indexes]
+        return recommended_items
+
+    def get_unviewed_recommendations_batch(
+        self, user_ids: np.ndarray, k: int, viewed_rows: np.ndarray, viewed_items: np.ndarray
+    ) -> np.ndarray:
+        """
+        Gets recommendations for several users masking viewed items in AutoEncoder scores
+        """
+        model_user_ids = self.model_user_ids[user_ids]
+        is_known = model_user_ids >= 0
+        recommended_items = np.full((len(user_ids), k), -1, dtype=np.int64)
+        if is_known.any():
+            known_rows = np.cumsum(is_known) - 1
+            model_viewed_items = self.model_item_index[viewed_items]
+            is_masked = is_known[viewed_rows] & (model_viewed_items >= 0)
+            start_time = time.perf_counter()
+            scores = self.get_scores_batch(model_user_ids[is_known])
+            start_time = self.observe_stage("scoring", start_time)
+            indexes = select_unviewed_top_k(
+                scores, k, known_rows[viewed_rows[is_masked]], model_viewed_items[is_masked]
+            )
+            recommended_items[is_known, : indexes.shape[1]] = np.where(
+                indexes >= 0, self.model_item_ids[indexes], -1
+            )
+            self.observe_stage("filtering", start_time)
+        return recommended_items
+
+    def get_scores_batch(self, model_user_ids: np.ndarray) -> np.ndarray:
+        """
+        Gets scores of all items for several users with a single forward pass of AutoEncoder
+        """
+        return self.inference.get_scores(self.model_user_item_matrix[model_user_ids])
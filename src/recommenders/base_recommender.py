@@ -1,17 +1,26 @@
 import json
+import time
 from abc import ABC, abstractmethod
 import numpy as np
-from scipy import sparse
 
 from src.config import settings
+from src.metrics import COLD_START_FALLBACKS, get_stage_histogram
+from src.profiling import record_stage_duration
+from src.recommenders.artefact_store import get_artefact_store
+from src.recommenders.mappings import load_item_inv_mapping, load_user_mapping
+from src.recommenders.memory import estimate_memory_usage
 
 
-class BaseRecommender(ABC):  # pylint: disable=too-few-public-methods
+class BaseRecommender(ABC):
     """
     The base class for the recommendation system
     """
 
     MODEL_NAME = ""
+    ARTEFACT_FILES: list[str] = []
+    CACHEABLE = True
+
+    _artefact_version: str | None = None
 
     @abstractmethod
     def predict(self, user_id: int) -> list[int]:
@@ -21,6 +30,45 @@ class BaseRecommender(ABC):  # pylint: disable=too-few-public-methods
         """
         raise NotImplementedError("This method should be implemented in a derived class")
 
+    def predict_batch(self, user_ids: list[int]) -> list[list[int]]:
+        """
+        Returns lists of item IDs recommended to the users
+        with ids 'user_ids'
+        """
+        return [self.predict(user_id) for user_id in user_ids]
+
+    def get_user_ids(self) -> np.ndarray:
+        """
+        Returns external IDs of the users known to the recommender,
+        empty if the recommender does not depend on users
+        """
+        return np.zeros(0, dtype=np.int64)
+
+    def get_memory_usage(self) -> int:
+        """
+        Returns the estimated number of bytes occupied by the loaded artefacts
+        """
+        return estimate_memory_usage(vars(self))
+
+    def observe_stage(self, stage: str, start_time: float) -> float:
+        """
+        Records duration of the prediction stage started at 'start_time' (perf_counter)
+        Returns the end time of the stage
+        """
+        end_time = time.perf_counter()
+        get_stage_histogram(self.MODEL_NAME, stage).observe(end_time - start_time)
+        record_stage_duration(stage, end_time - start_time)
+        return end_time
+
+    def get_artefact_version(self) -> str:
+        """
+        Returns fingerprint of the artefact files the recommender is loaded from
+        The fingerprint is computed on the first call
+        """
+        if self._artefact_version is None:
+            self._artefact_version = get_artefact_store().get_version(self.ARTEFACT_FILES)
+        return self._artefact_version
+
 
 class FilterViewedAndPopularRecommender(BaseRecommender):
     """
@@ -32,26 +80,33 @@ class FilterViewedAndPopularRecommender(BaseRecommender):
     def __init__(self):
         self.top_items = None
         self.user_item_matrix = None
-        self.item_inv_mappings = None
+        self.item_ids = None
         self.user_mappings = None
 
     def load_artefacts(
         self,
-        user_item_matrix_path: str,
-        top_items_path: str,
-        user_mappings_path: str,
-        item_inv_mappings_path: str,
+        user_item_matrix_file: str,
+        top_items_file: str,
+        user_mappings_file: str,
+        item_inv_mappings_file: str,
     ) -> None:
         """
         Loads user-item matrix, top items, user and item mappings
+        User-item matrix is memory-mapped and shared between recommenders and workers,
+        compiled .npy mappings are used instead of json-files when they exist
         """
-        with open(top_items_path, "r", encoding="utf-8") as f:
+        store = get_artefact_store()
+        with open(store.get_path(top_items_file), "r", encoding="utf-8") as f:
             self.top_items = json.load(f)["items"]
-        self.user_item_matrix = sparse.load_npz(user_item_matrix_path)
-        with open(item_inv_mappings_path, "r", encoding="utf-8") as f:
-            self.item_inv_mappings = json.load(f)
-        with open(user_mappings_path, "r", encoding="utf-8") as f:
-            self.user_mappings = json.load(f)
+        self.user_item_matrix = store.load_csr_matrix(user_item_matrix_file)
+        self.item_ids = load_item_inv_mapping(store.get_path(item_inv_mappings_file))
+        self.user_mappings = load_user_mapping(store.get_path(user_mappings_file))
+
+    def get_user_ids(self) -> np.ndarray:
+        """
+        Returns external IDs of the users known to the recommender
+        """
+        return self.user_mappings.external_ids
 
     def predict(self, user_id: int) -> list[int]:
         """
@@ -59,29 +114,106 @@ class FilterViewedAndPopularRecommender(BaseRecommender):
         adding popular items
         """
         recommended_items = []
+        start_time = time.perf_counter()
         try:
-            internal_user_id = self.user_mappings[str(user_id)]
+            internal_user_id = self.user_mappings[user_id]
+            start_time = self.observe_stage("id_mapping", start_time)
             viewed_items = self.get_viewed_items(internal_user_id)
-            recommended_items = self.get_recommendations(
-                internal_user_id, settings.n_returned_items + len(viewed_items)
-            )
-            recommended_items = [
-                item_id for item_id in recommended_items if item_id not in viewed_items
-            ]
+            self.observe_stage("viewed_items", start_time)
+            recommended_items = self.get_unviewed_recommendations_batch(
+                np.array([internal_user_id]),
+                settings.n_returned_items,
+                np.zeros(len(viewed_items), dtype=np.int64),
+                viewed_items,
+            )[0]
+            recommended_items = recommended_items[recommended_items >= 0].tolist()
         except KeyError:
-            pass
+            COLD_START_FALLBACKS.inc(model_name=self.MODEL_NAME)
+        start_time = time.perf_counter()
         if len(recommended_items) < settings.n_returned_items:
             recommended_items = self.add_popular_items(recommended_items)
+        self.observe_stage("popular_fill", start_time)
         return recommended_items[: settings.n_returned_items]
 
-    def get_viewed_items(self, internal_user_id: int) -> set[int]:
+    def predict_batch(self, user_ids: list[int]) -> list[list[int]]:
+        """
+        Gets recommendations for several users at once
+        with filtering interacted items and adding popular items
+        """
+        start_time = time.perf_counter()
+        internal_user_ids = self.user_mappings.map(user_ids)
+        is_known = internal_user_ids >= 0
+        start_time = self.observe_stage("id_mapping", start_time)
+        if not is_known.all():
+            COLD_START_FALLBACKS.inc(int((~is_known).sum()), model_name=self.MODEL_NAME)
+        recommended_items = np.full((len(user_ids), 0), -1, dtype=np.int64)
+        if is_known.any():
+            known_user_ids = internal_user_ids[is_known]
+            viewed_rows, viewed_items = self.get_viewed_items_batch(known_user_ids)
+            self.observe_stage("viewed_items", start_time)
+            known_items = self.get_unviewed_recommendations_batch(
+                known_user_ids, settings.n_returned_items, viewed_rows, viewed_items
+            )
+            recommended_items = np.full((len(user_ids), known_items.shape[1]), -1, dtype=np.int64)
+            recommended_items[is_known] = known_items
+        start_time = time.perf_counter()
+        recommended_items = self.add_popular_items_batch(recommended_items)
+        self.observe_stage("popular_fill", start_time)
+        return [row[row >= 0].tolist() for row in recommended_items]
+
+    def get_viewed_items(self, internal_user_id: int) -> np.ndarray:
         """
-        Gets viewed items
+        Gets internal IDs of viewed items from the user row of CSR user-item matrix
         """
-        viewed_items = np.arange(len(self.item_inv_mappings))[
-            self.user_item_matrix[internal_user_id, :].toarray().reshape(-1) > 0
-        ]
-        return {self.item_inv_mappings[str(item_id)] for item_id in viewed_items}
+        start, end = self.user_item_matrix.indptr[internal_user_id : internal_user_id + 2]
+        viewed_items = self.user_item_matrix.indices[start:end]
+        return viewed_items[self.user_item_matrix.data[start:end] > 0]
+
+    def get_viewed_items_batch(
+        self, internal_user_ids: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Gets viewed items of several users as pairs (row in batch, internal item ID)
+        """
+        user_item_matrix = self.user_item_matrix[internal_user_ids]
+        rows = np.repeat(np.arange(len(internal_user_ids)), np.diff(user_item_matrix.indptr))
+        is_viewed = user_item_matrix.data > 0
+        return rows[is_viewed], user_item_matrix.indices[is_viewed]
+
+    def get_unviewed_recommendations_batch(  # pylint: disable=too-many-locals
+        self, user_ids: np.ndarray, k: int, viewed_rows: np.ndarray, viewed_items: np.ndarray
+    ) -> np.ndarray:
+        """
+        Gets k recommendations without viewed items for several users as 2d array padded with -1
+        Candidates are over-fetched, and the over-fetch is increased only for the users
+        who still lack unviewed items, up to the length of their history
+        """
+        n_viewed = np.bincount(viewed_rows, minlength=len(user_ids))
+        viewed_item_ids = self.item_ids[viewed_items]
+        recommended_items = np.full((len(user_ids), k), -1, dtype=np.int64)
+        n_overfetched = np.minimum(n_viewed, int(np.ceil(k * settings.viewed_overfetch_factor)))
+        rows = np.arange(len(user_ids))
+        while len(rows) > 0:
+            n_candidates = k + int(n_overfetched[rows].max())
+            start_time = time.perf_counter()
+            candidates = self.get_recommendations_batch(user_ids[rows], n_candidates)
+            start_time = self.observe_stage("scoring", start_time)
+            if len(rows) == len(user_ids):
+                pending_rows, pending_item_ids = viewed_rows, viewed_item_ids
+            else:
+                is_pending = np.isin(viewed_rows, rows)
+                pending_rows = np.searchsorted(rows, viewed_rows[is_pending])
+                pending_item_ids = viewed_item_ids[is_pending]
+            is_viewed = rows_isin(candidates, pending_rows, pending_item_ids)
+            candidates = compact_rows(np.where(is_viewed, -1, candidates), k)
+            recommended_items[rows] = candidates
+            is_complete = ((candidates >= 0).sum(axis=1) >= k) | (
+                n_candidates >= k + n_viewed[rows]
+            )
+            rows = rows[~is_complete]
+            n_overfetched[rows] = np.minimum(n_viewed[rows], 2 * n_overfetched[rows] + k)
+            self.observe_stage("filtering", start_time)
+        return recommended_items
 
     def add_popular_items(self, recommended_items: list[int]) -> list[int]:
         """
@@ -92,9 +224,83 @@ class FilterViewedAndPopularRecommender(BaseRecommender):
         )
         return recommended_items[: settings.n_returned_items]
 
+    def add_popular_items_batch(self, recommended_items: np.ndarray) -> np.ndarray:
+        """
+        Add new popular items for recommendations of several users
+        'recommended_items' is 2d array padded with -1
+        """
+        popular_items = np.broadcast_to(
+            np.asarray(self.top_items, dtype=np.int64),
+            (recommended_items.shape[0], len(self.top_items)),
+        )
+        rows, columns = np.nonzero(recommended_items >= 0)
+        is_recommended = rows_isin(popular_items, rows, recommended_items[rows, columns])
+        recommended_items = np.hstack(
+            [recommended_items, np.where(is_recommended, -1, popular_items)]
+        )
+        return compact_rows(recommended_items, settings.n_returned_items)
+
     @abstractmethod
     def get_recommendations(self, user_id: int, k: int) -> list[int]:
         """
         Gets recommendations
         """
         raise NotImplementedError("This method should be implemented in a derived class")
+
+    def get_recommendations_batch(self, user_ids: np.ndarray, k: int) -> np.ndarray:
+        """
+        Gets recommendations for several users as 2d array padded with -1
+        Rows of users unknown to the model are filled with -1
+        """
+        recommended_items = np.full((len(user_ids), k), -1, dtype=np.int64)
+        for row, user_id in enumerate(user_ids):
+            try:
+                items = self.get_recommendations(int(user_id), k)
+            except KeyError:
+                continue
+            recommended_items[row, : len(items)] = items
+        return recommended_items
+
+
+def select_top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Returns indexes of k highest scores (in each row for 2d array)
+    sorted by descending score
+    """
+    k = min(k, scores.shape[-1])
+    indexes = np.argpartition(scores, -k, axis=-1)[..., -k:]
+    order = np.argsort(-np.take_along_axis(scores, indexes, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(indexes, order, axis=-1)
+
+
+def select_unviewed_top_k(
+    scores: np.ndarray, k: int, viewed_rows: np.ndarray, viewed_items: np.ndarray
+) -> np.ndarray:
+    """
+    Returns indexes of k highest scores in each row of 2d array excluding viewed items
+    given by pairs (viewed_rows, viewed_items), padded with -1
+    """
+    scores[viewed_rows, viewed_items] = -np.inf
+    indexes = select_top_k(scores, k)
+    return np.where(np.isneginf(np.take_along_axis(scores, indexes, axis=-1)), -1, indexes)
+
+
+def rows_isin(values: np.ndarray, rows: np.ndarray, row_values: np.ndarray) -> np.ndarray:
+    """
+    Checks for each element of 2d array 'values' whether it is contained in the same row
+    of the sparse set given by pairs (rows, row_values)
+    """
+    base = max(int(values.max(initial=0)), int(row_values.max(initial=0))) + 1
+    keys = np.arange(values.shape[0])[:, None] * base + values
+    return np.isin(keys, rows * base + row_values)
+
+
+def compact_rows(values: np.ndarray, n_columns: int) -> np.ndarray:
+    """
+    Moves non-negative elements of each row of 2d array to the beginning
+    keeping their order and truncates (or pads with -1) rows to 'n_columns' elements
+    """
+    if values.shape[1] < n_columns:
+        values = np.pad(values, ((0, 0), (0, n_columns - values.shape[1])), constant_values=-1)
+    order = np.argsort(values < 0, axis=1, kind="stable")[:, :n_columns]
+    return np.take_along_axis(values, order, axis=1)
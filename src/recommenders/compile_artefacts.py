@@ -0,0 +1,173 @@
+"""
+Compiles json id mappings of the artefacts into .npy arrays,
+exports sparse matrices into uncompressed memory-mappable components,
+builds faiss indexes on the item embeddings,
+exports representations of LightFM model
+and converts offline recommendations of the two-stage model into arrays
+
+Usage: python -m src.recommenders.compile_artefacts [--dir src/recommenders/artefacts]
+"""
+import argparse
+import os
+
+import numpy as np
+
+from src.config import settings
+from src.recommenders.artefact_store import (
+    MATRIX_COMPONENTS,
+    ArtefactStore,
+    export_compressed_matrix,
+    get_matrix_component_file,
+)
+from src.recommenders.mappings import (
+    UserMapping,
+    get_compiled_path,
+    item_inv_mapping_from_json,
+)
+
+USER_MAPPING_FILES = [
+    "lightfm_user_mappings.json",
+    "dssm_user_mappings.json",
+    "autoencoder_user_mappings.json",
+    "users_mapping.json",
+]
+ITEM_INV_MAPPING_FILES = [
+    "lightfm_item_inv_mappings.json",
+    "dssm_item_inv_mappings.json",
+    "autoencoder_item_inv_mappings.json",
+    "items_inv_mapping.json",
+]
+CSR_MATRIX_FILES = [
+    "user_item_matrix.npz",
+    "autoencoder_user_item_matrix.npz",
+]
+CSC_MATRIX_FILES = [
+    "matrix_for_user_knn.npz",
+]
+
+
+def compile_mappings(dir_path: str) -> list[str]:
+    """
+    Compiles all known mappings found in the directory
+    Returns paths of the compiled files
+    """
+    compiled_paths = []
+    for file_name in USER_MAPPING_FILES:
+        json_path = os.path.join(dir_path, file_name)
+        if os.path.exists(json_path):
+            compiled_path = get_compiled_path(json_path)
+            UserMapping.from_json(json_path).save(compiled_path)
+            compiled_paths.append(compiled_path)
+    for file_name in ITEM_INV_MAPPING_FILES:
+        json_path = os.path.join(dir_path, file_name)
+        if os.path.exists(json_path):
+            compiled_path = get_compiled_path(json_path)
+            np.save(compiled_path, item_inv_mapping_from_json(json_path))
+            compiled_paths.append(compiled_path)
+    return compiled_paths
+
+
+def compile_sparse_matrices(dir_path: str) -> list[str]:
+    """
+    Exports components of all known sparse matrices found in the directory
+    Returns paths of the exported files
+    """
+    compiled_paths = []
+    for matrix_format, file_names in (("csr", CSR_MATRIX_FILES), ("csc", CSC_MATRIX_FILES)):
+        for file_name in file_names:
+            path = os.path.join(dir_path, file_name)
+            if os.path.exists(path):
+                export_compressed_matrix(path, matrix_format)
+                compiled_paths.extend(
+                    os.path.join(
+                        dir_path, get_matrix_component_file(file_name, component, matrix_format)
+                    )
+                    for component in MATRIX_COMPONENTS
+                )
+    return compiled_paths
+
+
+def build_indexes(dir_path: str) -> list[str]:
+    """
+    Builds and serializes faiss indexes of the recommenders whose embeddings
+    are found in the directory
+    Returns paths of the serialized indexes
+    """
+    # pylint: disable=import-outside-toplevel
+    from src.recommenders import dssm_recommender, hnsw_lightfm_recommender
+    from src.recommenders.faiss_indexes import build_and_save_index
+
+    store = ArtefactStore(dir_path)
+    index_paths = []
+    for embeddings_file, index_file, index_description, build_index in (
+        (
+            hnsw_lightfm_recommender.ITEM_EMBEDDING_FILE,
+            hnsw_lightfm_recommender.INDEX_FILE,
+            hnsw_lightfm_recommender.INDEX_DESCRIPTION,
+            hnsw_lightfm_recommender.build_index,
+        ),
+        (
+            dssm_recommender.ITEM_EMBEDDING_FILE,
+            dssm_recommender.get_index_file(),
+            dssm_recommender.get_index_description(),
+            dssm_recommender.build_index,
+        ),
+    ):
+        if os.path.exists(store.get_path(embeddings_file)):
+            build_and_save_index(embeddings_file, index_file, index_description, build_index, store)
+            index_paths.append(store.get_path(index_file))
+    return index_paths
+
+
+def export_lightfm_representations(dir_path: str) -> list[str]:
+    """
+    Exports user and item representations of the pickled LightFM model
+    Returns paths of the exported files
+    """
+    # pylint: disable=import-outside-toplevel
+    from src.recommenders import lightfm_recommender
+
+    store = ArtefactStore(dir_path)
+    if not os.path.exists(store.get_path(lightfm_recommender.MODEL_FILE)):
+        return []
+    return lightfm_recommender.export_representations(store)
+
+
+def compile_offline_recs(dir_path: str) -> list[str]:
+    """
+    Converts offline recommendations of the two-stage model from json
+    into memory-mappable arrays, the json is streamed
+    Returns paths of the compiled files
+    """
+    # pylint: disable=import-outside-toplevel
+    from src.recommenders import two_stage_recommender
+
+    store = ArtefactStore(dir_path)
+    json_path = store.get_path(two_stage_recommender.OFFLINE_RECS_FILE)
+    if not os.path.exists(json_path):
+        return []
+    return two_stage_recommender.save_offline_recs(
+        store, two_stage_recommender.read_offline_recs(json_path)
+    )
+
+
+def main() -> None:
+    """
+    Runs compilation of the artefacts
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dir", default=settings.artefacts_dir, help="directory with artefacts")
+    args = parser.parse_args()
+    compiled_paths = (
+        compile_mappings(args.dir)
+        + compile_sparse_matrices(args.dir)
+        + build_indexes(args.dir)
+        + export_lightfm_representations(args.dir)
+        + compile_offline_recs(args.dir)
+    )
+    for compiled_path in compiled_paths:
+        print(f"Compiled {compiled_path}")
+
+
+if __name__ == "__main__":
+    main()
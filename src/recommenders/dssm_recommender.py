@@ -1,61 +1,163 @@
-import json
+import re
+import time
 
 import faiss
 import numpy as np
+from src.config import ViewedFilterEnum, settings
+from src.recommenders.artefact_store import get_artefact_store
 from src.recommenders.base_recommender import FilterViewedAndPopularRecommender
+from src.recommenders.faiss_indexes import load_or_build_index, search_excluding
+from src.recommenders.mappings import (
+    compose_item_mappings,
+    compose_user_mappings,
+    load_item_inv_mapping,
+    load_user_mapping,
+)
 
 # pylint: disable=duplicate-code
-DIR_PATH = "src/recommenders/artefacts"
-ITEM_INV_MAPPING_PATH = f"{DIR_PATH}/lightfm_item_inv_mappings.json"
-USER_MAPPING_PATH = f"{DIR_PATH}/lightfm_user_mappings.json"
-USER_ITEM_MATRIX_PATH = f"{DIR_PATH}/user_item_matrix.npz"
-TOP_ITEMS_PATH = f"{DIR_PATH}/top_items.json"
+ITEM_INV_MAPPING_FILE = "lightfm_item_inv_mappings.json"
+USER_MAPPING_FILE = "lightfm_user_mappings.json"
+USER_ITEM_MATRIX_FILE = "user_item_matrix.npz"
+TOP_ITEMS_FILE = "top_items.json"
 # pylint: disable=duplicate-code
-ITEM_EMBEDDING_PATH = f"{DIR_PATH}/dssm_item_embeddings.npy"
-USER_EMBEDDING_PATH = f"{DIR_PATH}/dssm_user_embeddings.npy"
-MODEL_USER_MAPPING_PATH = f"{DIR_PATH}/dssm_user_mappings.json"
-MODEL_ITEM_INV_MAPPING_PATH = f"{DIR_PATH}/dssm_item_inv_mappings.json"
+ITEM_EMBEDDING_FILE = "dssm_item_embeddings.npy"
+USER_EMBEDDING_FILE = "dssm_user_embeddings.npy"
+MODEL_USER_MAPPING_FILE = "dssm_user_mappings.json"
+MODEL_ITEM_INV_MAPPING_FILE = "dssm_item_inv_mappings.json"
 
 N_FACTORS = 256
 
 
+def get_index_file(index_factory: str | None = None) -> str:
+    """
+    Returns file name of the index built by faiss factory string,
+    by default the one from settings
+    """
+    index_factory = index_factory or settings.dssm_index_factory
+    return f"dssm_item_embeddings.{re.sub(r'[^0-9A-Za-z]+', '_', index_factory)}.index"
+
+
+def get_index_description(index_factory: str | None = None) -> str:
+    """
+    Returns description of the index parameters used in its fingerprint
+    """
+    index_factory = index_factory or settings.dssm_index_factory
+    return f"index_factory(d={N_FACTORS}, description={index_factory!r}, metric=L2)"
+
+
+def build_index(item_embeddings: np.ndarray, index_factory: str | None = None) -> faiss.Index:
+    """
+    Builds index on DSSM item embeddings by faiss factory string
+    (Flat, IVF4096,Flat, IVF4096,PQ32, HNSW32, SQ8, ...), by default the one from settings
+    Indexes requiring training are trained on the item embeddings
+    """
+    index = faiss.index_factory(N_FACTORS, index_factory or settings.dssm_index_factory)
+    if not index.is_trained:
+        index.train(item_embeddings)  # pylint: disable=no-value-for-parameter
+    index.add(item_embeddings)  # pylint: disable=no-value-for-parameter
+    return index
+
+
+def set_search_parameters(index: faiss.Index, search_parameters: str) -> None:
+    """
+    Sets search parameters of the index given as faiss parameter string
+    (nprobe=16, efSearch=64, ...)
+    """
+    if search_parameters:
+        faiss.ParameterSpace().set_index_parameters(index, search_parameters)
+
+
 class DSSMRecommender(FilterViewedAndPopularRecommender):
     """
     The base class for the recommendation system
     """
 
-    MODEL_NAME = "hnsw_lightfm"
-
     # pylint: disable=duplicate-code, no-value-for-parameter
+    MODEL_NAME = "dssm"
+    ARTEFACT_FILES = [
+        USER_ITEM_MATRIX_FILE,
+        TOP_ITEMS_FILE,
+        USER_MAPPING_FILE,
+        ITEM_INV_MAPPING_FILE,
+        ITEM_EMBEDDING_FILE,
+        USER_EMBEDDING_FILE,
+        MODEL_USER_MAPPING_FILE,
+        MODEL_ITEM_INV_MAPPING_FILE,
+    ]
+
     def __init__(self):
         super().__init__()
         self.load_artefacts(
-            USER_ITEM_MATRIX_PATH,
-            TOP_ITEMS_PATH,
-            USER_MAPPING_PATH,
-            ITEM_INV_MAPPING_PATH,
+            USER_ITEM_MATRIX_FILE,
+            TOP_ITEMS_FILE,
+            USER_MAPPING_FILE,
+            ITEM_INV_MAPPING_FILE,
+        )
+        store = get_artefact_store()
+        self.model_item_ids = load_item_inv_mapping(store.get_path(MODEL_ITEM_INV_MAPPING_FILE))
+        self.model_user_ids = compose_user_mappings(
+            self.user_mappings, load_user_mapping(store.get_path(MODEL_USER_MAPPING_FILE))
+        )
+        self.model_item_indexes = compose_item_mappings(self.item_ids, self.model_item_ids)
+        self.user_embeddings = store.load_array(USER_EMBEDDING_FILE)
+        self.index = load_or_build_index(
+            ITEM_EMBEDDING_FILE, get_index_file(), get_index_description(), build_index
         )
-        self.inv_user_mappings = {str(v): int(k) for (k, v) in self.user_mappings.items()}
-
-        with open(MODEL_ITEM_INV_MAPPING_PATH, "r", encoding="utf-8") as f:
-            self.model_item_inv_mappings = json.load(f)
-        with open(MODEL_USER_MAPPING_PATH, "r", encoding="utf-8") as f:
-            self.model_user_mappings = json.load(f)
-        with open(USER_EMBEDDING_PATH, "rb") as f:
-            self.user_embeddings = np.load(f)
-        with open(ITEM_EMBEDDING_PATH, "rb") as f:
-            item_embeddings = np.load(f)
-        self.index = faiss.IndexFlatL2(N_FACTORS)
-        self.index.add(item_embeddings)
+        set_search_parameters(self.index, settings.dssm_search_params)
 
     def get_recommendations(self, user_id: int, k: int) -> list[int]:
         """
-        Gets recommendations using Flat-index on DSSM-embeddings
+        Gets recommendations using faiss index on DSSM-embeddings
         """
-        external_user_id = self.inv_user_mappings[str(user_id)]
-        internal_user_id = self.model_user_mappings[str(external_user_id)]
+        internal_user_id = self.model_user_ids[user_id]
+        if internal_user_id < 0:
+            raise KeyError(user_id)
 
         user_vector = self.user_embeddings[internal_user_id, :].reshape(1, -1)
         _, indexes = self.index.search(user_vector, k)
-        item_id_list = [self.model_item_inv_mappings[str(ind)] for ind in indexes.reshape(-1)]
+        indexes = indexes.reshape(-1)
+        item_id_list = self.model_item_ids[indexes[indexes >= 0]].tolist()
         return item_id_list
+
+    def get_recommendations_batch(self, user_ids: np.ndarray, k: int) -> np.ndarray:
+        """
+        Gets recommendations for several users with a single search in faiss index
+        """
+        model_user_ids = self.model_user_ids[user_ids]
+        is_known = model_user_ids >= 0
+        recommended_items = np.full((len(user_ids), k), -1, dtype=np.int64)
+        if is_known.any():
+            _, indexes = self.index.search(self.user_embeddings[model_user_ids[is_known]], k)
+            recommended_items[is_known] = np.where(indexes >= 0, self.model_item_ids[indexes], -1)
+        return recommended_items
+
+    def get_unviewed_recommendations_batch(
+        self, user_ids: np.ndarray, k: int, viewed_rows: np.ndarray, viewed_items: np.ndarray
+    ) -> np.ndarray:
+        """
+        Gets k recommendations without viewed items for several users,
+        viewed items are excluded inside faiss search unless ANN_VIEWED_FILTER is overfetch
+        """
+        if settings.ann_viewed_filter == ViewedFilterEnum.OVERFETCH:
+            return super().get_unviewed_recommendations_batch(
+                user_ids, k, viewed_rows, viewed_items
+            )
+        model_user_ids = self.model_user_ids[user_ids]
+        is_known = model_user_ids >= 0
+        viewed_indexes = self.model_item_indexes[viewed_items]
+        is_indexed = viewed_indexes >= 0
+        recommended_items = np.full((len(user_ids), k), -1, dtype=np.int64)
+        if is_known.any():
+            known_rows = np.cumsum(is_known) - 1
+            is_excluded = is_indexed & is_known[viewed_rows]
+            start_time = time.perf_counter()
+            indexes = search_excluding(
+                self.index,
+                self.user_embeddings[model_user_ids[is_known]],
+                k,
+                known_rows[viewed_rows[is_excluded]],
+                viewed_indexes[is_excluded],
+            )
+            self.observe_stage("scoring", start_time)
+            recommended_items[is_known] = np.where(indexes >= 0, self.model_item_ids[indexes], -1)
+        return recommended_items
@@ -0,0 +1,152 @@
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import Any
+
+from src.config import RankFusionEnum, settings
+from src.metrics import ENSEMBLE_CALLS, ENSEMBLE_CONTRIBUTIONS
+from src.recommenders.artefact_store import get_artefact_store
+from src.recommenders.base_recommender import BaseRecommender
+
+TOP_ITEMS_FILE = "top_items.json"
+
+
+class EnsembleRecommender(BaseRecommender):
+    """
+    Recommender blending ranked recommendations of the sub-models from 'ensemble_models'
+    The sub-models are queried concurrently with a shared deadline 'ensemble_deadline_ms',
+    the ones missing it are dropped instead of waited on and are not called again
+    until their previous call finishes, so a stuck sub-model holds a single thread
+    of the shared pool, and the recommendations are merged by weighted rank fusion
+    'ensemble_fusion', popular items fill the rest
+    Results depend on which sub-models meet the deadline, so they are not cached
+    """
+
+    MODEL_NAME = "ensemble"
+    ARTEFACT_FILES = [TOP_ITEMS_FILE]
+    CACHEABLE = False
+
+    def __init__(self):
+        # pylint: disable=import-outside-toplevel
+        from src.recommenders.recommender_register import RecommenderRegister
+
+        if self.MODEL_NAME in settings.ensemble_models:
+            raise ValueError("Ensemble can not include itself")
+        with open(get_artefact_store().get_path(TOP_ITEMS_FILE), "r", encoding="utf-8") as f:
+            self.top_items = json.load(f)["items"]
+        self.weights = dict(settings.ensemble_models)
+        self.get_recommender = RecommenderRegister.get_recommender_by_model_name
+        self._running: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        for model_name in self.weights:
+            self.get_recommender(model_name)
+
+    def predict(self, user_id: int) -> list[int]:
+        """
+        Returns list of item IDs blended from the recommendations of the sub-models
+        to the user with id 'user_id'
+        """
+        return self.predict_batch([user_id])[0]
+
+    def predict_batch(self, user_ids: list[int]) -> list[list[int]]:
+        """
+        Returns lists of item IDs blended from the recommendations of the sub-models
+        to the users with ids 'user_ids'
+        """
+        start_time = time.perf_counter()
+        sub_model_items = self.call_sub_models("predict_batch", list(user_ids))
+        start_time = self.observe_stage("fan_out", start_time)
+        recommendations = []
+        for user_index in range(len(user_ids)):
+            ranked_items = {
+                model_name: sub_model_items[model_name][user_index]
+                for model_name in self.weights
+                if model_name in sub_model_items
+            }
+            items = fuse_rankings(ranked_items, self.weights, settings.n_returned_items)
+            for model_name, user_items in ranked_items.items():
+                n_contributed = len(set(items).intersection(user_items))
+                if n_contributed:
+                    ENSEMBLE_CONTRIBUTIONS.inc(n_contributed, model_name=model_name)
+            recommendations.append(items)
+        start_time = self.observe_stage("fusion", start_time)
+        recommendations = [self.add_popular_items(items) for items in recommendations]
+        self.observe_stage("popular_fill", start_time)
+        return recommendations
+
+    def call_sub_models(self, method_name: str, *args: Any) -> dict[str, Any]:
+        """
+        Calls the method of the sub-models concurrently and returns results of the ones
+        finished before the deadline, calls that are not started yet are cancelled
+        Sub-models still busy with the previous call are skipped as timed out
+        """
+        pool = get_ensemble_pool()
+        futures: dict[Future, str] = {}
+        with self._lock:
+            for model_name in self.weights:
+                if model_name in self._running and not self._running[model_name].done():
+                    ENSEMBLE_CALLS.inc(model_name=model_name, status="timeout")
+                    continue
+                future = pool.submit(self.call_sub_model, model_name, method_name, *args)
+                self._running[model_name] = future
+                futures[future] = model_name
+        done, not_done = wait(futures, timeout=settings.ensemble_deadline_ms / 1000)
+        for future in not_done:
+            future.cancel()
+            ENSEMBLE_CALLS.inc(model_name=futures[future], status="timeout")
+        results = {}
+        for future in done:
+            model_name = futures[future]
+            if future.exception() is not None:
+                ENSEMBLE_CALLS.inc(model_name=model_name, status="error")
+                continue
+            ENSEMBLE_CALLS.inc(model_name=model_name, status="ok")
+            results[model_name] = future.result()
+        return results
+
+    def call_sub_model(self, model_name: str, method_name: str, *args: Any) -> Any:
+        """
+        Calls the method of the sub-model resident in the register
+        """
+        return getattr(self.get_recommender(model_name), method_name)(*args)
+
+    def add_popular_items(self, items: list[int]) -> list[int]:
+        """
+        Fills the recommendations with popular items up to 'n_returned_items'
+        """
+        if len(items) >= settings.n_returned_items:
+            return items
+        recommended = set(items)
+        popular_items = [item_id for item_id in self.top_items if item_id not in recommended]
+        return (items + popular_items)[: settings.n_returned_items]
+
+
+def fuse_rankings(
+    ranked_items: dict[str, list[int]], weights: dict[str, float], n_items: int
+) -> list[int]:
+    """
+    Merges ranked lists of item IDs of the models into top 'n_items' items
+    by weighted reciprocal rank fusion sum(w / (k + rank)) with k = 'ensemble_rrf_k'
+    or by weighted sum of ranks normalized into scores (n - rank + 1) / n, rank from 1
+    Ties keep the order in which the items are met
+    """
+    scores: dict[int, float] = {}
+    for model_name, items in ranked_items.items():
+        weight = weights.get(model_name, 1.0)
+        for rank, item_id in enumerate(items, start=1):
+            if settings.ensemble_fusion == RankFusionEnum.RRF:
+                score = weight / (settings.ensemble_rrf_k + rank)
+            else:
+                score = weight * (len(items) - rank + 1) / len(items)
+            scores[item_id] = scores.get(item_id, 0.0) + score
+    return sorted(scores, key=scores.__getitem__, reverse=True)[:n_items]
+
+
+@lru_cache(maxsize=None)
+def get_ensemble_pool() -> ThreadPoolExecutor:
+    """
+    Returns pool of threads calling the ensemble sub-models shared within the process
+    """
+    return ThreadPoolExecutor(max_workers=settings.ensemble_threads, thread_name_prefix="ensemble")
@@ -0,0 +1,151 @@
+import hashlib
+import os
+from typing import Callable
+
+import faiss
+import numpy as np
+
+from src.config import ViewedFilterEnum, settings
+from src.recommenders.artefact_store import ArtefactStore, get_artefact_store, write_atomically
+
+MMAP_IO_FLAGS = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+
+
+def get_index_fingerprint(embeddings_path: str, index_description: str) -> str:
+    """
+    Returns fingerprint of the embeddings by their size and modification time
+    and of the parameters of the index built on them,
+    so checking the index does not read the embeddings
+    """
+    stat = os.stat(embeddings_path)
+    return hashlib.sha256(
+        f"{index_description};{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8")
+    ).hexdigest()
+
+
+def get_fingerprint_path(index_path: str) -> str:
+    """
+    Returns path of the file with fingerprint of the serialized index
+    """
+    return f"{index_path}.sha256"
+
+
+def read_index(index_path: str) -> faiss.Index:
+    """
+    Reads serialized index with memory mapping when it is supported
+    """
+    try:
+        return faiss.read_index(index_path, MMAP_IO_FLAGS)
+    except RuntimeError:
+        return faiss.read_index(index_path)
+
+
+def save_index(index: faiss.Index, index_path: str, fingerprint: str) -> None:
+    """
+    Serializes index and its fingerprint
+    Files are replaced atomically, so concurrent readers never see a partial index
+    """
+    write_atomically(
+        index_path, lambda f: faiss.write_index(index, faiss.PyCallbackIOWriter(f.write))
+    )
+    write_atomically(
+        get_fingerprint_path(index_path), lambda f: f.write(fingerprint.encode("utf-8"))
+    )
+
+
+def build_and_save_index(
+    embeddings_file: str,
+    index_file: str,
+    index_description: str,
+    build_index: Callable[[np.ndarray], faiss.Index],
+    store: ArtefactStore | None = None,
+) -> faiss.Index:
+    """
+    Builds index on the embeddings and serializes it next to them
+    """
+    store = store or get_artefact_store()
+    embeddings_path = store.get_path(embeddings_file)
+    index = build_index(np.ascontiguousarray(store.load_array(embeddings_file)))
+    save_index(
+        index,
+        store.get_path(index_file),
+        get_index_fingerprint(embeddings_path, index_description),
+    )
+    return index
+
+
+def load_or_build_index(
+    embeddings_file: str,
+    index_file: str,
+    index_description: str,
+    build_index: Callable[[np.ndarray], faiss.Index],
+    store: ArtefactStore | None = None,
+) -> faiss.Index:
+    """
+    Loads prebuilt index if its fingerprint matches the embeddings and the parameters,
+    otherwise builds the index and tries to persist it for the next start
+    """
+    store = store or get_artefact_store()
+    index_path = store.get_path(index_file)
+    fingerprint = get_index_fingerprint(store.get_path(embeddings_file), index_description)
+    try:
+        with open(get_fingerprint_path(index_path), "r", encoding="utf-8") as f:
+            if f.read().strip() == fingerprint:
+                return read_index(index_path)
+    except OSError:
+        pass
+    index = build_index(np.ascontiguousarray(store.load_array(embeddings_file)))
+    try:
+        save_index(index, index_path, fingerprint)
+    except OSError:
+        pass
+    return index
+
+
+def search_excluding(
+    index: faiss.Index,
+    queries: np.ndarray,
+    k: int,
+    excluded_rows: np.ndarray,
+    excluded_ids: np.ndarray,
+) -> np.ndarray:
+    """
+    Searches k nearest neighbours of each query excluding the IDs given by pairs
+    (excluded_rows, excluded_ids) inside the search with ID selector
+    chosen by ANN_VIEWED_FILTER: bitmap of allowed IDs or hash set of excluded IDs
+    Returns 2d array of IDs padded with -1
+    """
+    labels = np.full((len(queries), k), -1, dtype=np.int64)
+    order = np.argsort(excluded_rows, kind="stable")
+    bounds = np.searchsorted(excluded_rows[order], np.arange(len(queries) + 1))
+    for row, query in enumerate(queries):
+        ids = excluded_ids[order[bounds[row] : bounds[row + 1]]].astype(np.int64)
+        if len(ids) == 0:
+            _, labels[row] = index.search(query.reshape(1, -1), k)
+            continue
+        if settings.ann_viewed_filter == ViewedFilterEnum.BITMAP:
+            bitmap = np.full((index.ntotal + 7) // 8, 0xFF, dtype=np.uint8)
+            np.bitwise_and.at(bitmap, ids >> 3, ~(1 << (ids & 7)).astype(np.uint8))
+            selector = faiss.IDSelectorBitmap(bitmap)  # pylint: disable=no-value-for-parameter
+        else:
+            excluded = faiss.IDSelectorBatch(ids)  # pylint: disable=no-value-for-parameter
+            selector = faiss.IDSelectorNot(excluded)
+        _, labels[row] = index.search(
+            query.reshape(1, -1), k, params=get_search_parameters(index, selector)
+        )
+    return labels
+
+
+def get_search_parameters(index: faiss.Index, selector: faiss.IDSelector) -> faiss.SearchParameters:
+    """
+    Returns search parameters with ID selector keeping nprobe and efSearch of the index
+    """
+    # pylint: disable=unexpected-keyword-arg
+    ivf_index = faiss.try_extract_index_ivf(index)
+    if ivf_index is not None:
+        return faiss.SearchParametersIVF(
+            sel=selector, nprobe=ivf_index.nprobe, max_codes=ivf_index.max_codes
+        )
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
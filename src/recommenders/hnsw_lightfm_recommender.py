@@ -1,20 +1,36 @@
+import time
+
 import faiss
 import numpy as np
+from src.config import ViewedFilterEnum, settings
+from src.recommenders.artefact_store import get_artefact_store
 from src.recommenders.base_recommender import FilterViewedAndPopularRecommender
+from src.recommenders.faiss_indexes import load_or_build_index, search_excluding
 
 
-DIR_PATH = "src/recommenders/artefacts"
-ITEM_INV_MAPPING_PATH = f"{DIR_PATH}/lightfm_item_inv_mappings.json"
-USER_MAPPING_PATH = f"{DIR_PATH}/lightfm_user_mappings.json"
-ITEM_EMBEDDING_PATH = f"{DIR_PATH}/hnsw_item_embeddings.npy"
-USER_EMBEDDING_PATH = f"{DIR_PATH}/hnsw_user_embeddings.npy"
-USER_ITEM_MATRIX_PATH = f"{DIR_PATH}/user_item_matrix.npz"
-TOP_ITEMS_PATH = f"{DIR_PATH}/top_items.json"
+ITEM_INV_MAPPING_FILE = "lightfm_item_inv_mappings.json"
+USER_MAPPING_FILE = "lightfm_user_mappings.json"
+ITEM_EMBEDDING_FILE = "hnsw_item_embeddings.npy"
+USER_EMBEDDING_FILE = "hnsw_user_embeddings.npy"
+INDEX_FILE = "hnsw_item_embeddings.index"
+USER_ITEM_MATRIX_FILE = "user_item_matrix.npz"
+TOP_ITEMS_FILE = "top_items.json"
 
 D = 258 + 1
 M = 48
 EF_SEARCH = 16
 EF_CONSTRUCTION = 64
+INDEX_DESCRIPTION = f"IndexHNSWFlat(d={D}, M={M}, efConstruction={EF_CONSTRUCTION})"
+
+
+def build_index(item_embeddings: np.ndarray) -> faiss.Index:
+    """
+    Builds HNSW-index on LightFM item embeddings
+    """
+    index = faiss.IndexHNSWFlat(D, M)
+    index.hnsw.efConstruction = EF_CONSTRUCTION
+    index.add(item_embeddings)  # pylint: disable=no-value-for-parameter
+    return index
 
 
 class HNSWLightFMRecommender(FilterViewedAndPopularRecommender):
@@ -22,31 +38,62 @@ class HNSWLightFMRecommender(FilterViewedAndPopularRecommender):
     The base class for the recommendation system
     """
 
+    # pylint: disable=duplicate-code, no-value-for-parameter
     MODEL_NAME = "hnsw_lightfm"
+    ARTEFACT_FILES = [
+        USER_ITEM_MATRIX_FILE,
+        TOP_ITEMS_FILE,
+        USER_MAPPING_FILE,
+        ITEM_INV_MAPPING_FILE,
+        ITEM_EMBEDDING_FILE,
+        USER_EMBEDDING_FILE,
+    ]
 
-    # pylint: disable=duplicate-code, no-value-for-parameter
     def __init__(self):
         super().__init__()
         self.load_artefacts(
-            USER_ITEM_MATRIX_PATH,
-            TOP_ITEMS_PATH,
-            USER_MAPPING_PATH,
-            ITEM_INV_MAPPING_PATH,
+            USER_ITEM_MATRIX_FILE,
+            TOP_ITEMS_FILE,
+            USER_MAPPING_FILE,
+            ITEM_INV_MAPPING_FILE,
+        )
+        self.user_embeddings = get_artefact_store().load_array(USER_EMBEDDING_FILE)
+        self.index = load_or_build_index(
+            ITEM_EMBEDDING_FILE, INDEX_FILE, INDEX_DESCRIPTION, build_index
         )
-        with open(USER_EMBEDDING_PATH, "rb") as f:
-            self.user_embeddings = np.load(f)
-        with open(ITEM_EMBEDDING_PATH, "rb") as f:
-            item_embeddings = np.load(f)
-        self.index = faiss.IndexHNSWFlat(D, M)
-        self.index.hnsw.efConstruction = EF_CONSTRUCTION
         self.index.hnsw.efSearch = EF_SEARCH
-        self.index.add(item_embeddings)
 
     def get_recommendations(self, user_id: int, k: int) -> list[int]:
         """
         Gets recommendations using HNSW-index on LightFM-embeddings
         """
-        user_vector = self.user_embeddings[self.user_mappings[str(user_id)]].reshape(1, -1)
+        user_vector = self.user_embeddings[user_id].reshape(1, -1)
         _, indexes = self.index.search(user_vector, k)
-        item_id_list = [self.item_inv_mappings[str(ind)] for ind in indexes.reshape(-1)]
+        indexes = indexes.reshape(-1)
+        item_id_list = self.item_ids[indexes[indexes >= 0]].tolist()
         return item_id_list
+
+    def get_recommendations_batch(self, user_ids: np.ndarray, k: int) -> np.ndarray:
+        """
+        Gets recommendations for several users with a single search in HNSW-index
+        """
+        _, indexes = self.index.search(self.user_embeddings[user_ids], k)
+        return np.where(indexes >= 0, self.item_ids[indexes], -1)
+
+    def get_unviewed_recommendations_batch(
+        self, user_ids: np.ndarray, k: int, viewed_rows: np.ndarray, viewed_items: np.ndarray
+    ) -> np.ndarray:
+        """
+        Gets k recommendations without viewed items for several users,
+        viewed items are excluded inside HNSW search unless ANN_VIEWED_FILTER is overfetch
+        """
+        if settings.ann_viewed_filter == ViewedFilterEnum.OVERFETCH:
+            return super().get_unviewed_recommendations_batch(
+                user_ids, k, viewed_rows, viewed_items
+            )
+        start_time = time.perf_counter()
+        indexes = search_excluding(
+            self.index, self.user_embeddings[user_ids], k, viewed_rows, viewed_items
+        )
+        self.observe_stage("scoring", start_time)
+        return np.where(indexes >= 0, self.item_ids[indexes], -1)
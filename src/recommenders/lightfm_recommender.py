@@ -1,14 +1,75 @@
 import pickle
+import time
+from typing import Any
+
 import numpy as np
-from src.recommenders.base_recommender import FilterViewedAndPopularRecommender
+from src.config import settings
+from src.recommenders.artefact_store import (
+    ArtefactStore,
+    get_artefact_store,
+    is_up_to_date,
+    save_array,
+)
+from src.recommenders.base_recommender import (
+    FilterViewedAndPopularRecommender,
+    select_top_k,
+    select_unviewed_top_k,
+)
+
+
+MODEL_FILE = "lightfm.pickle"
+ITEM_INV_MAPPING_FILE = "lightfm_item_inv_mappings.json"
+USER_MAPPING_FILE = "lightfm_user_mappings.json"
+USER_ITEM_MATRIX_FILE = "user_item_matrix.npz"
+TOP_ITEMS_FILE = "top_items.json"
+
+USER_BIAS_FILE = "lightfm_user_biases.npy"
+USER_EMBEDDING_FILE = "lightfm_user_embeddings.npy"
+ITEM_BIAS_FILE = "lightfm_item_biases.npy"
+ITEM_EMBEDDING_FILE = "lightfm_item_embeddings.npy"
+REPRESENTATION_FILES = [USER_BIAS_FILE, USER_EMBEDDING_FILE, ITEM_BIAS_FILE, ITEM_EMBEDDING_FILE]
+
+
+def load_model(store: ArtefactStore) -> Any:
+    """
+    Loads pickled LightFM model
+    """
+    with open(store.get_path(MODEL_FILE), "rb") as f:
+        return pickle.load(f)
+
+
+def get_representations(model: Any) -> list[np.ndarray]:
+    """
+    Extracts user and item biases and embeddings of LightFM model
+    as contiguous float32 arrays ordered as REPRESENTATION_FILES
+    """
+    user_biases, user_embeddings = model.get_user_representations()
+    item_biases, item_embeddings = model.get_item_representations()
+    return [
+        np.ascontiguousarray(representation, dtype=np.float32)
+        for representation in (user_biases, user_embeddings, item_biases, item_embeddings)
+    ]
+
+
+def export_representations(store: ArtefactStore) -> list[str]:
+    """
+    Exports representations of the pickled LightFM model into .npy-files
+    Returns paths of the exported files
+    """
+    paths = [store.get_path(file_name) for file_name in REPRESENTATION_FILES]
+    for path, representation in zip(paths, get_representations(load_model(store))):
+        save_array(path, representation)
+    return paths
 
 
-DIR_PATH = "src/recommenders/artefacts"
-MODEL_PATH = f"{DIR_PATH}/lightfm.pickle"
-ITEM_INV_MAPPING_PATH = f"{DIR_PATH}/lightfm_item_inv_mappings.json"
-USER_MAPPING_PATH = f"{DIR_PATH}/lightfm_user_mappings.json"
-USER_ITEM_MATRIX_PATH = f"{DIR_PATH}/user_item_matrix.npz"
-TOP_ITEMS_PATH = f"{DIR_PATH}/top_items.json"
+def are_representations_exported(store: ArtefactStore) -> bool:
+    """
+    Checks whether representations are exported and not older than the pickled model
+    """
+    return is_up_to_date(
+        [store.get_path(file_name) for file_name in REPRESENTATION_FILES],
+        store.get_path(MODEL_FILE),
+    )
 
 
 class LightFMRecommender(FilterViewedAndPopularRecommender):
@@ -16,26 +77,88 @@ class LightFMRecommender(FilterViewedAndPopularRecommender):
     The base class for the recommendation system
     """
 
+    # pylint: disable=duplicate-code
     MODEL_NAME = "lightfm"
+    ARTEFACT_FILES = [
+        USER_ITEM_MATRIX_FILE,
+        TOP_ITEMS_FILE,
+        USER_MAPPING_FILE,
+        ITEM_INV_MAPPING_FILE,
+        MODEL_FILE,
+    ]
 
-    # pylint: disable=duplicate-code
     def __init__(self):
         super().__init__()
         self.load_artefacts(
-            USER_ITEM_MATRIX_PATH,
-            TOP_ITEMS_PATH,
-            USER_MAPPING_PATH,
-            ITEM_INV_MAPPING_PATH,
+            USER_ITEM_MATRIX_FILE,
+            TOP_ITEMS_FILE,
+            USER_MAPPING_FILE,
+            ITEM_INV_MAPPING_FILE,
         )
-        with open(MODEL_PATH, "rb") as f:
-            self.model = pickle.load(f)
+        self.model = None
+        self.load_representations()
+
+    def load_representations(self) -> None:
+        """
+        Loads exported representations with memory mapping,
+        they are exported from the pickled model if they are missing or outdated
+        The pickled model itself is kept only with 'lightfm_load_pickle'
+        """
+        store = get_artefact_store()
+        if not settings.lightfm_load_pickle and not are_representations_exported(store):
+            try:
+                export_representations(store)
+            except OSError:
+                pass
+        if settings.lightfm_load_pickle or not are_representations_exported(store):
+            model = load_model(store)
+            representations = get_representations(model)
+            if settings.lightfm_load_pickle:
+                self.model = model
+        else:
+            representations = [store.load_array(file_name) for file_name in REPRESENTATION_FILES]
+        (
+            self.user_biases,
+            self.user_embeddings,
+            self.item_biases,
+            self.item_embeddings,
+        ) = representations
 
     def get_recommendations(self, user_id: int, k: int) -> list[int]:
         """
-        Gets recommendations using LightFM
+        Gets recommendations using LightFM representations
         """
-        all_items = np.arange(len(self.item_inv_mappings))
-        scores = self.model.predict(user_id, all_items)
-        indexes = np.argpartition(scores, -k)[-k:][::-1]
-        item_id_list = [self.item_inv_mappings[str(ind)] for ind in indexes]
+        scores = self.item_embeddings @ self.user_embeddings[user_id]
+        scores += self.item_biases + self.user_biases[user_id]
+        indexes = select_top_k(scores, k)
+        item_id_list = self.item_ids[indexes].tolist()
         return item_id_list
+
+    def get_recommendations_batch(self, user_ids: np.ndarray, k: int) -> np.ndarray:
+        """
+        Gets recommendations for several users with a single matrix multiplication
+        of LightFM representations
+        """
+        return self.item_ids[select_top_k(self.get_scores_batch(user_ids), k)]
+
+    def get_unviewed_recommendations_batch(
+        self, user_ids: np.ndarray, k: int, viewed_rows: np.ndarray, viewed_items: np.ndarray
+    ) -> np.ndarray:
+        """
+        Gets recommendations for several users masking viewed items in LightFM scores
+        """
+        start_time = time.perf_counter()
+        scores = self.get_scores_batch(user_ids)
+        start_time = self.observe_stage("scoring", start_time)
+        indexes = select_unviewed_top_k(scores, k, viewed_rows, viewed_items)
+        recommended_items = np.where(indexes >= 0, self.item_ids[indexes], -1)
+        self.observe_stage("filtering", start_time)
+        return recommended_items
+
+    def get_scores_batch(self, user_ids: np.ndarray) -> np.ndarray:
+        """
+        Gets scores of all items for several users from LightFM representations
+        """
+        scores = self.user_embeddings[user_ids] @ self.item_embeddings.T
+        scores += self.item_biases + self.user_biases[user_ids, np.newaxis]
+        return scores
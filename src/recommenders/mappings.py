@@ -0,0 +1,141 @@
+import json
+import os
+
+import numpy as np
+
+from src.recommenders.artefact_store import is_up_to_date
+
+
+class UserMapping:
+    """
+    Mapping of external user IDs to internal ones
+    backed by sorted external IDs and aligned internal IDs
+    """
+
+    def __init__(self, external_ids: np.ndarray, internal_ids: np.ndarray):
+        order = np.argsort(external_ids, kind="stable")
+        self.external_ids = np.ascontiguousarray(external_ids[order], dtype=np.int64)
+        self.internal_ids = np.ascontiguousarray(internal_ids[order], dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.external_ids)
+
+    def __contains__(self, user_id: int) -> bool:
+        return self.get(user_id) >= 0
+
+    def __getitem__(self, user_id: int) -> int:
+        internal_id = self.get(user_id)
+        if internal_id < 0:
+            raise KeyError(user_id)
+        return internal_id
+
+    def get(self, user_id: int, default: int = -1) -> int:
+        """
+        Returns internal ID of the user or 'default' for unknown user
+        """
+        position = np.searchsorted(self.external_ids, user_id)
+        if position < len(self.external_ids) and self.external_ids[position] == user_id:
+            return int(self.internal_ids[position])
+        return default
+
+    def map(self, user_ids: np.ndarray) -> np.ndarray:
+        """
+        Returns internal IDs of the users, -1 for unknown users
+        """
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        if len(self.external_ids) == 0:
+            return np.full(user_ids.shape, -1, dtype=np.int64)
+        positions = np.searchsorted(self.external_ids, user_ids)
+        positions = np.minimum(positions, len(self.external_ids) - 1)
+        return np.where(self.external_ids[positions] == user_ids, self.internal_ids[positions], -1)
+
+    def inverse(self) -> np.ndarray:
+        """
+        Returns external IDs indexed by internal IDs, -1 for unused internal IDs
+        """
+        external_ids = np.full(self.internal_ids.max(initial=-1) + 1, -1, dtype=np.int64)
+        external_ids[self.internal_ids] = self.external_ids
+        return external_ids
+
+    def save(self, path: str) -> None:
+        """
+        Saves mapping as 2 x n_users array of external and internal IDs
+        """
+        np.save(path, np.vstack([self.external_ids, self.internal_ids]))
+
+    @classmethod
+    def from_json(cls, path: str) -> "UserMapping":
+        """
+        Builds mapping from json-file {external ID: internal ID}
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            mapping = json.load(f)
+        external_ids = np.fromiter(mapping.keys(), dtype=np.int64, count=len(mapping))
+        internal_ids = np.fromiter(mapping.values(), dtype=np.int64, count=len(mapping))
+        return cls(external_ids, internal_ids)
+
+    @classmethod
+    def from_npy(cls, path: str) -> "UserMapping":
+        """
+        Loads mapping saved by 'save'
+        """
+        external_ids, internal_ids = np.load(path)
+        return cls(external_ids, internal_ids)
+
+
+def item_inv_mapping_from_json(path: str) -> np.ndarray:
+    """
+    Builds array of external item IDs indexed by internal IDs
+    from json-file {internal ID: external ID}, -1 for missing internal IDs
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        mapping = json.load(f)
+    internal_ids = np.fromiter(mapping.keys(), dtype=np.int64, count=len(mapping))
+    external_ids = np.fromiter(mapping.values(), dtype=np.int64, count=len(mapping))
+    item_ids = np.full(internal_ids.max(initial=-1) + 1, -1, dtype=np.int64)
+    item_ids[internal_ids] = external_ids
+    return item_ids
+
+
+def compose_user_mappings(user_mapping: UserMapping, model_user_mapping: UserMapping) -> np.ndarray:
+    """
+    Returns array of the model internal user IDs indexed by internal user IDs of 'user_mapping',
+    -1 for users unknown to the model
+    """
+    return model_user_mapping.map(user_mapping.inverse())
+
+
+def compose_item_mappings(item_ids: np.ndarray, model_item_ids: np.ndarray) -> np.ndarray:
+    """
+    Returns array of the model internal item IDs indexed by internal item IDs,
+    where both are given as arrays of external item IDs, -1 for items unknown to the model
+    """
+    model_item_mapping = UserMapping(model_item_ids, np.arange(len(model_item_ids)))
+    return np.where(item_ids >= 0, model_item_mapping.map(item_ids), -1)
+
+
+def get_compiled_path(json_path: str) -> str:
+    """
+    Returns path of the compiled mapping for json-file
+    """
+    return f"{os.path.splitext(json_path)[0]}.npy"
+
+
+def load_user_mapping(json_path: str) -> UserMapping:
+    """
+    Loads compiled user mapping if it is up to date, otherwise builds it from json-file
+    """
+    compiled_path = get_compiled_path(json_path)
+    if is_up_to_date([compiled_path], json_path):
+        return UserMapping.from_npy(compiled_path)
+    return UserMapping.from_json(json_path)
+
+
+def load_item_inv_mapping(json_path: str) -> np.ndarray:
+    """
+    Loads compiled item inverse mapping if it is up to date, otherwise builds it from json-file
+    """
+    compiled_path = get_compiled_path(json_path)
+    if is_up_to_date([compiled_path], json_path):
+        return np.load(compiled_path)
+    return item_inv_mapping_from_json(json_path)
@@ -0,0 +1,173 @@
+"""
+Precomputes recommendations of the models for all their users in parallel chunks
+and writes them into the artefacts directory for serving with MATERIALIZED_MODELS
+Interrupted runs are resumed from the completed chunks
+
+Usage: python -m src.recommenders.materialize lightfm dssm [--chunk-size 10000] [--workers 4]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+
+import numpy as np
+
+from src.config import settings
+from src.exceptions import ModelNotFoundError
+from src.recommenders.artefact_store import ArtefactStore, get_artefact_store, write_atomically
+from src.recommenders.base_recommender import BaseRecommender
+from src.recommenders.materialized_recommender import (
+    MATERIALIZED_DIR,
+    get_items_file,
+    get_manifest_file,
+    get_user_ids_file,
+)
+from src.recommenders.recommender_register import RecommenderRegister
+
+
+@lru_cache(maxsize=None)
+def load_recommender(model_name: str) -> BaseRecommender:
+    """
+    Loads online recommender once per process
+    """
+    return RecommenderRegister.get_recommender_class(model_name)()
+
+
+def materialize_chunk(model_name: str, user_ids: np.ndarray, chunk_path: str) -> int:
+    """
+    Predicts recommendations for the chunk of users and saves them into .npz-file
+    Returns number of users in the chunk
+    """
+    recommendations = load_recommender(model_name).predict_batch(user_ids.tolist())
+    items = np.full((len(user_ids), max(map(len, recommendations), default=0)), -1, dtype=np.int64)
+    for row, user_items in zip(items, recommendations):
+        row[: len(user_items)] = user_items
+    write_atomically(chunk_path, lambda f: np.savez(f, user_ids=user_ids, items=items))
+    return len(user_ids)
+
+
+def materialize(model_name: str, chunk_size: int, n_workers: int) -> None:
+    """
+    Materializes recommendations of the model for all its users
+    """
+    store = get_artefact_store()
+    recommender_class = RecommenderRegister.get_recommender_class(model_name)
+    manifest = {
+        "model_name": model_name,
+        "artefact_version": store.get_version(recommender_class.ARTEFACT_FILES),
+        "n_returned_items": settings.n_returned_items,
+        "chunk_size": chunk_size,
+    }
+    chunks_dir = prepare_chunks_dir(store, model_name, manifest)
+    user_ids = np.unique(load_recommender(model_name).get_user_ids()).astype(np.int64)
+    chunks = {
+        os.path.join(chunks_dir, f"chunk-{start // chunk_size:06d}.npz"): user_ids[
+            start : start + chunk_size
+        ]
+        for start in range(0, len(user_ids), chunk_size)
+    }
+    pending_chunks = {path: chunk for path, chunk in chunks.items() if not os.path.exists(path)}
+    n_done = len(user_ids) - sum(map(len, pending_chunks.values()))
+    print(f"{model_name}: {n_done}/{len(user_ids)} users already materialized", flush=True)
+
+    start_time, n_predicted = time.perf_counter(), 0
+    for n_chunk_users in run_chunks(model_name, pending_chunks, n_workers):
+        n_predicted += n_chunk_users
+        users_per_second = n_predicted / (time.perf_counter() - start_time)
+        print(
+            f"{model_name}: {n_done + n_predicted}/{len(user_ids)} users, "
+            f"{users_per_second:.0f} users/sec",
+            flush=True,
+        )
+    merge_chunks(store, model_name, list(chunks), manifest)
+    shutil.rmtree(chunks_dir)
+
+
+def run_chunks(model_name: str, chunks: dict[str, np.ndarray], n_workers: int):
+    """
+    Materializes chunks in the pool of processes
+    Yields numbers of users of the completed chunks
+    """
+    if n_workers <= 1:
+        for path, user_ids in chunks.items():
+            yield materialize_chunk(model_name, user_ids, path)
+        return
+    with ProcessPoolExecutor(
+        max_workers=n_workers, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        futures = [
+            pool.submit(materialize_chunk, model_name, user_ids, path)
+            for path, user_ids in chunks.items()
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def prepare_chunks_dir(store: ArtefactStore, model_name: str, manifest: dict) -> str:
+    """
+    Creates directory for the chunks of the model
+    Chunks of a run with another manifest are removed
+    """
+    chunks_dir = store.get_path(f"{MATERIALIZED_DIR}/{model_name}.chunks")
+    manifest_path = os.path.join(chunks_dir, "manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            if json.load(f) != manifest:
+                shutil.rmtree(chunks_dir)
+    os.makedirs(chunks_dir, exist_ok=True)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    return chunks_dir
+
+
+def merge_chunks(store: ArtefactStore, model_name: str, chunk_paths: list[str], manifest: dict):
+    """
+    Merges chunks into the arrays of sorted user IDs and their recommendations
+    """
+    user_ids, items = [], []
+    for chunk_path in chunk_paths:
+        with np.load(chunk_path) as chunk:
+            user_ids.append(chunk["user_ids"])
+            items.append(chunk["items"])
+    n_items = max((chunk_items.shape[1] for chunk_items in items), default=0)
+    items = [
+        np.pad(chunk_items, ((0, 0), (0, n_items - chunk_items.shape[1])), constant_values=-1)
+        for chunk_items in items
+    ]
+    user_ids = np.concatenate(user_ids) if user_ids else np.zeros(0, dtype=np.int64)
+    items = np.concatenate(items) if items else np.zeros((0, 0), dtype=np.int64)
+    write_atomically(store.get_path(get_user_ids_file(model_name)), lambda f: np.save(f, user_ids))
+    write_atomically(store.get_path(get_items_file(model_name)), lambda f: np.save(f, items))
+    manifest = dict(manifest, n_users=len(user_ids))
+    write_atomically(
+        store.get_path(get_manifest_file(model_name)),
+        lambda f: f.write(json.dumps(manifest).encode("utf-8")),
+    )
+
+
+def main() -> None:
+    """
+    Runs materialization of the models
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("models", nargs="+", help="names of the models")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="users per chunk")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of processes")
+    args = parser.parse_args()
+    for model_name in args.models:
+        try:
+            recommender_class = RecommenderRegister.get_recommender_class(model_name)
+        except ModelNotFoundError:
+            parser.error(f"unknown model {model_name}")
+        if not recommender_class.CACHEABLE:
+            parser.error(f"recommendations of {model_name} are not deterministic")
+    for model_name in args.models:
+        materialize(model_name, args.chunk_size, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import json
+import threading
+import warnings
+
+import numpy as np
+
+from src.config import settings
+from src.recommenders.artefact_store import get_artefact_store
+from src.recommenders.base_recommender import BaseRecommender
+
+MATERIALIZED_DIR = "materialized"
+
+
+def get_user_ids_file(model_name: str) -> str:
+    """
+    Returns file name of sorted user IDs materialized for the model
+    """
+    return f"{MATERIALIZED_DIR}/{model_name}.user_ids.npy"
+
+
+def get_items_file(model_name: str) -> str:
+    """
+    Returns file name of recommendations materialized for the model,
+    row i is recommended to i-th user, padded with -1
+    """
+    return f"{MATERIALIZED_DIR}/{model_name}.items.npy"
+
+
+def get_manifest_file(model_name: str) -> str:
+    """
+    Returns file name of the description of the results materialized for the model
+    """
+    return f"{MATERIALIZED_DIR}/{model_name}.json"
+
+
+class MaterializedRecommender(BaseRecommender):
+    """
+    Recommender answering from the results materialized offline,
+    users missing from them are predicted online by the wrapped recommender
+    which is loaded on the first such user, all users are predicted online
+    if the results are missing or outdated
+    """
+
+    def __init__(self, recommender_class: type[BaseRecommender]):
+        self.MODEL_NAME = recommender_class.MODEL_NAME  # pylint: disable=invalid-name
+        self.CACHEABLE = recommender_class.CACHEABLE  # pylint: disable=invalid-name
+        self.ARTEFACT_FILES = recommender_class.ARTEFACT_FILES + [  # pylint: disable=invalid-name
+            get_user_ids_file(self.MODEL_NAME),
+            get_items_file(self.MODEL_NAME),
+        ]
+        self.recommender_class = recommender_class
+        store = get_artefact_store()
+        self.user_ids = np.zeros(0, dtype=np.int64)
+        self.items = np.zeros((0, settings.n_returned_items), dtype=np.int64)
+        try:
+            with open(
+                store.get_path(get_manifest_file(self.MODEL_NAME)), "r", encoding="utf-8"
+            ) as f:
+                artefact_version = json.load(f)["artefact_version"]
+            if artefact_version == store.get_version(recommender_class.ARTEFACT_FILES):
+                self.user_ids = store.load_array(get_user_ids_file(self.MODEL_NAME))
+                self.items = store.load_array(get_items_file(self.MODEL_NAME))
+            else:
+                warnings.warn(
+                    f"Materialized results of {self.MODEL_NAME} are outdated, "
+                    "all users are predicted online"
+                )
+        except OSError:
+            self.user_ids = np.zeros(0, dtype=np.int64)
+            warnings.warn(
+                f"Materialized results of {self.MODEL_NAME} are missing, "
+                "all users are predicted online"
+            )
+        self._recommender: BaseRecommender | None = None
+        self._lock = threading.Lock()
+
+    def predict(self, user_id: int) -> list[int]:
+        """
+        Returns list of item IDs materialized for the user with id 'user_id'
+        or predicted online if the user is missing
+        """
+        return self.predict_batch([user_id])[0]
+
+    def predict_batch(self, user_ids: list[int]) -> list[list[int]]:
+        """
+        Returns lists of item IDs materialized for the users with ids 'user_ids',
+        missing users are predicted online
+        """
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        positions = np.searchsorted(self.user_ids, user_ids)
+        positions = np.minimum(positions, max(len(self.user_ids) - 1, 0))
+        is_materialized = np.zeros(len(user_ids), dtype=bool)
+        if len(self.user_ids) > 0:
+            is_materialized = self.user_ids[positions] == user_ids
+        recommendations = [
+            row[row >= 0].tolist()
+            for row in self.items[positions[is_materialized], : settings.n_returned_items]
+        ]
+        if is_materialized.all():
+            return recommendations
+        missing_recommendations = self.get_online_recommender().predict_batch(
+            user_ids[~is_materialized].tolist()
+        )
+        results = []
+        materialized, missing = iter(recommendations), iter(missing_recommendations)
+        for user_is_materialized in is_materialized:
+            results.append(next(materialized) if user_is_materialized else next(missing))
+        return results
+
+    def get_user_ids(self) -> np.ndarray:
+        """
+        Returns external IDs of the users with materialized recommendations
+        """
+        return self.user_ids
+
+    def get_online_recommender(self) -> BaseRecommender:
+        """
+        Returns the wrapped recommender, loads it on the first call
+        """
+        with self._lock:
+            if self._recommender is None:
+                self._recommender = self.recommender_class()
+            return self._recommender
@@ -0,0 +1,111 @@
+import sys
+from typing import Any, Optional
+
+import numpy as np
+from scipy import sparse
+
+from src.recommenders.artefact_store import is_memory_mapped
+
+
+def estimate_memory_usage(  # pylint: disable=too-many-return-statements
+    obj: Any, seen: Optional[set[int]] = None
+) -> int:
+    """
+    Estimates the number of bytes occupied by the object and everything it refers to
+    Numpy arrays, sparse matrices, torch modules and faiss indexes are measured
+    by their buffers, memory-mapped arrays are shared and not counted,
+    other objects are traversed recursively
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        return 0 if is_memory_mapped(obj) else obj.nbytes
+    if sparse.issparse(obj):
+        return sum(
+            estimate_memory_usage(getattr(obj, attribute), seen)
+            for attribute in ("data", "indices", "indptr", "row", "col")
+            if hasattr(obj, attribute)
+        )
+    module_name = type(obj).__module__ or ""
+    if module_name.startswith("torch"):
+        return _estimate_torch_memory_usage(obj)
+    if module_name.startswith("faiss"):
+        return _estimate_faiss_memory_usage(obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(
+            estimate_memory_usage(key, seen) + estimate_memory_usage(value, seen)
+            for key, value in obj.items()
+        )
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(estimate_memory_usage(item, seen) for item in obj)
+    if hasattr(obj, "__dict__") and not isinstance(obj, type):
+        return sys.getsizeof(obj) + estimate_memory_usage(vars(obj), seen)
+    return sys.getsizeof(obj)
+
+
+def _estimate_torch_memory_usage(obj: Any) -> int:
+    """
+    Estimates memory of torch tensor or module
+    """
+    if hasattr(obj, "state_dict"):
+        tensors = list(obj.state_dict().values())
+    elif hasattr(obj, "element_size"):
+        tensors = [obj]
+    else:
+        return sys.getsizeof(obj)
+    return sum(_get_tensors_nbytes(tensor) for tensor in tensors)
+
+
+def _get_tensors_nbytes(obj: Any) -> int:
+    """
+    Returns number of bytes of the tensor or the tensors in the tuple,
+    such as packed parameters of quantized modules
+    """
+    if isinstance(obj, (list, tuple)):
+        return sum(_get_tensors_nbytes(item) for item in obj)
+    if hasattr(obj, "element_size"):
+        return obj.numel() * obj.element_size()
+    return 0
+
+
+def _estimate_faiss_memory_usage(obj: Any) -> int:
+    """
+    Estimates memory of faiss index by its codes, IDs, graph links and codebooks
+    without making a serialized copy of it
+    """
+    import faiss  # pylint: disable=import-outside-toplevel
+
+    if not isinstance(obj, faiss.Index):
+        return sys.getsizeof(obj)
+    return _get_faiss_index_nbytes(faiss.downcast_index(obj))
+
+
+def _get_faiss_index_nbytes(index: Any) -> int:
+    """
+    Returns number of bytes of the data of faiss index and the indexes nested into it
+    """
+    import faiss  # pylint: disable=import-outside-toplevel
+
+    if isinstance(index, faiss.IndexPreTransform):
+        n_bytes = 0
+        for position in range(index.chain.size()):
+            transform = faiss.downcast_VectorTransform(index.chain.at(position))
+            if isinstance(transform, faiss.LinearTransform):
+                n_bytes += (transform.A.size() + transform.b.size()) * 4
+        return n_bytes + _get_faiss_index_nbytes(faiss.downcast_index(index.index))
+    if isinstance(index, faiss.IndexIDMap):
+        return index.id_map.size() * 8 + _get_faiss_index_nbytes(faiss.downcast_index(index.index))
+    if isinstance(index, faiss.IndexHNSW):
+        hnsw = index.hnsw
+        links_nbytes = (hnsw.neighbors.size() + hnsw.levels.size()) * 4 + hnsw.offsets.size() * 8
+        return links_nbytes + _get_faiss_index_nbytes(faiss.downcast_index(index.storage))
+    n_bytes = index.ntotal * index.sa_code_size()
+    if hasattr(index, "pq"):
+        n_bytes += index.pq.centroids.size() * 4
+    if isinstance(index, faiss.IndexIVF):
+        n_bytes += index.ntotal * 8 + _get_faiss_index_nbytes(faiss.downcast_index(index.quantizer))
+    return n_bytes
@@ -12,6 +12,7 @@ class RandomRecommender(BaseRecommender):
 
     N_MAX_ITEMS = 100
     MODEL_NAME = "random"
+    CACHEABLE = False
 
     def predict(self, user_id: int) -> list[int]:
         """
@@ -1,36 +1,208 @@
+import importlib
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable
+
+from src.config import settings
 from src.exceptions import ModelNotFoundError
+from src.metrics import MODEL_LOAD_DURATION, MODEL_LOADS
 from src.recommenders.base_recommender import BaseRecommender
-from src.recommenders.random_recommender import RandomRecommender
-from src.recommenders.user_knn_recommender import UserKnnTFIDFRecommender
-from src.recommenders.lightfm_recommender import LightFMRecommender
-from src.recommenders.hnsw_lightfm_recommender import HNSWLightFMRecommender
-from src.recommenders.autoencoder_recommender import AutoEncoderRecommender
-from src.recommenders.dssm_recommender import DSSMRecommender
-from src.recommenders.two_stage_recommender import TwoStageRecommender
-
-
-RECOMMENDERS: list[type[BaseRecommender]] = [
-    RandomRecommender,
-    UserKnnTFIDFRecommender,
-    LightFMRecommender,
-    HNSWLightFMRecommender,
-    AutoEncoderRecommender,
-    DSSMRecommender,
-    TwoStageRecommender,
-]
-
-
-class RecommenderRegister:  # pylint: disable=too-few-public-methods
+from src.recommenders.materialized_recommender import MaterializedRecommender
+
+RECOMMENDERS: dict[str, str] = {
+    "random": "src.recommenders.random_recommender.RandomRecommender",
+    "user_knn_tf_idf": "src.recommenders.user_knn_recommender.UserKnnTFIDFRecommender",
+    "lightfm": "src.recommenders.lightfm_recommender.LightFMRecommender",
+    "hnsw_lightfm": "src.recommenders.hnsw_lightfm_recommender.HNSWLightFMRecommender",
+    "auto_encoder": "src.recommenders.autoencoder_recommender.AutoEncoderRecommender",
+    "dssm": "src.recommenders.dssm_recommender.DSSMRecommender",
+    "two_stages": "src.recommenders.two_stage_recommender.TwoStageRecommender",
+    "ensemble": "src.recommenders.ensemble_recommender.EnsembleRecommender",
+}
+
+
+@lru_cache(maxsize=None)
+def import_recommender_class(class_path: str) -> type[BaseRecommender]:
+    """
+    Imports recommender class by its dotted path
+    """
+    module_name, class_name = class_path.rsplit(".", 1)
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+class RecommenderRegister:
     """
     Registers of recommendation systems
+    Each recommender is loaded once on the first request and kept in memory until it is
+    reloaded from new artefacts, the least recently used recommenders are evicted
+    when the memory budget is exceeded
     """
 
+    _recommenders: OrderedDict[str, BaseRecommender] = OrderedDict()
+    _memory_usages: dict[str, int] = {}
+    _load_locks: dict[str, threading.Lock] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_model_names() -> list[str]:
+        """
+        Returns names of the registered models enabled by 'enabled_models'
+        """
+        return [
+            model_name
+            for model_name in RECOMMENDERS
+            if settings.enabled_models is None or model_name in settings.enabled_models
+        ]
+
+    @classmethod
+    def check_model_name(cls, model_name: str) -> None:
+        """
+        Raises ModelNotFoundError for unknown and disabled models without importing them
+        """
+        if model_name not in cls.get_model_names():
+            raise ModelNotFoundError()
+
+    @classmethod
+    def get_recommender_class(cls, model_name: str) -> type[BaseRecommender]:
+        """
+        Returns recommender class by model_name, its module is imported on the first call
+        Raises ModelNotFoundError for unknown and disabled models
+        """
+        cls.check_model_name(model_name)
+        return import_recommender_class(RECOMMENDERS[model_name])
+
     @staticmethod
-    def get_recommender_by_model_name(model_name: str) -> BaseRecommender:
+    def create_recommender(recommender_class: type[BaseRecommender]) -> BaseRecommender:
+        """
+        Loads recommender, models listed in 'materialized_models'
+        are answered from their materialized results
+        """
+        if recommender_class.MODEL_NAME in settings.materialized_models:
+            return MaterializedRecommender(recommender_class)
+        return recommender_class()
+
+    @classmethod
+    def get_recommender_by_model_name(cls, model_name: str) -> BaseRecommender:
         """
         Returns recommender by model_name
+        Concurrent requests for a model that is not loaded yet wait for a single load
+        """
+        cls.check_model_name(model_name)
+        with cls._lock:
+            recommender = cls._get_loaded_recommender(model_name)
+            if recommender is not None:
+                return recommender
+            load_lock = cls._load_locks.setdefault(model_name, threading.Lock())
+
+        with load_lock:
+            with cls._lock:
+                recommender = cls._get_loaded_recommender(model_name)
+                if recommender is not None:
+                    return recommender
+            recommender = cls._load_recommender(model_name)
+            cls._put_recommender(model_name, recommender)
+        return recommender
+
+    @classmethod
+    def reload_recommender(
+        cls, model_name: str, prepare: Callable[[BaseRecommender], None] | None = None
+    ) -> BaseRecommender:
+        """
+        Loads a new instance of the recommender from the current artefacts and swaps it in
+        after 'prepare' (e.g. warm-up) is done with it, meanwhile requests are answered
+        by the resident instance, which is released when the last prediction holding it finishes
+        """
+        if model_name not in cls.get_model_names():
+            raise ModelNotFoundError()
+        with cls._lock:
+            load_lock = cls._load_locks.setdefault(model_name, threading.Lock())
+
+        with load_lock:
+            recommender = cls._load_recommender(model_name)
+            if prepare is not None:
+                prepare(recommender)
+            cls._put_recommender(model_name, recommender)
+        return recommender
+
+    @classmethod
+    def get_resident_recommender(cls, model_name: str) -> BaseRecommender | None:
+        """
+        Returns recommender by model_name if it is already loaded, without loading it
+        """
+        with cls._lock:
+            return cls._get_loaded_recommender(model_name)
+
+    @classmethod
+    def get_resident_recommenders(cls) -> dict[str, BaseRecommender]:
+        """
+        Returns the resident recommenders by model names without marking them as used
+        """
+        with cls._lock:
+            return dict(cls._recommenders)
+
+    @classmethod
+    def get_memory_usages(cls) -> dict[str, int]:
+        """
+        Returns memory usage in bytes of the resident recommenders
+        ordered from the least to the most recently used
+        """
+        with cls._lock:
+            return {model_name: cls._memory_usages[model_name] for model_name in cls._recommenders}
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        Releases all resident recommenders
+        """
+        with cls._lock:
+            cls._recommenders.clear()
+            cls._memory_usages.clear()
+
+    @classmethod
+    def _load_recommender(cls, model_name: str) -> BaseRecommender:
+        """
+        Imports and loads recommender, observing its load time
+        """
+        start_time = time.perf_counter()
+        recommender = cls.create_recommender(cls.get_recommender_class(model_name))
+        recommender.get_artefact_version()
+        MODEL_LOAD_DURATION.observe(time.perf_counter() - start_time, model_name=model_name)
+        MODEL_LOADS.inc(model_name=model_name)
+        return recommender
+
+    @classmethod
+    def _put_recommender(cls, model_name: str, recommender: BaseRecommender) -> None:
+        """
+        Makes the loaded recommender resident, replacing the previous instance atomically
+        """
+        memory_usage = recommender.get_memory_usage()
+        with cls._lock:
+            cls._recommenders[model_name] = recommender
+            cls._recommenders.move_to_end(model_name)
+            cls._memory_usages[model_name] = memory_usage
+            cls._evict_least_recently_used()
+
+    @classmethod
+    def _get_loaded_recommender(cls, model_name: str) -> BaseRecommender | None:
+        """
+        Returns resident recommender and marks it as recently used
+        Must be called under the register lock
+        """
+        recommender = cls._recommenders.get(model_name)
+        if recommender is not None:
+            cls._recommenders.move_to_end(model_name)
+        return recommender
+
+    @classmethod
+    def _evict_least_recently_used(cls) -> None:
+        """
+        Evicts recommenders until the memory budget is satisfied
+        The most recently used recommender is never evicted
+        Must be called under the register lock
         """
-        for recommender in RECOMMENDERS:
-            if model_name == recommender.MODEL_NAME:
-                return recommender()
-        raise ModelNotFoundError()
+        memory_budget = settings.models_memory_budget_mb * 1024**2
+        while len(cls._recommenders) > 1 and sum(cls._memory_usages.values()) > memory_budget:
+            model_name, _ = cls._recommenders.popitem(last=False)
+            del cls._memory_usages[model_name]
@@ -1,28 +1,213 @@
 import json
+import re
+from array import array
+from typing import Any, Iterator
+
+import numpy as np
+
+from src.config import settings
+from src.metrics import COLD_START_FALLBACKS
+from src.recommenders.artefact_store import (
+    ArtefactStore,
+    get_artefact_store,
+    is_up_to_date,
+    save_array,
+)
 from src.recommenders.base_recommender import BaseRecommender
 
+OFFLINE_RECS_FILE = "predicts.json"
+OFFLINE_RECS_USER_IDS_FILE = "predicts.user_ids.npy"
+OFFLINE_RECS_OFFSETS_FILE = "predicts.offsets.npy"
+OFFLINE_RECS_ITEMS_FILE = "predicts.items.npy"
+OFFLINE_RECS_COMPILED_FILES = [
+    OFFLINE_RECS_USER_IDS_FILE,
+    OFFLINE_RECS_OFFSETS_FILE,
+    OFFLINE_RECS_ITEMS_FILE,
+]
+TOP_ITEMS_FILE = "top_items.json"
+JSON_CHUNK_SIZE = 1024**2
+JSON_WHITESPACE = re.compile(r"[ \t\r\n]*")
+JSON_DELIMITERS = " \t\r\n,:}"
+
+
+def iter_json_object(path: str) -> Iterator[tuple[str, Any]]:
+    """
+    Iterates over keys and values of the top-level json object without reading
+    the whole file, it is read in chunks and each value is decoded once it is followed
+    by a delimiter, so values split between chunks are not decoded partially
+    Separators are checked, so malformed objects raise json.JSONDecodeError
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = f.read(JSON_CHUNK_SIZE)
+        while buffer.isspace():
+            buffer = f.read(JSON_CHUNK_SIZE)
+        buffer = buffer.lstrip()
+        if not buffer.startswith("{"):
+            raise ValueError(f"{path} does not contain a json object")
+        position = 1
+        key = None
+        expected = "first_key"
+        is_exhausted = False
+        while True:
+            position = JSON_WHITESPACE.match(buffer, position).end()
+            if position < len(buffer):
+                start = position
+                position, expected = check_json_structure(buffer, position, expected)
+                if expected == "end":
+                    return
+                if position > start:
+                    continue
+            is_complete = False
+            if position < len(buffer):
+                try:
+                    token, end = decoder.raw_decode(buffer, position)
+                    is_complete = is_exhausted or (
+                        end < len(buffer) and buffer[end] in JSON_DELIMITERS
+                    )
+                except json.JSONDecodeError:
+                    if is_exhausted:
+                        raise
+            if not is_complete:
+                if is_exhausted:
+                    raise json.JSONDecodeError("Unterminated object", buffer, position)
+                chunk = f.read(JSON_CHUNK_SIZE)
+                is_exhausted = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            position = end
+            if expected == "value":
+                yield key, token
+                expected = "comma"
+            else:
+                key = token
+                expected = "colon"
+
+
+def check_json_structure(buffer: str, position: int, expected: str) -> tuple[int, str]:
+    """
+    Checks the character of the object at the position against the expected part
+    and moves past separators and the closing brace, keys and values are left for decoding
+    Raises json.JSONDecodeError if the character is not allowed there
+    """
+    char = buffer[position]
+    if char == "}" and expected in ("first_key", "comma"):
+        return position + 1, "end"
+    if expected in ("colon", "comma"):
+        separator = ":" if expected == "colon" else ","
+        if char != separator:
+            raise json.JSONDecodeError(f"Expecting '{separator}' delimiter", buffer, position)
+        return position + 1, "value" if expected == "colon" else "key"
+    if expected in ("first_key", "key") and char != '"':
+        raise json.JSONDecodeError(
+            "Expecting property name enclosed in double quotes", buffer, position
+        )
+    return position, expected
+
+
+def read_offline_recs(json_path: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Reads offline recommendations from json-file {user ID: [item IDs]}
+    into sorted user IDs, offsets and flat int32 item IDs,
+    items of i-th user are items[offsets[i]:offsets[i + 1]]
+    The json is streamed into compact arrays, the last entry of a repeated user wins
+    """
+    user_ids, lengths, items = array("q"), array("q"), array("i")
+    for user_id, user_items in iter_json_object(json_path):
+        user_ids.append(int(user_id))
+        lengths.append(len(user_items))
+        items.extend(user_items)
+    user_ids = np.frombuffer(user_ids, dtype=np.int64)
+    lengths = np.frombuffer(lengths, dtype=np.int64)
+    items = np.frombuffer(items, dtype=np.int32)
+    source_offsets = np.concatenate([[0], np.cumsum(lengths)])
+
+    order = np.argsort(user_ids, kind="stable")
+    is_last = np.append(user_ids[order][1:] != user_ids[order][:-1], True)
+    order = order[is_last[: len(order)]]
+    sorted_lengths = lengths[order]
+    offsets = np.concatenate([[0], np.cumsum(sorted_lengths)]).astype(np.int64)
+    positions = np.repeat(source_offsets[order] - offsets[:-1], sorted_lengths)
+    positions += np.arange(offsets[-1], dtype=np.int64)
+    return user_ids[order], offsets, items[positions]
 
-DIR_PATH = "src/recommenders/artefacts"
-OFFLINE_RECS_PATH = f"{DIR_PATH}/predicts.json"
+
+def save_offline_recs(store: ArtefactStore, offline_recs: tuple[np.ndarray, ...]) -> list[str]:
+    """
+    Saves user IDs, offsets and item IDs of offline recommendations into .npy-files
+    Returns paths of the saved files
+    """
+    paths = [store.get_path(file_name) for file_name in OFFLINE_RECS_COMPILED_FILES]
+    for path, compiled in zip(paths, offline_recs):
+        save_array(path, compiled)
+    return paths
 
 
-# pylint: disable=too-few-public-methods
 class TwoStageRecommender(BaseRecommender):
     """
-    Recommendation model with random prediction of items
+    Recommender answering from the offline recommendations of the two-stage model
+    kept as memory-mapped sorted user IDs, offsets and flat item IDs,
+    which are compiled from json on the first load, users without them get popular items
     """
 
     MODEL_NAME = "two_stages"
+    ARTEFACT_FILES = [OFFLINE_RECS_FILE, *OFFLINE_RECS_COMPILED_FILES, TOP_ITEMS_FILE]
 
     def __init__(self):
         super().__init__()
-        with open(OFFLINE_RECS_PATH, "r", encoding="utf-8") as f:
-            self.predicts = json.load(f)
+        store = get_artefact_store()
+        with open(store.get_path(TOP_ITEMS_FILE), "r", encoding="utf-8") as f:
+            self.top_items = json.load(f)["items"][: settings.n_returned_items]
+        compiled_paths = [store.get_path(file_name) for file_name in OFFLINE_RECS_COMPILED_FILES]
+        if is_up_to_date(compiled_paths, store.get_path(OFFLINE_RECS_FILE)):
+            self.user_ids, self.offsets, self.items = (
+                store.load_array(file_name) for file_name in OFFLINE_RECS_COMPILED_FILES
+            )
+            return
+        self.user_ids, self.offsets, self.items = read_offline_recs(
+            store.get_path(OFFLINE_RECS_FILE)
+        )
+        try:
+            save_offline_recs(store, (self.user_ids, self.offsets, self.items))
+        except OSError:
+            pass
 
     def predict(self, user_id: int) -> list[int]:
         """
-        Returns a random list of item IDs recommended
-        to the user with id 'user_id'
+        Returns list of item IDs recommended offline to the user with id 'user_id',
+        popular items if the user has no offline recommendations
+        """
+        position = int(np.searchsorted(self.user_ids, user_id))
+        if position < len(self.user_ids) and self.user_ids[position] == user_id:
+            return self.items[self.offsets[position] : self.offsets[position + 1]].tolist()
+        COLD_START_FALLBACKS.inc(model_name=self.MODEL_NAME)
+        return list(self.top_items)
+
+    def predict_batch(self, user_ids: list[int]) -> list[list[int]]:
+        """
+        Returns lists of item IDs recommended offline to the users with ids 'user_ids',
+        popular items for the users without offline recommendations
+        """
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.user_ids, user_ids), len(self.user_ids) - 1)
+        is_known = (
+            self.user_ids[positions] == user_ids
+            if len(self.user_ids)
+            else np.zeros(len(user_ids), dtype=bool)
+        )
+        n_unknown = int((~is_known).sum())
+        if n_unknown:
+            COLD_START_FALLBACKS.inc(n_unknown, model_name=self.MODEL_NAME)
+        return [
+            self.items[self.offsets[position] : self.offsets[position + 1]].tolist()
+            if known
+            else list(self.top_items)
+            for position, known in zip(positions.tolist(), is_known.tolist())
+        ]
+
+    def get_user_ids(self) -> np.ndarray:
+        """
+        Returns external IDs of the users with offline recommendations
         """
-        items = self.predicts[str(user_id)]
-        return items
+        return np.asarray(self.user_ids)
@@ -1,17 +1,19 @@
 import json
 import numpy as np
-from scipy.sparse import load_npz
+from scipy import sparse
 from implicit.nearest_neighbours import TFIDFRecommender
 from src.config import settings
+from src.recommenders.artefact_store import get_artefact_store
 from src.recommenders.base_recommender import BaseRecommender
+from src.recommenders.mappings import load_item_inv_mapping, load_user_mapping
 
 
-MODEL_PATH = "src/recommenders/artefacts/user_knn.npz"
-WEIGHTS_PATH = "src/recommenders/artefacts/matrix_for_user_knn.npz"
-ITEM_INV_MAPPING_PATH = "src/recommenders/artefacts/items_inv_mapping.json"
-USER_MAPPING_PATH = "src/recommenders/artefacts/users_mapping.json"
-TOP_ITEMS_PATH = "src/recommenders/artefacts/top_items.json"
-ITEM_IDF_PATH = "src/recommenders/artefacts/item_idfs.json"
+MODEL_FILE = "user_knn.npz"
+WEIGHTS_FILE = "matrix_for_user_knn.npz"
+ITEM_INV_MAPPING_FILE = "items_inv_mapping.json"
+USER_MAPPING_FILE = "users_mapping.json"
+TOP_ITEMS_FILE = "top_items.json"
+ITEM_IDF_FILE = "item_idfs.json"
 
 
 class UserKnnTFIDFRecommender(BaseRecommender):
@@ -20,17 +22,24 @@ class UserKnnTFIDFRecommender(BaseRecommender):
     """
 
     MODEL_NAME = "user_knn_tf_idf"
+    ARTEFACT_FILES = [
+        MODEL_FILE,
+        WEIGHTS_FILE,
+        ITEM_INV_MAPPING_FILE,
+        USER_MAPPING_FILE,
+        TOP_ITEMS_FILE,
+        ITEM_IDF_FILE,
+    ]
 
     def __init__(self):
-        self.model = TFIDFRecommender.load(MODEL_PATH)
-        self.weights = load_npz(WEIGHTS_PATH)
-        with open(ITEM_INV_MAPPING_PATH, "r", encoding="utf-8") as f:
-            self.item_inv_mapping = json.load(f)
-        with open(USER_MAPPING_PATH, "r", encoding="utf-8") as f:
-            self.user_mapping = json.load(f)
-        with open(TOP_ITEMS_PATH, "r", encoding="utf-8") as f:
+        store = get_artefact_store()
+        self.model = TFIDFRecommender.load(store.get_path(MODEL_FILE))
+        self.weights = store.load_csc_matrix(WEIGHTS_FILE)
+        self.item_ids = load_item_inv_mapping(store.get_path(ITEM_INV_MAPPING_FILE))
+        self.user_mapping = load_user_mapping(store.get_path(USER_MAPPING_FILE))
+        with open(store.get_path(TOP_ITEMS_FILE), "r", encoding="utf-8") as f:
             self.top_items = set(json.load(f)["items"])
-        with open(ITEM_IDF_PATH, "r", encoding="utf-8") as f:
+        with open(store.get_path(ITEM_IDF_FILE), "r", encoding="utf-8") as f:
             self.item_idfs = np.array(json.load(f)["items"])
 
     def predict(self, user_id: int) -> list[int]:
@@ -40,7 +49,7 @@ class UserKnnTFIDFRecommender(BaseRecommender):
         """
         recommended_items = []
         try:
-            internal_user_id = self.user_mapping[str(user_id)]
+            internal_user_id = self.user_mapping[user_id]
             recommended_items = self.get_user_knn_recommendations(
                 internal_user_id, settings.n_returned_items
             )
@@ -51,6 +60,12 @@ class UserKnnTFIDFRecommender(BaseRecommender):
                 recommended_items = self.add_popular_items(recommended_items)
         return recommended_items
 
+    def get_user_ids(self) -> np.ndarray:
+        """
+        Returns external IDs of the users known to the recommender
+        """
+        return self.user_mapping.external_ids
+
     def add_popular_items(self, recommended_items: np.array) -> list[int]:
         """
         Add new popular items for recommendations
@@ -65,27 +80,51 @@ class UserKnnTFIDFRecommender(BaseRecommender):
         """
         # gets similar users
         user_ids, scores = self.model.similar_items(user_id, N=self.model.K)
-        user_similarity = dict(zip(user_ids, scores))
-        # matrix[user_id, item_id] = user_similarity
-        all_item_ids = np.arange(self.item_idfs.shape[0])
-        for current_user_id in user_ids:
-            current_item_ids = all_item_ids[
-                self.weights[:, current_user_id].toarray().reshape(-1) > 0
-            ]
-            self.weights[current_item_ids, current_user_id] = user_similarity[current_user_id]
         # max similarity on similar users by item_id
-        all_item_maximums = np.max(self.weights[:, user_ids], axis=1).toarray().reshape(-1)
+        item_indices, item_maximums = get_max_similarities(self.weights, user_ids, scores)
         # filtering items
-        scores = all_item_maximums * self.item_idfs
-        items = [
-            (idx, maximum)
-            for (idx, maximum) in zip(np.arange(scores.shape[0]), scores)
-            if maximum > 0 and maximum != 1
-        ]
+        scores = item_maximums * self.item_idfs[item_indices]
+        is_valid = (scores > 0) & (scores != 1)
+        item_indices, scores = item_indices[is_valid], scores[is_valid]
         # sorting items
-        items = sorted(items, key=lambda x: x[1], reverse=True)[:k_recs]
-        return [
-            self.item_inv_mapping[str(item[0])]
-            for item in items
-            if str(item[0]) in self.item_inv_mapping
-        ]
+        item_indices = item_indices[select_top_k_by_score(scores, item_indices, k_recs)]
+        item_ids = self.item_ids[item_indices[item_indices < len(self.item_ids)]]
+        return item_ids[item_ids >= 0].tolist()
+
+
+def get_max_similarities(
+    weights: sparse.csc_matrix, user_ids: np.ndarray, similarities: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns sorted indices of the items viewed by the similar users
+    and the maximum similarity of the users viewed each item
+    Only columns of the similar users of item-user matrix are read
+    """
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    starts, ends = weights.indptr[user_ids], weights.indptr[user_ids + 1]
+    lengths = ends - starts
+    positions = np.arange(lengths.sum()) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    items = weights.indices[positions]
+    similarities = np.repeat(np.asarray(similarities, dtype=np.float64), lengths)
+    is_viewed = weights.data[positions] > 0
+    items, similarities = items[is_viewed], similarities[is_viewed]
+    order = np.argsort(items, kind="stable")
+    items, similarities = items[order], similarities[order]
+    if len(items) == 0:
+        return items.astype(np.int64), similarities
+    group_starts = np.flatnonzero(np.r_[True, items[1:] != items[:-1]])
+    return items[group_starts].astype(np.int64), np.maximum.reduceat(similarities, group_starts)
+
+
+def select_top_k_by_score(scores: np.ndarray, indices: np.ndarray, k: int) -> np.ndarray:
+    """
+    Returns positions of 'k' highest scores sorted by descending score,
+    ties are broken by ascending index
+    """
+    if 0 < k < len(scores):
+        threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+        candidates = np.flatnonzero(scores >= threshold)
+    else:
+        candidates = np.arange(len(scores))
+    order = np.lexsort((indices[candidates], -scores[candidates]))
+    return candidates[order[:k]]
@@ -0,0 +1,149 @@
+"""
+Pre-fork serving: the master process imports the application and loads the models once,
+then forks the workers, which share the loaded pages with the master copy-on-write
+instead of importing torch, faiss and implicit and loading the artefacts each.
+Dead workers are replaced by new forks of the master, which are ready at once
+
+Usage: python -m src.serve [--host 0.0.0.0] [--port 5000] [--workers 4] [--models lightfm dssm]
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+
+from src.api.dependencies import get_actual_recommender
+from src.app import app
+from src.config import ModeEnum, settings
+from src.recommenders.recommender_register import RecommenderRegister
+
+logger = logging.getLogger(__name__)
+
+MIN_WORKER_LIFETIME_SECONDS = 1.0
+
+
+def preload_models(model_names: list[str]) -> None:
+    """
+    Loads the models into the register and the actual recommender in production
+    Predictions are not run, so thread pools of torch, faiss and BLAS
+    are started in the workers and not inherited by them
+    """
+    for model_name in model_names:
+        start_time = time.perf_counter()
+        RecommenderRegister.get_recommender_by_model_name(model_name)
+        logger.info("Model %s preloaded in %.3f s", model_name, time.perf_counter() - start_time)
+    if settings.mode == ModeEnum.PRODUCTION:
+        app.state.recommender = get_actual_recommender()
+        app.state.recommender.get_artefact_version()
+
+
+class WorkerServer(uvicorn.Server):
+    """
+    Server of a worker exiting gracefully on SIGTERM from the master,
+    SIGINT sent by the terminal to the whole process group is left to the master
+    """
+
+    def install_signal_handlers(self) -> None:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, self.handle_exit)
+
+
+# pylint: disable=too-few-public-methods
+class PreforkServer:
+    """
+    Master process forking the workers serving the application on a shared socket
+    """
+
+    def __init__(self, host: str, port: int, n_workers: int):
+        self.host = host
+        self.port = port
+        self.n_workers = n_workers
+        self._workers: dict[int, float] = {}
+        self._stopping = False
+        self._socket: socket.socket | None = None
+
+    def serve(self) -> None:
+        """
+        Binds the socket, forks the workers and replaces the dead ones until
+        the master is stopped by SIGINT or SIGTERM
+        The objects loaded so far are frozen out of garbage collection,
+        so collections in the workers do not write to the shared pages
+        """
+        self._socket = socket.create_server((self.host, self.port))
+        self._socket.set_inheritable(True)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGTERM, self._stop)
+        gc.collect()
+        gc.freeze()
+        for _ in range(self.n_workers):
+            self._fork_worker()
+        while self._workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started_at = self._workers.pop(pid, None)
+            if started_at is None or self._stopping:
+                continue
+            logger.warning("Worker %s exited with status %s, forking a new one", pid, status)
+            if time.monotonic() - started_at < MIN_WORKER_LIFETIME_SECONDS:
+                time.sleep(MIN_WORKER_LIFETIME_SECONDS)
+            self._fork_worker()
+        self._socket.close()
+
+    def _fork_worker(self) -> None:
+        """
+        Forks a worker serving the application
+        """
+        pid = os.fork()
+        if pid:
+            self._workers[pid] = time.monotonic()
+            return
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            gc.enable()
+            WorkerServer(uvicorn.Config(app, lifespan="on")).run(sockets=[self._socket])
+        finally:
+            os._exit(0)
+
+    def _stop(self, *_) -> None:
+        """
+        Stops the workers gracefully and stops forking new ones
+        """
+        self._stopping = True
+        for pid in self._workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+def main() -> None:
+    """
+    Preloads the models and serves the application with pre-forked workers
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="0.0.0.0", help="host to bind")
+    parser.add_argument("--port", type=int, default=5000, help="port to bind")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of workers")
+    parser.add_argument(
+        "--models",
+        nargs="*",
+        default=settings.warmup_models,
+        help="models loaded before forking, 'warmup_models' by default",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    gc.disable()
+    preload_models(args.models)
+    PreforkServer(args.host, args.port, args.workers).serve()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api import admission
+from src.api.admission import AdmissionController, TokenBucket, get_admission_controller
+from src.api.cache import get_response_cache
+from src.config import settings
+from src.exceptions import ServiceOverloadedError, TooManyRequestsError
+from src.metrics import ADMITTED_REQUESTS, SHED_REQUESTS
+from src.recommenders import recommender_register
+from src.recommenders.recommender_register import RecommenderRegister
+from tests.test_response_cache import CountingRecommender
+
+
+@pytest.fixture(autouse=True)
+def register(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(
+        recommender_register,
+        "RECOMMENDERS",
+        {CountingRecommender.MODEL_NAME: "tests.test_response_cache.CountingRecommender"},
+    )
+    RecommenderRegister.clear()
+    get_response_cache().clear()
+    get_admission_controller.cache_clear()
+    yield RecommenderRegister
+    RecommenderRegister.clear()
+    get_response_cache().clear()
+    get_admission_controller.cache_clear()
+
+
+def get_recommendations(client: TestClient, user_id: int, **headers: str) -> int:
+    return client.get(
+        f"/reco/{CountingRecommender.MODEL_NAME}/{user_id}",
+        headers={"Authorization": f"Bearer {settings.token}", **headers},
+    ).status_code
+
+
+def test_token_bucket_refills(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = 100.0
+    monkeypatch.setattr(admission.time, "monotonic", lambda: now)
+    bucket = TokenBucket(rate=2.0, burst=3)
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    now += 0.5
+    assert [bucket.try_acquire() for _ in range(2)] == [True, False]
+    now += 10.0
+    assert sum(bucket.try_acquire() for _ in range(5)) == 3
+
+
+def test_rate_is_limited_per_client(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "admission_client_rate_per_second", 0.001)
+    monkeypatch.setattr(settings, "admission_client_burst", 2)
+    n_shed = SHED_REQUESTS.get(reason="client_rate")
+    controller = AdmissionController()
+    controller.check_rate("first")
+    controller.check_rate("first")
+    with pytest.raises(TooManyRequestsError):
+        controller.check_rate("first")
+    controller.check_rate("second")
+    assert SHED_REQUESTS.get(reason="client_rate") == n_shed + 1
+
+
+def test_scoring_over_concurrency_is_shed(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "admission_max_concurrency", 2)
+    monkeypatch.setattr(settings, "admission_client_max_concurrency", 1)
+    controller = AdmissionController()
+    with controller.admit("first", "model"):
+        with pytest.raises(ServiceOverloadedError):
+            with controller.admit("first", "model"):
+                pass
+        with controller.admit("second", "model"):
+            assert controller.get_running_count() == 2
+            with pytest.raises(ServiceOverloadedError):
+                with controller.admit("third", "model"):
+                    pass
+    assert controller.get_running_count() == 0
+
+
+def test_materialized_models_are_not_shed(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "admission_max_queue_depth", 1)
+    monkeypatch.setattr(settings, "materialized_models", ["materialized"])
+    monkeypatch.setattr(admission, "get_queue_depth", lambda: 1)
+    n_shed = SHED_REQUESTS.get(reason="queue_depth")
+    controller = AdmissionController()
+    with pytest.raises(ServiceOverloadedError):
+        with controller.admit("client", "model"):
+            pass
+    with controller.admit("client", "materialized"):
+        pass
+    assert SHED_REQUESTS.get(reason="queue_depth") == n_shed + 1
+
+
+def test_overloaded_service_answers_from_cache(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    assert [get_recommendations(client, 1) for _ in range(2)] == [200, 200]
+    monkeypatch.setattr(settings, "admission_max_queue_depth", 1)
+    monkeypatch.setattr(admission, "get_queue_depth", lambda: 1)
+    n_cached = ADMITTED_REQUESTS.get(path="cached")
+    assert get_recommendations(client, 1) == 200
+    assert get_recommendations(client, 2) == 503
+    assert ADMITTED_REQUESTS.get(path="cached") == n_cached + 1
+    assert CountingRecommender.n_predictions == 2
+
+
+def test_rate_limited_requests_get_429(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "admission_rate_per_second", 0.001)
+    monkeypatch.setattr(settings, "admission_burst", 1)
+    assert get_recommendations(client, 1) == 200
+    response = client.get(
+        f"/reco/{CountingRecommender.MODEL_NAME}/1",
+        headers={"Authorization": f"Bearer {settings.token}"},
+    )
+    assert response.status_code == 429
+    assert response.json() == {"message": TooManyRequestsError.DEFAULT_MESSAGE}
+
+
+def test_clients_are_limited_separately(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "admission_client_rate_per_second", 0.001)
+    monkeypatch.setattr(settings, "admission_client_burst", 1)
+    assert get_recommendations(client, 1, **{"X-Client-Id": "first"}) == 200
+    assert get_recommendations(client, 1, **{"X-Client-Id": "first"}) == 429
+    assert get_recommendations(client, 1, **{"X-Client-Id": "second"}) == 200
+    assert get_recommendations(client, 1) == 200
+    assert get_recommendations(client, 1) == 429
@@ -0,0 +1,62 @@
+import os
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+import pytest
+from scipy import sparse
+
+from src.recommenders.artefact_store import ArtefactStore, is_memory_mapped, save_array
+from src.recommenders.memory import estimate_memory_usage
+
+
+def test_csr_matrix_is_memory_mapped(tmp_path: Path) -> None:
+    matrix = sparse.random(50, 20, density=0.2, format="csr", random_state=1)
+    sparse.save_npz(tmp_path / "user_item_matrix.npz", matrix)
+    store = ArtefactStore(str(tmp_path))
+
+    loaded = store.load_csr_matrix("user_item_matrix.npz")
+    assert (loaded != matrix).nnz == 0
+    assert all(is_memory_mapped(array) for array in (loaded.data, loaded.indices, loaded.indptr))
+    assert estimate_memory_usage(loaded) == 0
+    assert loaded[[1, 3]].shape == (2, 20)
+
+
+@pytest.mark.parametrize("index_factory", ["Flat", "IVF8,PQ4", "HNSW16", "PCA8,IVF8,Flat"])
+def test_faiss_index_memory_is_estimated_without_serializing(
+    index_factory: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    embeddings = np.random.RandomState(0).rand(1000, 16).astype(np.float32)
+    index = faiss.index_factory(16, index_factory)
+    index.train(embeddings)
+    index.add(embeddings)
+    serialized_nbytes = faiss.serialize_index(index).nbytes
+    monkeypatch.setattr(faiss, "serialize_index", None)
+    assert estimate_memory_usage(index) == pytest.approx(serialized_nbytes, rel=0.05)
+
+
+def test_residency(tmp_path: Path) -> None:
+    np.save(tmp_path / "embeddings.npy", np.ones((100, 64), dtype=np.float32))
+    store = ArtefactStore(str(tmp_path))
+    embeddings = store.load_array("embeddings.npy")
+    assert embeddings.sum() == 6400
+    resident_bytes, total_bytes = store.get_residency()["embeddings.npy"]
+    assert total_bytes == embeddings.nbytes
+    assert 0 < resident_bytes <= total_bytes
+
+
+def test_replaced_artefacts_are_reopened(tmp_path: Path) -> None:
+    store = ArtefactStore(str(tmp_path))
+    save_array(str(tmp_path / "embeddings.npy"), np.zeros(10))
+    sparse.save_npz(tmp_path / "user_item_matrix.npz", sparse.csr_matrix(np.eye(3)))
+    embeddings = store.load_array("embeddings.npy")
+    matrix = store.load_csr_matrix("user_item_matrix.npz")
+
+    save_array(str(tmp_path / "embeddings.npy"), np.ones(10))
+    sparse.save_npz(tmp_path / "user_item_matrix.npz", sparse.csr_matrix(2 * np.eye(3)))
+    os.utime(tmp_path / "user_item_matrix.npz", ns=(time.time_ns() + 10**9,) * 2)
+    assert store.load_array("embeddings.npy").sum() == 10
+    assert store.load_csr_matrix("user_item_matrix.npz").sum() == 6
+    assert embeddings.sum() == 0
+    assert matrix.sum() == 3
@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+import torch
+from scipy import sparse
+
+from src.config import AutoEncoderInferenceEnum
+from src.recommenders.autoencoder_inference import AutoEncoderInference
+from src.recommenders.autoencoder_recommender import Model
+
+
+@pytest.mark.parametrize("variant", list(AutoEncoderInferenceEnum))
+def test_sparse_inference_matches_dense_model(variant: AutoEncoderInferenceEnum) -> None:
+    torch.manual_seed(42)
+    model = Model(200).eval()
+    user_interactions = sparse.random(16, 200, density=0.05, format="csr", random_state=42)
+    with torch.no_grad():
+        expected = model(torch.Tensor(user_interactions.toarray())).numpy()
+
+    inference = AutoEncoderInference(model.sequential[0], model.sequential[2], variant)
+    scores = inference.get_scores(user_interactions)
+    tolerance = 5e-2 if variant == AutoEncoderInferenceEnum.INT8 else 1e-5
+    assert scores.shape == expected.shape
+    assert np.allclose(scores, expected, atol=tolerance)
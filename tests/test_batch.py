@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from scipy import sparse
+
+from src.config import settings
+from src.exceptions import BatchTooLargeError
+from src.recommenders.base_recommender import FilterViewedAndPopularRecommender, select_top_k
+from src.recommenders.mappings import UserMapping
+from src.recommenders.random_recommender import RandomRecommender
+
+
+class ScoresRecommender(FilterViewedAndPopularRecommender):
+    def __init__(self, n_users: int = 30, n_items: int = 40):
+        super().__init__()
+        random_state = np.random.RandomState(42)
+        self.scores = random_state.rand(n_users, n_items)
+        self.user_item_matrix = sparse.random(
+            n_users, n_items, density=0.3, format="csr", random_state=random_state
+        )
+        self.item_ids = np.arange(n_items) * 10 + 5
+        self.user_mappings = UserMapping(np.arange(n_users) * 3, np.arange(n_users))
+        self.top_items = [int(item_id) for item_id in self.item_ids[::-3]]
+
+    def get_recommendations(self, user_id: int, k: int) -> list[int]:
+        self.max_k = max(getattr(self, "max_k", 0), k)
+        return self.item_ids[select_top_k(self.scores[user_id], k)].tolist()
+
+
+def test_predict_batch_matches_predict() -> None:
+    recommender = ScoresRecommender()
+    user_ids = list(range(-3, 100))
+    assert recommender.predict_batch(user_ids) == [
+        recommender.predict(user_id) for user_id in user_ids
+    ]
+
+
+def test_viewed_items_are_filtered() -> None:
+    recommender = ScoresRecommender()
+    recommender.user_item_matrix[0, :35] = 1
+    for user_id, internal_user_id in zip(recommender.user_mappings.external_ids, range(30)):
+        viewed = recommender.user_item_matrix[internal_user_id].toarray().reshape(-1) > 0
+        ranking = np.argsort(-recommender.scores[internal_user_id], kind="stable")
+        expected = recommender.item_ids[ranking[~viewed[ranking]]][: settings.n_returned_items]
+        expected = expected.tolist()
+        expected += [item for item in recommender.top_items if item not in expected]
+        assert recommender.predict(user_id) == expected[: settings.n_returned_items]
+
+
+def test_overfetch_does_not_grow_with_history() -> None:
+    recommender = ScoresRecommender()
+    recommender.user_item_matrix[1, np.argsort(recommender.scores[1])[:25]] = 1
+    recommender.user_item_matrix[1, np.argsort(recommender.scores[1])[25:]] = 0
+    recommender.predict(3)
+    assert recommender.max_k == 2 * settings.n_returned_items
+
+
+def test_batch_recommendations(client: TestClient) -> None:
+    user_ids = [1, 2, 3]
+    response = client.post(
+        f"/reco/{RandomRecommender.MODEL_NAME}/batch",
+        json={"user_ids": user_ids},
+        headers={"Authorization": f"Bearer {settings.token}"},
+    )
+    assert response.status_code == 200
+    recommendations = response.json()["recommendations"]
+    assert [recommendation["user_id"] for recommendation in recommendations] == user_ids
+    assert all(len(recommendation["items"]) == settings.n_returned_items for recommendation in recommendations)
+
+
+def test_batch_too_large(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "max_batch_size", 2)
+    response = client.post(
+        f"/reco/{RandomRecommender.MODEL_NAME}/batch",
+        json={"user_ids": [1, 2, 3]},
+        headers={"Authorization": f"Bearer {settings.token}"},
+    )
+    assert response.status_code == 413
+    assert response.json() == {'message': BatchTooLargeError.DEFAULT_MESSAGE}
@@ -0,0 +1,143 @@
+import json
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.cache import ResponseCache, get_response_cache
+from src.api.deadline import TOP_ITEMS_FILE, get_deadline_seconds, get_popular_items
+from src.config import settings
+from src.metrics import DEGRADED_RESPONSES
+from src.recommenders import recommender_register
+from src.recommenders.artefact_store import get_artefact_store
+from src.recommenders.base_recommender import BaseRecommender
+from src.recommenders.recommender_register import RecommenderRegister
+
+POPULAR_ITEMS = list(range(100, 100 + 2 * settings.n_returned_items))
+
+
+class SlowRecommender(BaseRecommender):
+    MODEL_NAME = "slow"
+    delay_seconds = 0.0
+
+    def predict(self, user_id: int) -> list[int]:
+        time.sleep(SlowRecommender.delay_seconds)
+        return list(range(user_id, user_id + settings.n_returned_items))
+
+
+@pytest.fixture(autouse=True)
+def register(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(
+        recommender_register,
+        "RECOMMENDERS",
+        {SlowRecommender.MODEL_NAME: "tests.test_deadline.SlowRecommender"},
+    )
+    with open(tmp_path / TOP_ITEMS_FILE, "w", encoding="utf-8") as f:
+        json.dump({"items": POPULAR_ITEMS}, f)
+    monkeypatch.setattr(settings, "artefacts_dir", str(tmp_path))
+    monkeypatch.setattr(SlowRecommender, "delay_seconds", 0.0)
+    get_artefact_store.cache_clear()
+    RecommenderRegister.clear()
+    get_response_cache().clear()
+    yield RecommenderRegister
+    RecommenderRegister.clear()
+    get_response_cache().clear()
+    get_artefact_store.cache_clear()
+
+
+def get_recommendations(client: TestClient, user_id: int, **headers: str) -> dict:
+    response = client.get(
+        f"/reco/{SlowRecommender.MODEL_NAME}/{user_id}",
+        headers={"Authorization": f"Bearer {settings.token}", **headers},
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_deadline_is_configured_per_model(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "default_request_deadline_ms", 0.0)
+    monkeypatch.setattr(settings, "request_deadlines_ms", {"slow": 20.0})
+    assert get_deadline_seconds("fast") is None
+    assert get_deadline_seconds("slow") == 0.02
+    assert get_deadline_seconds("fast", 50.0) == 0.05
+    assert get_deadline_seconds("slow", 0.0) is None
+
+
+def test_requests_within_deadline_are_not_degraded(client: TestClient) -> None:
+    response = get_recommendations(client, 5, **{"X-Deadline-Ms": "1000"})
+    assert response == {"user_id": 5, "items": list(range(5, 5 + settings.n_returned_items))}
+
+
+def test_missed_deadline_returns_popular_items(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "request_deadlines_ms", {SlowRecommender.MODEL_NAME: 20.0})
+    monkeypatch.setattr(SlowRecommender, "delay_seconds", 0.3)
+    n_degraded = DEGRADED_RESPONSES.get(model_name=SlowRecommender.MODEL_NAME, fallback="popular")
+    start_time = time.perf_counter()
+    response = get_recommendations(client, 5)
+    assert time.perf_counter() - start_time < 0.25
+    assert response == {
+        "user_id": 5,
+        "items": POPULAR_ITEMS[: settings.n_returned_items],
+        "degraded": True,
+    }
+    assert (
+        DEGRADED_RESPONSES.get(model_name=SlowRecommender.MODEL_NAME, fallback="popular")
+        == n_degraded + 1
+    )
+
+
+def test_missed_deadline_returns_previous_answer(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    items = list(range(7, 7 + settings.n_returned_items))
+    assert get_recommendations(client, 7)["items"] == items
+    get_response_cache().clear()
+    get_response_cache().put(SlowRecommender.MODEL_NAME, "outdated", 7, items[::-1])
+    monkeypatch.setattr(SlowRecommender, "delay_seconds", 0.3)
+    n_degraded = DEGRADED_RESPONSES.get(model_name=SlowRecommender.MODEL_NAME, fallback="cached")
+    response = get_recommendations(client, 7, **{"X-Deadline-Ms": "20"})
+    assert response == {"user_id": 7, "items": items[::-1], "degraded": True}
+    assert (
+        DEGRADED_RESPONSES.get(model_name=SlowRecommender.MODEL_NAME, fallback="cached")
+        == n_degraded + 1
+    )
+
+
+def test_missed_deadline_degrades_batch(client: TestClient) -> None:
+    SlowRecommender.delay_seconds = 0.3
+    response = client.post(
+        f"/reco/{SlowRecommender.MODEL_NAME}/batch",
+        json={"user_ids": [1, 2]},
+        headers={"Authorization": f"Bearer {settings.token}", "X-Deadline-Ms": "20"},
+    )
+    assert response.status_code == 200
+    recommendations = response.json()["recommendations"]
+    assert [recommendation["degraded"] for recommendation in recommendations] == [True, True]
+    assert recommendations[0]["items"] == POPULAR_ITEMS[: settings.n_returned_items]
+
+
+def test_stale_entries_outlive_reloads() -> None:
+    cache = ResponseCache()
+    cache.put("model", "v1", 1, [1, 2])
+    cache.put("model", "v2", 1, [3, 4])
+    assert cache.get_stale("model", 1) == [3, 4]
+    assert cache.get_stale("model", 2) is None
+    cache.clear()
+    assert cache.get_stale("model", 1) is None
+
+
+def test_stale_entries_outlive_expiration(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "response_cache_ttl_seconds", 0.0)
+    cache = ResponseCache()
+    cache.put("model", "v1", 1, [1, 2])
+    assert cache.get("model", "v1", 1) is None
+    assert cache.get_stale("model", 1) == [1, 2]
+
+
+def test_popular_items_follow_artefacts(tmp_path: Path) -> None:
+    assert get_popular_items() == POPULAR_ITEMS[: settings.n_returned_items]
+    (tmp_path / TOP_ITEMS_FILE).unlink()
+    assert not get_popular_items()
@@ -0,0 +1,53 @@
+import faiss
+import numpy as np
+import pytest
+
+from src.recommenders.dssm_recommender import (
+    N_FACTORS,
+    DSSMRecommender,
+    build_index,
+    get_index_description,
+    get_index_file,
+    set_search_parameters,
+)
+from src.recommenders.recommender_register import RecommenderRegister
+
+
+@pytest.fixture
+def item_embeddings() -> np.ndarray:
+    return np.random.RandomState(0).rand(500, N_FACTORS).astype(np.float32)
+
+
+@pytest.mark.parametrize(
+    "index_factory, search_parameters",
+    [("Flat", ""), ("IVF16,Flat", "nprobe=16"), ("HNSW32", "efSearch=128"), ("SQ8", "")],
+)
+def test_index_families_find_exact_neighbours(
+    item_embeddings: np.ndarray, index_factory: str, search_parameters: str
+) -> None:
+    queries = item_embeddings[:20] + 0.01
+    _, exact_items = build_index(item_embeddings, "Flat").search(queries, 10)
+
+    index = build_index(item_embeddings, index_factory)
+    set_search_parameters(index, search_parameters)
+    _, items = index.search(queries, 10)
+    recall = np.mean(
+        [len(np.intersect1d(row, exact)) / 10 for row, exact in zip(items, exact_items)]
+    )
+    assert recall >= 0.9
+
+
+def test_search_parameters_are_set(item_embeddings: np.ndarray) -> None:
+    index = build_index(item_embeddings, "IVF16,PQ16")
+    set_search_parameters(index, "nprobe=4")
+    assert faiss.extract_index_ivf(index).nprobe == 4
+
+
+def test_index_file_depends_on_configuration() -> None:
+    assert get_index_file("IVF1024,Flat") != get_index_file("IVF1024,PQ32")
+    assert get_index_description("HNSW32") != get_index_description("HNSW64")
+
+
+def test_dssm_is_registered_under_own_name() -> None:
+    assert RecommenderRegister.get_recommender_class("dssm") is DSSMRecommender
+    assert RecommenderRegister.get_recommender_class("hnsw_lightfm") is not DSSMRecommender
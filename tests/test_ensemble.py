@@ -0,0 +1,134 @@
+import json
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src.config import RankFusionEnum, settings
+from src.metrics import ENSEMBLE_CALLS, ENSEMBLE_CONTRIBUTIONS
+from src.recommenders import recommender_register
+from src.recommenders.artefact_store import get_artefact_store
+from src.recommenders.base_recommender import BaseRecommender
+from src.recommenders.ensemble_recommender import (
+    EnsembleRecommender,
+    fuse_rankings,
+    get_ensemble_pool,
+)
+from src.recommenders.recommender_register import RecommenderRegister
+
+TOP_ITEMS = list(range(100, 120))
+
+
+class FirstRecommender(BaseRecommender):
+    MODEL_NAME = "first"
+
+    def predict(self, user_id: int) -> list[int]:
+        return [user_id, 1, 2, 3]
+
+
+class SecondRecommender(BaseRecommender):
+    MODEL_NAME = "second"
+
+    def predict(self, user_id: int) -> list[int]:
+        return [3, 2, 4]
+
+
+class StuckRecommender(BaseRecommender):
+    MODEL_NAME = "stuck"
+    released = threading.Event()
+
+    def predict(self, user_id: int) -> list[int]:
+        StuckRecommender.released.wait(5)
+        return [5]
+
+
+class FailingRecommender(BaseRecommender):
+    MODEL_NAME = "failing"
+
+    def predict(self, user_id: int) -> list[int]:
+        raise RuntimeError("failed")
+
+
+@pytest.fixture(autouse=True)
+def register(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(
+        recommender_register,
+        "RECOMMENDERS",
+        {
+            recommender_class.MODEL_NAME: f"tests.test_ensemble.{recommender_class.__name__}"
+            for recommender_class in (
+                FirstRecommender,
+                SecondRecommender,
+                StuckRecommender,
+                FailingRecommender,
+                EnsembleRecommender,
+            )
+        },
+    )
+    (tmp_path / "top_items.json").write_text(json.dumps({"items": TOP_ITEMS}), encoding="utf-8")
+    monkeypatch.setattr(settings, "artefacts_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "ensemble_deadline_ms", 100.0)
+    get_artefact_store.cache_clear()
+    StuckRecommender.released.clear()
+    RecommenderRegister.clear()
+    get_ensemble_pool.cache_clear()
+    yield RecommenderRegister
+    StuckRecommender.released.set()
+    RecommenderRegister.clear()
+    get_ensemble_pool.cache_clear()
+    get_artefact_store.cache_clear()
+
+
+@pytest.mark.parametrize(
+    "fusion, expected",
+    [(RankFusionEnum.RRF, [3, 2, 4, 10, 1]), (RankFusionEnum.LINEAR, [3, 2, 10, 1, 4])],
+)
+def test_rankings_are_fused(
+    monkeypatch: pytest.MonkeyPatch, fusion: RankFusionEnum, expected: list[int]
+) -> None:
+    monkeypatch.setattr(settings, "ensemble_fusion", fusion)
+    ranked_items = {"first": [10, 1, 2, 3], "second": [3, 2, 4]}
+    assert fuse_rankings(ranked_items, {"first": 1.0, "second": 2.0}, 5) == expected
+
+
+def test_late_and_failed_sub_models_are_dropped(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        settings, "ensemble_models", {"first": 1.0, "second": 1.0, "stuck": 1.0, "failing": 1.0}
+    )
+    n_timeouts = ENSEMBLE_CALLS.get(model_name="stuck", status="timeout")
+    n_errors = ENSEMBLE_CALLS.get(model_name="failing", status="error")
+    n_contributions = ENSEMBLE_CONTRIBUTIONS.get(model_name="second")
+    ensemble = RecommenderRegister.get_recommender_by_model_name(EnsembleRecommender.MODEL_NAME)
+
+    start_time = time.perf_counter()
+    recommendations = ensemble.predict_batch([10, 20])
+    assert time.perf_counter() - start_time < 1
+    assert recommendations[0][:5] == [3, 2, 10, 1, 4]
+    assert recommendations[1][:5] == [3, 2, 20, 1, 4]
+    assert recommendations[0][5:] == TOP_ITEMS[: settings.n_returned_items - 5]
+    assert ENSEMBLE_CALLS.get(model_name="stuck", status="timeout") == n_timeouts + 1
+    assert ENSEMBLE_CALLS.get(model_name="failing", status="error") == n_errors + 1
+    assert ENSEMBLE_CONTRIBUTIONS.get(model_name="second") == n_contributions + 6
+
+
+def test_stuck_sub_model_does_not_hold_the_pool(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "ensemble_models", {"stuck": 1.0, "first": 1.0})
+    monkeypatch.setattr(settings, "ensemble_threads", 2)
+    n_timeouts = ENSEMBLE_CALLS.get(model_name="stuck", status="timeout")
+    ensemble = RecommenderRegister.get_recommender_by_model_name(EnsembleRecommender.MODEL_NAME)
+    for user_id in (10, 20, 30, 40):
+        assert ensemble.predict(user_id)[:4] == [user_id, 1, 2, 3]
+    assert ENSEMBLE_CALLS.get(model_name="stuck", status="timeout") == n_timeouts + 4
+
+
+def test_popular_items_without_sub_models(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "ensemble_models", {"stuck": 1.0})
+    ensemble = RecommenderRegister.get_recommender_by_model_name(EnsembleRecommender.MODEL_NAME)
+    assert ensemble.predict(1) == TOP_ITEMS[: settings.n_returned_items]
+
+
+def test_ensemble_can_not_include_itself(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "ensemble_models", {EnsembleRecommender.MODEL_NAME: 1.0})
+    with pytest.raises(ValueError):
+        EnsembleRecommender()
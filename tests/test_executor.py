@@ -0,0 +1,67 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.api.executor import PredictionExecutor
+from src.config import settings
+from src.exceptions import ServiceOverloadedError
+from src.recommenders.base_recommender import BaseRecommender
+
+
+class BlockingRecommender(BaseRecommender):
+    MODEL_NAME = "blocking"
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.released = threading.Event()
+
+    def predict(self, user_id: int) -> list[int]:
+        self.started.set()
+        self.released.wait(timeout=5)
+        return [user_id]
+
+
+def test_full_queue_is_rejected(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "prediction_concurrency", {BlockingRecommender.MODEL_NAME: 1})
+    monkeypatch.setattr(settings, "prediction_queue_size", 1)
+    executor = PredictionExecutor()
+    recommender = BlockingRecommender()
+
+    async def run() -> list:
+        tasks = [
+            asyncio.ensure_future(
+                executor.run(
+                    BlockingRecommender.MODEL_NAME, lambda: recommender, "predict", user_id
+                )
+            )
+            for user_id in range(3)
+        ]
+        await asyncio.sleep(0)
+        assert executor.get_pending_counts() == {BlockingRecommender.MODEL_NAME: 2}
+        recommender.released.set()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    first, second, third = asyncio.run(run())
+    executor.shutdown()
+    assert first == [0] and second == [1]
+    assert isinstance(third, ServiceOverloadedError)
+    assert executor.get_pending_counts() == {BlockingRecommender.MODEL_NAME: 0}
+
+
+def test_event_loop_is_not_blocked() -> None:
+    executor = PredictionExecutor()
+    recommender = BlockingRecommender()
+
+    async def run() -> list[int]:
+        task = asyncio.ensure_future(
+            executor.run(BlockingRecommender.MODEL_NAME, lambda: recommender, "predict", 7)
+        )
+        while not recommender.started.is_set():
+            await asyncio.sleep(0.001)
+        assert not task.done()
+        recommender.released.set()
+        return await task
+
+    assert asyncio.run(run()) == [7]
+    executor.shutdown()
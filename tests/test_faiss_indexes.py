@@ -0,0 +1,64 @@
+from pathlib import Path
+
+import faiss
+import numpy as np
+import pytest
+
+from src.config import ViewedFilterEnum, settings
+from src.recommenders.artefact_store import ArtefactStore
+from src.recommenders.faiss_indexes import load_or_build_index, search_excluding
+
+
+class CountingBuilder:
+    def __init__(self):
+        self.n_builds = 0
+
+    def __call__(self, embeddings: np.ndarray) -> faiss.Index:
+        self.n_builds += 1
+        index = faiss.IndexFlatL2(embeddings.shape[1])
+        index.add(embeddings)
+        return index
+
+
+def test_index_is_built_once(tmp_path: Path) -> None:
+    embeddings = np.random.RandomState(0).rand(100, 8).astype(np.float32)
+    np.save(tmp_path / "embeddings.npy", embeddings)
+    store = ArtefactStore(str(tmp_path))
+    build_index = CountingBuilder()
+
+    built = load_or_build_index("embeddings.npy", "embeddings.index", "Flat", build_index, store)
+    loaded = load_or_build_index("embeddings.npy", "embeddings.index", "Flat", build_index, store)
+    assert build_index.n_builds == 1
+    assert np.array_equal(built.search(embeddings[:5], 3)[1], loaded.search(embeddings[:5], 3)[1])
+
+    load_or_build_index("embeddings.npy", "embeddings.index", "Flat v2", build_index, store)
+    assert build_index.n_builds == 2
+
+    np.save(tmp_path / "embeddings.npy", embeddings[:50])
+    rebuilt = load_or_build_index(
+        "embeddings.npy", "embeddings.index", "Flat v2", build_index, store
+    )
+    assert build_index.n_builds == 3
+    assert rebuilt.ntotal == 50
+
+
+@pytest.mark.parametrize("index_factory", ["Flat", "IVF8,Flat", "HNSW32"])
+@pytest.mark.parametrize("viewed_filter", [ViewedFilterEnum.BITMAP, ViewedFilterEnum.BATCH])
+def test_search_excluding_skips_excluded_ids(
+    index_factory: str, viewed_filter: ViewedFilterEnum, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "ann_viewed_filter", viewed_filter)
+    embeddings = np.random.RandomState(0).rand(1000, 8).astype(np.float32)
+    index = faiss.index_factory(8, index_factory)
+    index.train(embeddings)
+    index.add(embeddings)
+    if index_factory.startswith("IVF"):
+        faiss.extract_index_ivf(index).nprobe = 8
+    _, exact = index.search(embeddings[:4], 15)
+
+    excluded_rows = np.array([0, 0, 0, 2, 2])
+    excluded_ids = np.array([exact[0, 0], exact[0, 3], exact[0, 7], exact[2, 1], exact[2, 2]])
+    labels = search_excluding(index, embeddings[:4], 10, excluded_rows, excluded_ids)
+    assert np.array_equal(labels[0], np.delete(exact[0], [0, 3, 7])[:10])
+    assert np.array_equal(labels[1], exact[1, :10])
+    assert np.array_equal(labels[2], np.delete(exact[2], [1, 2])[:10])
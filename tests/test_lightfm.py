@@ -0,0 +1,46 @@
+import os
+import pickle
+from pathlib import Path
+
+import numpy as np
+
+from src.recommenders.artefact_store import ArtefactStore
+from src.recommenders.lightfm_recommender import (
+    MODEL_FILE,
+    REPRESENTATION_FILES,
+    are_representations_exported,
+    export_representations,
+)
+
+
+class RepresentationsModel:
+    def __init__(self):
+        random_state = np.random.RandomState(42)
+        self.user_representations = (random_state.rand(5), random_state.rand(5, 3))
+        self.item_representations = (random_state.rand(7), random_state.rand(3, 7).T)
+
+    def get_user_representations(self) -> tuple[np.ndarray, np.ndarray]:
+        return self.user_representations
+
+    def get_item_representations(self) -> tuple[np.ndarray, np.ndarray]:
+        return self.item_representations
+
+
+def test_representations_are_exported(tmp_path: Path) -> None:
+    model = RepresentationsModel()
+    with open(tmp_path / MODEL_FILE, "wb") as f:
+        pickle.dump(model, f)
+    store = ArtefactStore(str(tmp_path))
+    assert not are_representations_exported(store)
+
+    export_representations(store)
+    assert are_representations_exported(store)
+    expected = [*model.get_user_representations(), *model.get_item_representations()]
+    for file_name, representation in zip(REPRESENTATION_FILES, expected):
+        exported = store.load_array(file_name)
+        assert exported.dtype == np.float32 and exported.flags.c_contiguous
+        assert np.allclose(exported, representation)
+
+    model_mtime = os.path.getmtime(tmp_path / MODEL_FILE) + 10
+    os.utime(tmp_path / MODEL_FILE, (model_mtime, model_mtime))
+    assert not are_representations_exported(store)
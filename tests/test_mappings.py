@@ -0,0 +1,48 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+from src.recommenders.compile_artefacts import compile_mappings
+from src.recommenders.mappings import (
+    UserMapping,
+    compose_item_mappings,
+    compose_user_mappings,
+    load_item_inv_mapping,
+    load_user_mapping,
+)
+
+
+def test_user_mapping() -> None:
+    mapping = UserMapping(np.array([30, 10, 20]), np.array([0, 1, 2]))
+    assert mapping[10] == 1
+    assert 40 not in mapping
+    assert mapping.map(np.array([20, 5, 30, 40])).tolist() == [2, -1, 0, -1]
+    assert mapping.inverse().tolist() == [30, 10, 20]
+
+
+def test_compose_user_mappings() -> None:
+    mapping = UserMapping(np.array([30, 10, 20]), np.array([0, 1, 2]))
+    model_mapping = UserMapping(np.array([20, 30]), np.array([1, 0]))
+    assert compose_user_mappings(mapping, model_mapping).tolist() == [0, -1, 1]
+
+
+def test_compose_item_mappings() -> None:
+    model_item_ids = np.array([30, 10, 20, -1])
+    item_ids = np.array([10, 20, 40, 30, 5, -1])
+    assert compose_item_mappings(item_ids, model_item_ids).tolist() == [1, 2, -1, 0, -1, -1]
+
+
+def test_compiled_mappings_match_json(tmp_path: Path) -> None:
+    user_mapping = {"307436": 0, "15": 2, "900": 1}
+    item_inv_mapping = {"0": 555, "1": 14, "2": 7}
+    (tmp_path / "lightfm_user_mappings.json").write_text(json.dumps(user_mapping))
+    (tmp_path / "lightfm_item_inv_mappings.json").write_text(json.dumps(item_inv_mapping))
+    from_json = load_user_mapping(str(tmp_path / "lightfm_user_mappings.json"))
+
+    assert len(compile_mappings(str(tmp_path))) == 2
+    compiled = load_user_mapping(str(tmp_path / "lightfm_user_mappings.json"))
+    assert compiled.map(np.array([15, 307436, 900])).tolist() == [2, 0, 1]
+    assert compiled.external_ids.tolist() == from_json.external_ids.tolist()
+    item_ids = load_item_inv_mapping(str(tmp_path / "lightfm_item_inv_mappings.json"))
+    assert item_ids.tolist() == [555, 14, 7]
@@ -0,0 +1,68 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.recommenders import materialize, materialized_recommender, recommender_register
+from src.recommenders.artefact_store import ArtefactStore
+from src.recommenders.base_recommender import BaseRecommender
+from src.recommenders.materialized_recommender import MaterializedRecommender
+
+
+class SquaresRecommender(BaseRecommender):
+    MODEL_NAME = "squares"
+    ARTEFACT_FILES = ["squares.json"]
+    n_predictions = 0
+
+    def predict(self, user_id: int) -> list[int]:
+        SquaresRecommender.n_predictions += 1
+        return [user_id**2, user_id**2 + 1]
+
+    def get_user_ids(self) -> np.ndarray:
+        return np.arange(10) * 2
+
+
+@pytest.fixture(name="store")
+def store_fixture(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> ArtefactStore:
+    (tmp_path / "squares.json").write_text("{}")
+    store = ArtefactStore(str(tmp_path))
+    monkeypatch.setattr(materialize, "get_artefact_store", lambda: store)
+    monkeypatch.setattr(materialized_recommender, "get_artefact_store", lambda: store)
+    monkeypatch.setattr(
+        recommender_register,
+        "RECOMMENDERS",
+        {SquaresRecommender.MODEL_NAME: "tests.test_materialization.SquaresRecommender"},
+    )
+    materialize.load_recommender.cache_clear()
+    SquaresRecommender.n_predictions = 0
+    return store
+
+
+def test_materialized_recommendations(store: ArtefactStore) -> None:
+    materialize.materialize(SquaresRecommender.MODEL_NAME, chunk_size=3, n_workers=1)
+    assert not Path(store.get_path("materialized/squares.chunks")).exists()
+
+    recommender = MaterializedRecommender(SquaresRecommender)
+    n_predictions = SquaresRecommender.n_predictions
+    assert recommender.predict_batch([4, 18, 0]) == [[16, 17], [324, 325], [0, 1]]
+    assert recommender.predict(6) == [36, 37]
+    assert SquaresRecommender.n_predictions == n_predictions
+    assert recommender.predict_batch([3, 4, 5]) == [[9, 10], [16, 17], [25, 26]]
+    assert SquaresRecommender.n_predictions == n_predictions + 2
+
+
+def test_outdated_results_are_not_served(store: ArtefactStore) -> None:
+    materialize.materialize(SquaresRecommender.MODEL_NAME, chunk_size=4, n_workers=1)
+    Path(store.get_path("squares.json")).write_text('{"version": 2}')
+    with pytest.warns(UserWarning):
+        recommender = MaterializedRecommender(SquaresRecommender)
+    assert recommender.predict(4) == [16, 17]
+    assert len(recommender.get_user_ids()) == 0
+
+
+def test_missing_results_are_predicted_online(store: ArtefactStore) -> None:
+    with pytest.warns(UserWarning, match="missing"):
+        recommender = MaterializedRecommender(SquaresRecommender)
+    assert recommender.predict_batch([4, 3]) == [[16, 17], [9, 10]]
+    assert SquaresRecommender.n_predictions == 2
+    assert len(recommender.get_user_ids()) == 0
@@ -0,0 +1,56 @@
+from fastapi.testclient import TestClient
+
+from src.config import settings
+from src.metrics import (
+    COLD_START_FALLBACKS,
+    MAX_PENDING_OBSERVATIONS,
+    PREDICTION_STAGE_DURATION,
+    REQUEST_DURATION,
+    Histogram,
+)
+from src.recommenders.random_recommender import RandomRecommender
+from tests.test_batch import ScoresRecommender
+
+
+def test_histogram_folds_pending_observations() -> None:
+    histogram = Histogram("test_folding", "Test histogram", buckets=[1, 2], label_names=["x"])
+    values = [value % 4 for value in range(MAX_PENDING_OBSERVATIONS + 10)]
+    for value in values:
+        histogram.observe(value, x="a")
+    assert histogram.get_count(x="a") == len(values)
+    assert histogram.labels(x="a").get_counts() == [
+        values.count(0) + values.count(1),
+        values.count(2),
+        values.count(3),
+    ]
+    assert histogram.labels(x="a").get_sum() == sum(values)
+
+
+def test_prediction_stages_are_observed() -> None:
+    recommender = ScoresRecommender()
+    recommender.MODEL_NAME = "test_stages"
+    recommender.predict(3)
+    recommender.predict(-1)
+    recommender.predict_batch([3, 6, -1, -2])
+    for stage, n_observations in [
+        ("id_mapping", 2),
+        ("viewed_items", 2),
+        ("scoring", 2),
+        ("filtering", 2),
+        ("popular_fill", 3),
+    ]:
+        count = PREDICTION_STAGE_DURATION.get_count(model_name="test_stages", stage=stage)
+        assert count == n_observations
+    assert COLD_START_FALLBACKS.get(model_name="test_stages") == 3
+
+
+def test_request_duration_is_observed(client: TestClient) -> None:
+    labels = {"route": "/reco/{model_name}/{user_id}", "model_name": RandomRecommender.MODEL_NAME}
+    n_requests = REQUEST_DURATION.get_count(status="200", **labels)
+    client.get(
+        f"/reco/{RandomRecommender.MODEL_NAME}/1",
+        headers={"Authorization": f"Bearer {settings.token}"},
+    )
+    client.get("/reco/unknown_model/1", headers={"Authorization": f"Bearer {settings.token}"})
+    assert REQUEST_DURATION.get_count(status="200", **labels) == n_requests + 1
+    assert REQUEST_DURATION.get_count(status="404", route=labels["route"], model_name="unknown")
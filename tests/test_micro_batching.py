@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.batcher import MicroBatcher
+from src.config import settings
+from src.metrics import MICRO_BATCH_SIZE
+from src.recommenders.base_recommender import BaseRecommender
+
+
+class CountingRecommender(BaseRecommender):
+    MODEL_NAME = "counting"
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, user_id: int) -> list[int]:
+        return [user_id, user_id + 1]
+
+    def predict_batch(self, user_ids: list[int]) -> list[list[int]]:
+        self.batch_sizes.append(len(user_ids))
+        return super().predict_batch(user_ids)
+
+
+def predict_concurrently(batcher: MicroBatcher, recommender: BaseRecommender, n_users: int):
+    async def run():
+        return await asyncio.gather(
+            *(batcher.predict(lambda: recommender, user_id) for user_id in range(n_users))
+        )
+
+    return asyncio.run(run())
+
+
+def test_concurrent_requests_are_batched(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "micro_batch_window_ms", 50.0)
+    recommender = CountingRecommender()
+    n_batches = MICRO_BATCH_SIZE.get_count(model_name="test_batched")
+    items = predict_concurrently(MicroBatcher("test_batched"), recommender, 5)
+    assert items == [recommender.predict(user_id) for user_id in range(5)]
+    assert recommender.batch_sizes == [5]
+    assert MICRO_BATCH_SIZE.get_count(model_name="test_batched") == n_batches + 1
+
+
+def test_batch_is_limited_by_max_size(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "micro_batch_window_ms", 50.0)
+    monkeypatch.setattr(settings, "micro_batch_max_size", 2)
+    recommender = CountingRecommender()
+    items = predict_concurrently(MicroBatcher("test_limited"), recommender, 5)
+    assert items == [recommender.predict(user_id) for user_id in range(5)]
+    assert recommender.batch_sizes == [2, 2, 1]
+
+
+def test_metrics(client: TestClient) -> None:
+    MICRO_BATCH_SIZE.observe(3, model_name="test_metrics")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'recsys_micro_batch_size_bucket{model_name="test_metrics",le="4.0"} 1' in response.text
+    assert 'recsys_micro_batch_size_count{model_name="test_metrics"} 1' in response.text
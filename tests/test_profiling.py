@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import profiling
+from src.config import settings
+from src.profiling import SampledProfiler, capture_stage_durations, get_dump_paths
+from src.recommenders.random_recommender import RandomRecommender
+from tests.test_batch import ScoresRecommender
+
+
+def test_stage_durations_are_captured() -> None:
+    recommender = ScoresRecommender()
+    with capture_stage_durations() as durations:
+        recommender.predict(3)
+    assert set(durations) == {"id_mapping", "viewed_items", "scoring", "filtering", "popular_fill"}
+    recommender.predict(3)
+    assert all(duration >= 0 for duration in durations.values())
+
+
+@pytest.mark.parametrize("query, headers", [("?profile=true", {}), ("", {"X-Profile": "1"})])
+def test_profiled_request(client: TestClient, query: str, headers: dict[str, str]) -> None:
+    response = client.get(
+        f"/reco/{RandomRecommender.MODEL_NAME}/1{query}",
+        headers={"Authorization": f"Bearer {settings.token}", **headers},
+    )
+    assert response.status_code == 200
+    assert response.json()["profile"]["total_ms"] > 0
+
+
+def test_profile_is_not_returned_by_default(client: TestClient) -> None:
+    response = client.get(
+        f"/reco/{RandomRecommender.MODEL_NAME}/1",
+        headers={"Authorization": f"Bearer {settings.token}"},
+    )
+    assert "profile" not in response.json()
+
+
+def test_profiling_requires_authorization(client: TestClient) -> None:
+    response = client.get(f"/reco/{RandomRecommender.MODEL_NAME}/1?profile=true")
+    assert response.status_code == 401
+
+
+def test_sampled_dumps_are_rotated(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+) -> None:
+    monkeypatch.setattr(settings, "profile_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "profile_sample_rate", 2)
+    monkeypatch.setattr(settings, "profile_max_files", 3)
+    profiler = SampledProfiler()
+    results = [profiler.call("test", sorted, [3, 1, 2]) for _ in range(10)]
+    assert results == [[1, 2, 3]] * 10
+    assert len(get_dump_paths(str(tmp_path), "test")) == 3
+
+    monkeypatch.setattr(sys, "argv", ["profiling", "--dir", str(tmp_path), "--top", "5"])
+    profiling.main()
+    assert "test: 3 dumps" in capsys.readouterr().out
@@ -0,0 +1,112 @@
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.config import settings
+from src.exceptions import ModelNotFoundError
+from src.recommenders import recommender_register
+from src.recommenders.base_recommender import BaseRecommender
+from src.recommenders.random_recommender import RandomRecommender
+from src.recommenders.recommender_register import RecommenderRegister, import_recommender_class
+
+REGISTERED_RECOMMENDERS = dict(recommender_register.RECOMMENDERS)
+
+
+class SlowRecommender(BaseRecommender):
+    MODEL_NAME = "slow"
+    n_loads = 0
+
+    def __init__(self):
+        SlowRecommender.n_loads += 1
+        time.sleep(0.05)
+
+    def predict(self, user_id: int) -> list[int]:
+        return []
+
+
+class OtherRecommender(SlowRecommender):
+    MODEL_NAME = "other"
+
+
+@pytest.fixture(autouse=True)
+def register(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(
+        recommender_register,
+        "RECOMMENDERS",
+        {
+            RandomRecommender.MODEL_NAME: "src.recommenders.random_recommender.RandomRecommender",
+            SlowRecommender.MODEL_NAME: "tests.test_register.SlowRecommender",
+            OtherRecommender.MODEL_NAME: "tests.test_register.OtherRecommender",
+        },
+    )
+    SlowRecommender.n_loads = 0
+    RecommenderRegister.clear()
+    yield RecommenderRegister
+    RecommenderRegister.clear()
+
+
+def test_recommender_is_loaded_once() -> None:
+    first = RecommenderRegister.get_recommender_by_model_name(RandomRecommender.MODEL_NAME)
+    second = RecommenderRegister.get_recommender_by_model_name(RandomRecommender.MODEL_NAME)
+    assert first is second
+
+
+def test_concurrent_loads_wait_for_single_load() -> None:
+    recommenders = []
+    threads = [
+        threading.Thread(
+            target=lambda: recommenders.append(
+                RecommenderRegister.get_recommender_by_model_name(SlowRecommender.MODEL_NAME)
+            )
+        )
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert SlowRecommender.n_loads == 1
+    assert all(recommender is recommenders[0] for recommender in recommenders)
+
+
+def test_least_recently_used_is_evicted(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "models_memory_budget_mb", 0)
+    RecommenderRegister.get_recommender_by_model_name(SlowRecommender.MODEL_NAME)
+    RecommenderRegister.get_recommender_by_model_name(OtherRecommender.MODEL_NAME)
+    assert list(RecommenderRegister.get_memory_usages()) == [OtherRecommender.MODEL_NAME]
+
+
+def test_unknown_model() -> None:
+    with pytest.raises(ModelNotFoundError):
+        RecommenderRegister.get_recommender_by_model_name("some_model_name")
+
+
+def test_resident_models(client: TestClient) -> None:
+    RecommenderRegister.get_recommender_by_model_name(RandomRecommender.MODEL_NAME)
+    response = client.get("/models", headers={"Authorization": f"Bearer {settings.token}"})
+    assert response.status_code == 200
+    data = response.json()
+    assert [model["model_name"] for model in data["models"]] == [RandomRecommender.MODEL_NAME]
+    assert data["total_memory_bytes"] == data["models"][0]["memory_bytes"] > 0
+
+
+def test_disabled_model(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "enabled_models", [SlowRecommender.MODEL_NAME])
+    assert RecommenderRegister.get_model_names() == [SlowRecommender.MODEL_NAME]
+    with pytest.raises(ModelNotFoundError):
+        RecommenderRegister.get_recommender_class(RandomRecommender.MODEL_NAME)
+
+
+def test_registered_paths_match_model_names() -> None:
+    for model_name, class_path in REGISTERED_RECOMMENDERS.items():
+        assert import_recommender_class(class_path).MODEL_NAME == model_name
+
+
+def test_models_are_imported_lazily() -> None:
+    code = "import sys, src.app; print(sorted({'torch', 'faiss', 'implicit'} & set(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, check=True)
+    assert result.stdout.decode().strip() == "[]"
@@ -0,0 +1,131 @@
+import gc
+import json
+import threading
+import weakref
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.reload import ArtefactsReloader
+from src.config import settings
+from src.exceptions import ModelReloadError
+from src.metrics import MODEL_RELOADS
+from src.recommenders import recommender_register
+from src.recommenders.artefact_store import get_artefact_store
+from src.recommenders.base_recommender import BaseRecommender
+from src.recommenders.recommender_register import RecommenderRegister
+
+ARTEFACT_FILE = "versioned.json"
+
+
+class VersionedRecommender(BaseRecommender):
+    MODEL_NAME = "versioned"
+    ARTEFACT_FILES = [ARTEFACT_FILE]
+    can_load = threading.Event()
+
+    def __init__(self):
+        VersionedRecommender.can_load.wait(10)
+        with open(get_artefact_store().get_path(ARTEFACT_FILE), "r", encoding="utf-8") as f:
+            self.version = json.load(f)["version"]
+
+    def predict(self, user_id: int) -> list[int]:
+        return [self.version]
+
+
+def write_version(dir_path: Path, version: int | str) -> None:
+    (dir_path / ARTEFACT_FILE).write_text(json.dumps({"version": version}), encoding="utf-8")
+
+
+@pytest.fixture(autouse=True)
+def artefacts_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(
+        recommender_register,
+        "RECOMMENDERS",
+        {VersionedRecommender.MODEL_NAME: "tests.test_reload.VersionedRecommender"},
+    )
+    monkeypatch.setattr(settings, "artefacts_dir", str(tmp_path))
+    get_artefact_store.cache_clear()
+    VersionedRecommender.can_load.set()
+    write_version(tmp_path, 1)
+    RecommenderRegister.clear()
+    yield tmp_path
+    RecommenderRegister.clear()
+    get_artefact_store.cache_clear()
+
+
+def test_reload_does_not_block_requests(artefacts_dir: Path) -> None:
+    previous = RecommenderRegister.get_recommender_by_model_name(VersionedRecommender.MODEL_NAME)
+    released = weakref.ref(previous)
+    write_version(artefacts_dir, 2)
+    VersionedRecommender.can_load.clear()
+    reload_thread = threading.Thread(
+        target=ArtefactsReloader().reload, args=(VersionedRecommender.MODEL_NAME,)
+    )
+    reload_thread.start()
+
+    serving = RecommenderRegister.get_recommender_by_model_name(VersionedRecommender.MODEL_NAME)
+    assert serving is previous
+    assert serving.predict(1) == [1]
+    VersionedRecommender.can_load.set()
+    reload_thread.join(10)
+
+    recommender = RecommenderRegister.get_recommender_by_model_name(VersionedRecommender.MODEL_NAME)
+    assert recommender.predict(1) == [2]
+    assert recommender.get_artefact_version() != previous.get_artefact_version()
+    assert previous.predict(1) == [1]
+    del previous, serving
+    gc.collect()
+    assert released() is None
+
+
+def test_changed_artefacts_are_reloaded_once_stable(artefacts_dir: Path) -> None:
+    reloader = ArtefactsReloader()
+    RecommenderRegister.get_recommender_by_model_name(VersionedRecommender.MODEL_NAME)
+    assert reloader.check() == []
+
+    write_version(artefacts_dir, 2)
+    assert reloader.check() == []
+    assert reloader.check() == [VersionedRecommender.MODEL_NAME]
+    assert reloader.check() == []
+    recommender = RecommenderRegister.get_resident_recommender(VersionedRecommender.MODEL_NAME)
+    assert recommender.predict(1) == [2]
+
+
+def test_failed_reload_keeps_previous_instance(artefacts_dir: Path) -> None:
+    previous = RecommenderRegister.get_recommender_by_model_name(VersionedRecommender.MODEL_NAME)
+    n_failed = MODEL_RELOADS.get(model_name=VersionedRecommender.MODEL_NAME, status="failed")
+    (artefacts_dir / ARTEFACT_FILE).write_text("{", encoding="utf-8")
+
+    reloader = ArtefactsReloader()
+    with pytest.raises(ModelReloadError):
+        reloader.reload(VersionedRecommender.MODEL_NAME)
+    assert RecommenderRegister.get_resident_recommender(VersionedRecommender.MODEL_NAME) is previous
+    assert (
+        MODEL_RELOADS.get(model_name=VersionedRecommender.MODEL_NAME, status="failed")
+        == n_failed + 1
+    )
+    assert reloader.check() == []
+    assert reloader.check() == []
+
+
+def test_reload_endpoint(client: TestClient, artefacts_dir: Path) -> None:
+    path = f"/models/{VersionedRecommender.MODEL_NAME}/reload"
+    assert client.post(path).status_code == 401
+    assert client.post("/models/missing/reload", headers=get_headers()).status_code == 404
+
+    RecommenderRegister.get_recommender_by_model_name(VersionedRecommender.MODEL_NAME)
+    write_version(artefacts_dir, 2)
+    response = client.post(path, headers=get_headers())
+    assert response.status_code == 200
+    reload = response.json()
+    assert reload["previous_artefact_version"] != reload["artefact_version"]
+
+    (artefacts_dir / ARTEFACT_FILE).write_text("{", encoding="utf-8")
+    response = client.post(path, headers=get_headers())
+    assert response.status_code == 500
+    assert response.json() == {"message": ModelReloadError.DEFAULT_MESSAGE}
+
+
+def get_headers() -> dict[str, str]:
+    return {"Authorization": f"Bearer {settings.token}"}
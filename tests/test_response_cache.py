@@ -0,0 +1,88 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.cache import ResponseCache, get_response_cache
+from src.config import settings
+from src.metrics import RESPONSE_CACHE_HITS, RESPONSE_CACHE_MISSES
+from src.recommenders import recommender_register
+from src.recommenders.base_recommender import BaseRecommender
+from src.recommenders.random_recommender import RandomRecommender
+from src.recommenders.recommender_register import RecommenderRegister
+
+
+class CountingRecommender(BaseRecommender):
+    MODEL_NAME = "counting"
+    n_predictions = 0
+
+    def predict(self, user_id: int) -> list[int]:
+        CountingRecommender.n_predictions += 1
+        return list(range(user_id, user_id + settings.n_returned_items))
+
+
+@pytest.fixture(autouse=True)
+def register(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(
+        recommender_register,
+        "RECOMMENDERS",
+        {
+            RandomRecommender.MODEL_NAME: "src.recommenders.random_recommender.RandomRecommender",
+            CountingRecommender.MODEL_NAME: "tests.test_response_cache.CountingRecommender",
+        },
+    )
+    CountingRecommender.n_predictions = 0
+    RecommenderRegister.clear()
+    get_response_cache().clear()
+    yield RecommenderRegister
+    RecommenderRegister.clear()
+    get_response_cache().clear()
+
+
+def test_cache_is_keyed_by_artefact_version() -> None:
+    cache = ResponseCache()
+    cache.put("model", "v1", 1, [1, 2, 3])
+    assert cache.get("model", "v1", 1) == [1, 2, 3]
+    assert cache.get("model", "v2", 1) is None
+    assert cache.get("other", "v1", 1) is None
+
+
+def test_expired_entries_are_missed(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "response_cache_ttl_seconds", 0.0)
+    n_misses = RESPONSE_CACHE_MISSES.get(model_name="expiring")
+    cache = ResponseCache()
+    cache.put("expiring", "v1", 1, [1, 2, 3])
+    memory_usage = cache.get_memory_usage()
+    assert cache.get("expiring", "v1", 1) is None
+    assert RESPONSE_CACHE_MISSES.get(model_name="expiring") == n_misses + 1
+    assert cache.get_memory_usage() == memory_usage
+    cache.put("expiring", "v1", 1, [4, 5])
+    assert cache.get_memory_usage() < memory_usage
+
+
+def test_least_recently_used_entries_are_evicted(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "response_cache_memory_mb", 1)
+    cache = ResponseCache()
+    for user_id in range(10000):
+        cache.put("model", "v1", user_id, list(range(10)))
+        cache.get("model", "v1", 0)
+    assert cache.get_memory_usage() <= 1024**2
+    assert cache.get("model", "v1", 0) is not None
+    assert cache.get("model", "v1", 1) is None
+    assert cache.get("model", "v1", 9999) is not None
+
+
+def test_repeated_requests_skip_predict(client: TestClient) -> None:
+    headers = {"Authorization": f"Bearer {settings.token}"}
+    responses = [client.get("/reco/counting/5", headers=headers) for _ in range(4)]
+    assert all(response.json() == responses[0].json() for response in responses)
+    assert CountingRecommender.n_predictions == 2
+    assert RESPONSE_CACHE_HITS.get(model_name="counting") >= 2
+
+
+def test_random_recommendations_are_not_cached(client: TestClient) -> None:
+    n_hits = RESPONSE_CACHE_HITS.get(model_name=RandomRecommender.MODEL_NAME)
+    for _ in range(3):
+        client.get(
+            f"/reco/{RandomRecommender.MODEL_NAME}/5",
+            headers={"Authorization": f"Bearer {settings.token}"},
+        )
+    assert RESPONSE_CACHE_HITS.get(model_name=RandomRecommender.MODEL_NAME) == n_hits
@@ -0,0 +1,29 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from src import serve
+from src.app import app
+from src.config import ModeEnum, settings
+from src.recommenders.random_recommender import RandomRecommender
+from src.recommenders.recommender_register import RecommenderRegister
+
+
+@pytest.fixture(autouse=True)
+def register():
+    RecommenderRegister.clear()
+    yield RecommenderRegister
+    RecommenderRegister.clear()
+    if hasattr(app.state, "recommender"):
+        del app.state.recommender
+
+
+def test_models_are_preloaded(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "mode", ModeEnum.PRODUCTION)
+    monkeypatch.setattr(serve, "get_actual_recommender", RandomRecommender)
+    serve.preload_models([RandomRecommender.MODEL_NAME])
+    preloaded = app.state.recommender
+    assert RecommenderRegister.get_resident_recommender(RandomRecommender.MODEL_NAME) is not None
+
+    with TestClient(app) as client:
+        assert client.get("/ready").status_code == 200
+        assert app.state.recommender is preloaded
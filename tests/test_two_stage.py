@@ -0,0 +1,83 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.config import settings
+from src.metrics import COLD_START_FALLBACKS
+from src.recommenders import two_stage_recommender
+from src.recommenders.artefact_store import get_artefact_store, is_memory_mapped
+from src.recommenders.two_stage_recommender import (
+    OFFLINE_RECS_FILE,
+    TOP_ITEMS_FILE,
+    TwoStageRecommender,
+    iter_json_object,
+    read_offline_recs,
+)
+
+OFFLINE_RECS = {"30": [5, 6, 7], "10": [1, 2], "20": [], "7": [9] * 12}
+
+
+@pytest.fixture
+def artefacts_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    with open(tmp_path / OFFLINE_RECS_FILE, "w", encoding="utf-8") as f:
+        json.dump(OFFLINE_RECS, f, indent=1)
+    with open(tmp_path / TOP_ITEMS_FILE, "w", encoding="utf-8") as f:
+        json.dump({"items": list(range(100, 120))}, f)
+    monkeypatch.setattr(settings, "artefacts_dir", str(tmp_path))
+    get_artefact_store.cache_clear()
+    yield tmp_path
+    get_artefact_store.cache_clear()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1024])
+def test_json_object_is_streamed(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, chunk_size: int
+) -> None:
+    monkeypatch.setattr(two_stage_recommender, "JSON_CHUNK_SIZE", chunk_size)
+    content = {"1": [1, 22, 333], "abc": {"x": "y, z"}, "2": -1.5e3, "3": True, "4": []}
+    path = tmp_path / "content.json"
+    path.write_text("\n  " + json.dumps(content, indent=2), encoding="utf-8")
+    assert dict(iter_json_object(str(path))) == content
+
+    for malformed in ('{"1": [1, 2', '{"1" [1, 2] "2":: [3],,}', '{"1": [1],}', "{1: [1]}"):
+        path.write_text(malformed, encoding="utf-8")
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_json_object(str(path)))
+    path.write_text("{ }", encoding="utf-8")
+    assert not list(iter_json_object(str(path)))
+
+
+def test_offline_recs_are_compacted(artefacts_dir: Path) -> None:
+    with open(artefacts_dir / OFFLINE_RECS_FILE, "a", encoding="utf-8") as f:
+        f.seek(f.tell() - 1)
+        f.truncate()
+        f.write(', "10": [3, 4]}')
+    user_ids, offsets, items = read_offline_recs(str(artefacts_dir / OFFLINE_RECS_FILE))
+    assert user_ids.tolist() == [7, 10, 20, 30]
+    assert offsets.tolist() == [0, 12, 14, 14, 17]
+    assert items.dtype == np.int32
+    assert items.tolist() == [9] * 12 + [3, 4, 5, 6, 7]
+
+
+def test_offline_recommendations(artefacts_dir: Path) -> None:
+    recommender = TwoStageRecommender()
+    assert recommender.predict(30) == [5, 6, 7]
+    assert recommender.predict(20) == []
+    assert recommender.get_user_ids().tolist() == [7, 10, 20, 30]
+
+    reloaded = TwoStageRecommender()
+    assert all(
+        is_memory_mapped(array) for array in (reloaded.user_ids, reloaded.offsets, reloaded.items)
+    )
+    assert reloaded.predict_batch([10, 7]) == [[1, 2], [9] * 12]
+
+
+def test_missing_users_get_popular_items(artefacts_dir: Path) -> None:
+    recommender = TwoStageRecommender()
+    n_fallbacks = COLD_START_FALLBACKS.get(model_name=TwoStageRecommender.MODEL_NAME)
+    popular_items = list(range(100, 100 + settings.n_returned_items))
+    assert recommender.predict(8) == popular_items
+    assert recommender.predict_batch([10**9, 30, 0]) == [popular_items, [5, 6, 7], popular_items]
+    assert COLD_START_FALLBACKS.get(model_name=TwoStageRecommender.MODEL_NAME) == n_fallbacks + 3
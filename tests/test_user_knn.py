@@ -0,0 +1,25 @@
+import numpy as np
+from scipy import sparse
+
+from src.recommenders.user_knn_recommender import get_max_similarities, select_top_k_by_score
+
+
+def test_max_similarities_match_dense_computation() -> None:
+    random_state = np.random.RandomState(42)
+    weights = sparse.random(50, 20, density=0.2, format="csc", random_state=random_state)
+    data = weights.data.copy()
+    user_ids = np.array([3, 7, 0, 15])
+    similarities = random_state.rand(len(user_ids))
+    items, maximums = get_max_similarities(weights, user_ids, similarities)
+    dense = (weights[:, user_ids].toarray() > 0) * similarities
+    expected_items = np.flatnonzero(dense.max(axis=1) > 0)
+    assert items.tolist() == expected_items.tolist()
+    assert np.allclose(maximums, dense.max(axis=1)[expected_items])
+    assert np.array_equal(weights.data, data)
+
+
+def test_select_top_k_by_score_breaks_ties_by_index() -> None:
+    scores = np.array([0.5, 0.9, 0.5, 0.1, 0.5, 0.9])
+    indices = np.array([10, 4, 2, 8, 6, 1])
+    top = select_top_k_by_score(scores, indices, 4)
+    assert indices[top].tolist() == [1, 4, 2, 6]
@@ -0,0 +1,70 @@
+import threading
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.warmup import ModelsWarmUp, get_models_warm_up
+from src.exceptions import ServiceNotReadyError
+from src.metrics import MODEL_LOAD_DURATION
+from src.recommenders import recommender_register
+from src.recommenders.base_recommender import BaseRecommender
+from src.recommenders.recommender_register import RecommenderRegister
+
+
+class BlockingRecommender(BaseRecommender):
+    MODEL_NAME = "blocking"
+    loaded = threading.Event()
+    predicted_users: list[int] = []
+
+    def __init__(self):
+        BlockingRecommender.loaded.wait(10)
+
+    def predict(self, user_id: int) -> list[int]:
+        BlockingRecommender.predicted_users.append(user_id)
+        return []
+
+    def get_user_ids(self) -> np.ndarray:
+        return np.arange(100)
+
+
+@pytest.fixture(autouse=True)
+def register(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(
+        recommender_register,
+        "RECOMMENDERS",
+        {
+            "random": "src.recommenders.random_recommender.RandomRecommender",
+            BlockingRecommender.MODEL_NAME: "tests.test_warmup.BlockingRecommender",
+        },
+    )
+    BlockingRecommender.loaded.clear()
+    BlockingRecommender.predicted_users = []
+    RecommenderRegister.clear()
+    yield RecommenderRegister
+    RecommenderRegister.clear()
+
+
+def test_failed_model_does_not_block_readiness() -> None:
+    warm_up = ModelsWarmUp()
+    warm_up.run(["random", "missing"])
+    assert warm_up.is_ready()
+    assert list(warm_up.get_load_seconds()) == ["random"]
+    assert MODEL_LOAD_DURATION.get_count(model_name="random") >= 1
+
+
+def test_ready_after_warm_up(client: TestClient) -> None:
+    warm_up = get_models_warm_up()
+    warm_up.start([BlockingRecommender.MODEL_NAME, "random"])
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json() == {"message": ServiceNotReadyError.DEFAULT_MESSAGE}
+    assert client.get("/health").status_code == 200
+
+    BlockingRecommender.loaded.set()
+    assert warm_up.wait(10)
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert set(response.json()["load_seconds"]) == {BlockingRecommender.MODEL_NAME, "random"}
+    assert len(BlockingRecommender.predicted_users) == 2 * 8 + 2
+    assert RecommenderRegister.get_resident_recommender(BlockingRecommender.MODEL_NAME)